@@ -34,11 +34,11 @@ updateAndInstallPackages(){
     #   (maybe it's no longer necessary to explicitly install it since we have `sudo apt -y build-dep python3-pygame` below?`)
     # parallel: needed for update_youtube-dl.sh script
     # libatlas-base-dev: needed for numpy
-    sudo apt -y install git python3-pip ffmpeg sqlite3 mbuffer npm libsdl2-mixer-2.0-0 libsdl2-dev parallel libatlas-base-dev
+    sudo apt -y install git python3-pip ffmpeg sqlite3 npm libsdl2-mixer-2.0-0 libsdl2-dev parallel libatlas-base-dev
     sudo apt -y build-dep python3-pygame # other dependencies needed for pygame
     sudo apt -y full-upgrade
 
-    sudo pip3 install --upgrade youtube_dl yt-dlp numpy apa102-pi pytz websockets simpleaudio pygame
+    sudo pip3 install --upgrade youtube_dl yt-dlp numpy apa102-pi spidev pytz websockets simpleaudio pygame
 }
 
 clearYoutubeDlCache(){
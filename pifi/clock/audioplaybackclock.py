@@ -0,0 +1,104 @@
+import math
+import re
+import threading
+import time
+import traceback
+from pifi.clock.playbackclock import PlaybackClock
+from pifi.logger import Logger
+
+# A playback clock slaved to the position of the audio that ffplay is playing, so that the video stays in sync with
+# the audio no matter how long ffplay took to start, or whether its audio stalls.
+#
+# ffplay run with `-stats` prints a status line to stderr about every 30 ms, which starts with its master clock, i.e.
+# the position of the audio that is being output, in seconds:
+#
+#      12.34 M-A:  0.000 fd=   0 aq=   35KB vq=    0KB sq=    0B
+#
+# Between status lines, the position is extrapolated from the last one using the wall clock.
+#
+# If ffplay doesn't report a position soon enough after the clock is started, i.e. because the video has no audio,
+# the clock falls back to following the wall clock from that moment on.
+class AudioPlaybackClock(PlaybackClock):
+
+    # If ffplay hasn't reported its position this long after the clock was started, fall back to the wall clock.
+    __MAX_WAIT_FOR_AUDIO_SECONDS = 2
+
+    __STATUS_LINE_REGEX = re.compile(rb'^\s*(\S+)\s+(?:M-A|A-V):')
+
+    # ffplay_process: subprocess.Popen of an ffplay that was run with `-stats` and `stderr = subprocess.PIPE`
+    def __init__(self, ffplay_process):
+        super().__init__()
+        self.__logger = Logger().set_namespace(self.__class__.__name__)
+        self.__ffplay_process = ffplay_process
+
+        # (audio position, unix timestamp it was reported at) of the first and most recent status lines
+        self.__first_report = None
+        self.__last_report = None
+        self.__is_ffplay_done = False
+
+        # set if we fell back to the wall clock
+        self.__fallback_wall_position = None
+
+        self.__thread = threading.Thread(target = self.__read_status_lines, name = self.__class__.__name__, daemon = True)
+        self.__thread.start()
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['is_fallen_back_to_wall_clock'] = self.__fallback_wall_position is not None
+        return stats
+
+    def close(self):
+        self.__thread.join()
+
+    def _get_position(self):
+        last_report = self.__last_report
+        if last_report is not None:
+            audio_position, report_time = last_report
+            return max(audio_position + time.time() - report_time, 0)
+
+        if self.__fallback_wall_position is None:
+            if not self.__is_ffplay_done and self._get_wall_position() < self.__MAX_WAIT_FOR_AUDIO_SECONDS:
+                # wait for the audio to start
+                return None
+            self.__logger.warning("ffplay didn't report the position of the audio. Falling back to the wall clock.")
+            self.__fallback_wall_position = self._get_wall_position()
+        return self._get_wall_position() - self.__fallback_wall_position
+
+    def __read_status_lines(self):
+        stderr = self.__ffplay_process.stderr
+        buffered = b''
+        try:
+            while True:
+                chunk = stderr.read(4096)
+                if not chunk:
+                    break
+                # status lines end with a carriage return, so that they overwrite each other on a terminal
+                records = re.split(rb'[\r\n]', buffered + chunk)
+                buffered = records.pop()
+                for record in records:
+                    self.__parse_status_line(record)
+        except Exception:
+            self.__logger.error('Caught exception reading ffplay status lines: {}'.format(traceback.format_exc()))
+        finally:
+            self.__is_ffplay_done = True
+            stderr.close()
+
+    def __parse_status_line(self, record):
+        match = self.__STATUS_LINE_REGEX.match(record)
+        if not match:
+            return
+        try:
+            audio_position = float(match.group(1))
+        except ValueError:
+            return
+        if math.isnan(audio_position):
+            # the audio hasn't started playing yet
+            return
+
+        report_time = time.time()
+        if self.__first_report is None:
+            self.__first_report = (audio_position, report_time)
+        else:
+            first_audio_position, first_report_time = self.__first_report
+            self._record_drift((audio_position - first_audio_position) - (report_time - first_report_time))
+        self.__last_report = (audio_position, report_time)
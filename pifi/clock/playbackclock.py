@@ -0,0 +1,70 @@
+import time
+
+# Base class for the clocks that drive video playback. See: VideoProcessor
+#
+# A clock's position is the time, in seconds, into the video that should be shown now. Frame N of a video at `fps`
+# should be shown once the position reaches N / fps.
+#
+# Child classes implement self._get_position. Clocks that aren't driven by the wall clock report how far they have
+# drifted from it (see: self._record_drift), which is tracked here.
+class PlaybackClock:
+
+    def __init__(self):
+        self.__start_time = None
+
+        self.__num_drift_samples = 0
+        self.__last_drift = None
+        self.__total_abs_drift = 0
+        self.__max_abs_drift = 0
+
+    # Starts the clock. Called once the video's first frame is ready to be shown.
+    def start(self):
+        self.__start_time = time.time()
+
+    def is_started(self):
+        return self.__start_time is not None
+
+    # Returns the clock's position in seconds, or None if the clock doesn't know its position yet, i.e. because it
+    # wasn't started, or because the audio hasn't started playing yet.
+    def get_position(self):
+        if self.__start_time is None:
+            return None
+        return self._get_position()
+
+    # Returns the unix timestamp at which the clock will reach `position`, assuming it runs at the speed of the wall
+    # clock from now on. Returns None if the clock doesn't know its position yet.
+    def get_time_at_position(self, position):
+        current_position = self.get_position()
+        if current_position is None:
+            return None
+        return time.time() + position - current_position
+
+    def get_stats(self):
+        avg_abs_drift_ms = None
+        if self.__num_drift_samples > 0:
+            avg_abs_drift_ms = self.__total_abs_drift * 1000 / self.__num_drift_samples
+        return {
+            'clock': self.__class__.__name__,
+            'drift_ms': None if self.__last_drift is None else self.__last_drift * 1000,
+            'avg_abs_drift_ms': avg_abs_drift_ms,
+            'max_abs_drift_ms': self.__max_abs_drift * 1000,
+        }
+
+    # Stops the clock's threads, if any.
+    def close(self):
+        pass
+
+    # Returns the seconds since the clock was started, as measured by the wall clock.
+    def _get_wall_position(self):
+        return time.time() - self.__start_time
+
+    def _get_position(self):
+        raise NotImplementedError("implement in child class")
+
+    # drift: float - seconds that the clock is ahead of (positive) or behind (negative) the wall clock
+    def _record_drift(self, drift):
+        self.__num_drift_samples += 1
+        self.__last_drift = drift
+        self.__total_abs_drift += abs(drift)
+        if abs(drift) > self.__max_abs_drift:
+            self.__max_abs_drift = abs(drift)
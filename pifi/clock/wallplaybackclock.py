@@ -0,0 +1,14 @@
+from pifi.clock.playbackclock import PlaybackClock
+
+# A playback clock that follows the wall clock from the moment it is started. Used when there is no audio to sync to,
+# and as a local stand-in for AudioPlaybackClock, i.e. to measure playback without ffplay.
+class WallPlaybackClock(PlaybackClock):
+
+    # delay_seconds: float - the clock's position stays at 0 for this long after it is started, i.e. to give ffplay
+    #   time to start playing the audio
+    def __init__(self, delay_seconds = 0):
+        super().__init__()
+        self.__delay_seconds = delay_seconds
+
+    def _get_position(self):
+        return max(self._get_wall_position() - self.__delay_seconds, 0)
@@ -11,6 +11,7 @@ class Config:
         self.__logger = Logger().set_namespace(self.__class__.__name__)
         self.__server_config = {}
         self.__queue_config = {}
+        self.__led_settings = {}
         self.__video_settings = {}
         self.__game_of_life_settings = {}
         self.__snake_settings = {}
@@ -28,6 +29,9 @@ class Config:
 
         return default
 
+    def get_led_settings(self):
+        return self.__led_settings
+
     def get_video_settings(self):
         return self.__video_settings
 
@@ -57,6 +61,7 @@ class Config:
             if 'led_settings' in data:
                 led_settings = data['led_settings']
                 self.__logger.info("Found LED settings: {}".format(led_settings))
+                self.__led_settings = led_settings
                 self.__video_settings = led_settings
                 self.__game_of_life_settings = led_settings
                 self.__snake_settings = led_settings
@@ -7,6 +7,8 @@ from pifi.logger import Logger
 import pifi.playlist
 import pifi.games.scores
 import pifi.settings.settingsdb
+import pifi.videocache
+import pifi.videometadatacache
 
 def dict_factory(cursor, row):
     d = {}
@@ -22,7 +24,7 @@ class Database:
     __DB_PATH = DirectoryUtils().root_dir + '/pifi.db'
 
     # Zero indexed schema_version (first version is v0).
-    __SCHEMA_VERSION = 3
+    __SCHEMA_VERSION = 6
 
     def __init__(self):
         self.__logger = Logger().set_namespace(self.__class__.__name__)
@@ -77,6 +79,8 @@ class Database:
             pifi.playlist.Playlist().construct()
             pifi.games.scores.Scores().construct()
             pifi.settings.settingsdb.SettingsDb().construct()
+            pifi.videocache.VideoCache().construct()
+            pifi.videometadatacache.VideoMetadataCache().construct()
         elif current_schema_version < self.__SCHEMA_VERSION:
             self.__logger.info(
                 f"Database schema is outdated. Updating from version {current_schema_version} to " +
@@ -92,6 +96,12 @@ class Database:
                     self.__update_schema_to_v2()
                 elif i == 3:
                     self.__update_schema_to_v3()
+                elif i == 4:
+                    self.__update_schema_to_v4()
+                elif i == 5:
+                    self.__update_schema_to_v5()
+                elif i == 6:
+                    self.__update_schema_to_v6()
                 else:
                     msg = "No update schema method defined for version: {}.".format(i)
                     self.__logger.error(msg)
@@ -143,3 +153,15 @@ class Database:
     def __update_schema_to_v3(self):
         self.get_cursor().execute("DROP INDEX IF EXISTS game_type_score_idx")
         self.get_cursor().execute("CREATE INDEX game_type_score_idx ON scores (game_type, score)")
+
+    # Updates schema from v3 to v4.
+    def __update_schema_to_v4(self):
+        pifi.videocache.VideoCache().construct()
+
+    # Updates schema from v4 to v5.
+    def __update_schema_to_v5(self):
+        pifi.videometadatacache.VideoMetadataCache().construct()
+
+    # Updates schema from v5 to v6.
+    def __update_schema_to_v6(self):
+        self.get_cursor().execute("ALTER TABLE playlist_videos ADD COLUMN resume_position REAL DEFAULT 0")
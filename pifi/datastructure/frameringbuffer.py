@@ -0,0 +1,89 @@
+import numpy as np
+
+# A circular buffer of video frames with a fixed capacity, backed by a single preallocated numpy array of shape
+# (capacity, *frame_shape). Frames can be read directly into their slot from a file (see: self.readinto), so
+# buffering a frame allocates no memory.
+#
+# Appending is only possible if the buffer is not full.
+#
+# When you do `val = my_buffer[i]`, under the hood, the buffer will remove all values with index <= i.
+# You can only access the items once; this makes room for more values.
+#
+# Note that `my_buffer[i]` returns a view into the buffer rather than a copy. Its slot may be overwritten by later
+# appends, so copy the frame if you need to hold onto it.
+class FrameRingBuffer():
+
+    # capacity: int - number of frames
+    # frame_shape: tuple, i.e. (display_height, display_width) or (display_height, display_width, 3)
+    def __init__(self, capacity, frame_shape, dtype = np.uint8):
+        self.__capacity = capacity
+        self.__frames = np.zeros((capacity, *frame_shape), dtype)
+        self.bytes_per_frame = self.__frames[0].nbytes
+
+        # number of items that have been added over this object's lifetime
+        self.__len = 0
+        self.__max_gotten_index = -1
+
+    def is_full(self):
+        return self.unread_length() >= self.__capacity
+
+    def append(self, frame):
+        if self.is_full():
+            raise Exception('buffer is full!')
+
+        self.__frames[self.__len % self.__capacity] = frame
+        self.__len += 1
+
+    # Reads the next frame from `file` directly into the buffer. Blocks until the whole frame has been read.
+    #
+    # file: a file object opened in binary mode that supports `readinto`, i.e. the fifo ffmpeg is writing to. It may
+    #   be unbuffered, in which case each `readinto` call may return only part of a frame.
+    #
+    # Returns False if the file is at EOF, in which case nothing is appended. Else True.
+    def readinto(self, file):
+        if self.is_full():
+            raise Exception('buffer is full!')
+
+        frame_bytes = memoryview(self.__frames[self.__len % self.__capacity]).cast('B')
+        num_bytes_read = 0
+        while num_bytes_read < self.bytes_per_frame:
+            num_bytes = file.readinto(frame_bytes[num_bytes_read:])
+            if not num_bytes:
+                break
+            num_bytes_read += num_bytes
+
+        if num_bytes_read == 0:
+            return False
+        if num_bytes_read < self.bytes_per_frame:
+            raise Exception('Expected {} bytes, but got {}.'.format(self.bytes_per_frame, num_bytes_read))
+        self.__len += 1
+        return True
+
+    # Returns a view of the most recently appended frame, without marking it as read.
+    def newest(self):
+        if self.__len == 0:
+            raise IndexError('buffer is empty')
+        return self.__frames[(self.__len - 1) % self.__capacity]
+
+    # number of unread items in the buffer.
+    # This should return an integer in the range: [0, __capacity]
+    def unread_length(self):
+        return self.__len - self.__max_gotten_index - 1
+
+    def __getitem__(self, index):
+        if index >= len(self) or index < 0:
+            raise IndexError('index out of range')
+
+        if index <= self.__max_gotten_index:
+            raise IndexError('index already gotten')
+
+        self.__max_gotten_index = index
+        return self.__frames[index % self.__capacity]
+
+    # number of items that have been added over this object's lifetime
+    def __len__(self):
+        return self.__len
+
+    def __repr__(self):
+        return ('FrameRingBuffer(capacity: ' + str(self.__capacity) + ', len: ' + str(len(self)) + ', unread: ' +
+            str(self.unread_length()) + ')')
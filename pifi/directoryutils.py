@@ -5,5 +5,10 @@ class DirectoryUtils:
     # Will be: "/home/pi/development/pifi" if you install in the default location
     root_dir = None
 
+    # Where saved videos and other cached data are stored. Will be: "/home/pi/development/pifi/data" if you install
+    # in the default location
+    data_dir = None
+
     def __init__(self):
         self.root_dir = os.path.abspath(os.path.dirname(__file__) + '/..')
+        self.data_dir = self.root_dir + '/data'
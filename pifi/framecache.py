@@ -0,0 +1,201 @@
+import glob
+import hashlib
+import json
+import os
+import numpy as np
+from pifi.directoryutils import DirectoryUtils
+from pifi.logger import Logger
+
+# A cache of videos that have already been converted into frames for a given display, i.e. the raw output of ffmpeg
+# scaling the video to the display's resolution and pixel format. When a video is replayed, its frames are memory
+# mapped and played directly, so neither ffprobe nor ffmpeg needs to run. See: VideoProcessor
+#
+# Each entry is keyed by (url, width, height, pix_fmt) and consists of up to three files in the data directory's
+# frame_cache directory:
+#   <key>.frames - the raw frames, back to back
+#   <key>.mka - the video's audio track, copied as is into a matroska container. Absent if the video has no audio.
+#   <key>.json - metadata: fps, number of frames, etc. This is written last, so an entry exists only once it is
+#     complete.
+#
+# Entries are written while the video plays for the first time. See: self.create_writer
+#
+# The ffmpeg video filter that produced an entry's frames, i.e. its scaling algorithm and fps cap, is stored in its
+# metadata. An entry whose filter differs from the one the video would be converted with now is ignored, and is
+# overwritten once the video has been converted again.
+class FrameCache:
+
+    __DIRECTORY = 'frame_cache'
+    __FRAMES_EXTENSION = '.frames'
+    __AUDIO_EXTENSION = '.mka'
+    __METADATA_EXTENSION = '.json'
+    __TEMP_SUFFIX = '.part'
+
+    # bump this if the layout of the cache's files changes. Entries with a different version are ignored.
+    __VERSION = 1
+
+    # A complete entry of the cache.
+    class Entry:
+
+        # frames: np.memmap of shape (num_frames, height, width) or (num_frames, height, width, 3)
+        # fps: float
+        # audio_path: string, or None if the video has no audio
+        def __init__(self, frames, fps, audio_path):
+            self.frames = frames
+            self.fps = fps
+            self.audio_path = audio_path
+
+    # Writes an entry of the cache. The entry's files are written with a temporary suffix, and renamed into place
+    # by self.commit.
+    class Writer:
+
+        # paths: dict of the entry's file paths. See: FrameCache.__get_paths
+        # temp_paths: dict of the paths the entry's files are written to before they are committed
+        # metadata: dict
+        def __init__(self, paths, temp_paths, metadata):
+            self.__paths = paths
+            self.__temp_paths = temp_paths
+            self.__metadata = metadata
+            self.__frames_file = open(temp_paths['frames'], 'wb')
+            self.__num_frames = 0
+
+            # where the audio track should be written to. See: self.commit
+            self.audio_path = temp_paths['audio']
+
+        # frame: np.ndarray of the shape and dtype the entry was created for
+        def append(self, frame):
+            self.__frames_file.write(frame)
+            self.__num_frames += 1
+
+        # fps: float
+        # has_audio: boolean - True if the audio track was written to self.audio_path
+        #
+        # Returns True if the entry was committed. Entries without any frames are not.
+        def commit(self, fps, has_audio):
+            self.__frames_file.close()
+            if self.__num_frames == 0:
+                self.abort()
+                return False
+
+            os.replace(self.__temp_paths['frames'], self.__paths['frames'])
+            if has_audio:
+                os.replace(self.audio_path, self.__paths['audio'])
+            else:
+                self.__remove(self.audio_path)
+
+            metadata = dict(self.__metadata, fps = fps, num_frames = self.__num_frames, has_audio = has_audio)
+            with open(self.__temp_paths['metadata'], 'w') as metadata_file:
+                json.dump(metadata, metadata_file)
+            os.replace(self.__temp_paths['metadata'], self.__paths['metadata'])
+            return True
+
+        def abort(self):
+            self.__frames_file.close()
+            for path in self.__temp_paths.values():
+                self.__remove(path)
+
+        def __remove(self, path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __init__(self):
+        self.__logger = Logger().set_namespace(self.__class__.__name__)
+        self.__directory = DirectoryUtils().data_dir + '/' + self.__DIRECTORY
+        os.makedirs(self.__directory, exist_ok = True)
+
+    # pix_fmt: string - ffmpeg pixel format of the frames, i.e. 'gray' or 'rgb24'
+    # video_filter: string - the ffmpeg video filter that the frames are converted with
+    #
+    # Returns a FrameCache.Entry, or None if the video is not in the cache.
+    def get(self, url, width, height, pix_fmt, video_filter):
+        paths = self.__get_paths(url, width, height, pix_fmt)
+        try:
+            with open(paths['metadata']) as metadata_file:
+                metadata = json.load(metadata_file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            self.__logger.warning('Ignoring frame cache entry with corrupt metadata: {}'.format(paths['metadata']))
+            return None
+
+        if metadata.get('version') != self.__VERSION:
+            return None
+        if metadata.get('video_filter') != video_filter:
+            self.__logger.info('Ignoring frame cache entry that was converted with a different video filter: {}'
+                .format(metadata.get('video_filter')))
+            return None
+
+        frame_shape = self.__get_frame_shape(width, height, pix_fmt)
+        expected_size = metadata['num_frames'] * int(np.prod(frame_shape))
+        try:
+            actual_size = os.path.getsize(paths['frames'])
+        except FileNotFoundError:
+            actual_size = None
+        if actual_size != expected_size:
+            self.__logger.warning('Ignoring frame cache entry whose frames file has size {}, expected {}: {}'
+                .format(actual_size, expected_size, paths['frames']))
+            return None
+
+        frames = np.memmap(
+            paths['frames'], dtype = np.uint8, mode = 'r', shape = (metadata['num_frames'], *frame_shape)
+        )
+        audio_path = paths['audio'] if metadata['has_audio'] else None
+        return self.Entry(frames, metadata['fps'], audio_path)
+
+    # temp_directory: string - where the entry's files are written to before they are committed. If None, they are
+    #   written to the cache's directory, where they are deleted if they are never committed. See:
+    #   self.list_incomplete_entry_files
+    #
+    # Returns a FrameCache.Writer for the entry.
+    def create_writer(self, url, width, height, pix_fmt, video_filter, temp_directory = None):
+        metadata = {
+            'version': self.__VERSION,
+            'url': url,
+            'width': width,
+            'height': height,
+            'pix_fmt': pix_fmt,
+            'video_filter': video_filter,
+        }
+        paths = self.__get_paths(url, width, height, pix_fmt)
+        if temp_directory is None:
+            temp_directory = self.__directory
+        temp_paths = {
+            name: temp_directory + '/' + os.path.basename(path) + self.__TEMP_SUFFIX for name, path in paths.items()
+        }
+        return self.Writer(paths, temp_paths, metadata)
+
+    # Returns the list of the entry's file paths, whether or not they exist. The metadata file comes first: deleting
+    # the files in order removes the entry from the cache before its other files are gone.
+    def get_entry_paths(self, url, width, height, pix_fmt):
+        return self.__get_entry_paths_from_metadata_path(self.__get_paths(url, width, height, pix_fmt)['metadata'])
+
+    # Returns a list of the file paths of every complete entry of the cache. See: self.get_entry_paths
+    def list_entries(self):
+        return [
+            self.__get_entry_paths_from_metadata_path(metadata_path)
+            for metadata_path in glob.glob(glob.escape(self.__directory) + '/*' + self.__METADATA_EXTENSION)
+        ]
+
+    # Returns a list of the files of entries that were never committed, i.e. because the video was skipped or the
+    # process died while the video played. They should be deleted.
+    def list_incomplete_entry_files(self):
+        return glob.glob(glob.escape(self.__directory) + '/*' + self.__TEMP_SUFFIX)
+
+    def __get_paths(self, url, width, height, pix_fmt):
+        key = '{}_{}x{}_{}'.format(hashlib.md5(url.encode('utf-8')).hexdigest(), width, height, pix_fmt)
+        path = self.__directory + '/' + key
+        return {
+            'frames': path + self.__FRAMES_EXTENSION,
+            'audio': path + self.__AUDIO_EXTENSION,
+            'metadata': path + self.__METADATA_EXTENSION,
+        }
+
+    def __get_entry_paths_from_metadata_path(self, metadata_path):
+        path = metadata_path[:-len(self.__METADATA_EXTENSION)]
+        return [metadata_path, path + self.__FRAMES_EXTENSION, path + self.__AUDIO_EXTENSION]
+
+    def __get_frame_shape(self, width, height, pix_fmt):
+        if pix_fmt == 'rgb24':
+            return (height, width, 3)
+        return (height, width)
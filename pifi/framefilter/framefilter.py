@@ -0,0 +1,43 @@
+import time
+
+# Base class for filters that post-process frames on their way from VideoProcessor to VideoPlayer, i.e. to reduce
+# flicker or boost colors. See: FrameFilterChain
+#
+# Frames are uint8 numpy arrays of shape (height, width, 3) in RGB color modes, or (height, width) otherwise, i.e. the
+# frames that VideoPlayer.play_frame takes. A filter returns a new frame of the same shape and dtype. It must not
+# modify the frame it is given, which may be a view into the ring buffer or a read-only view into the frame cache.
+#
+# Child classes implement self._apply. How long each filter takes is tracked here, so that it can be compared with the
+# time there is to show each frame, i.e. 33 ms at 30 fps.
+class FrameFilter:
+
+    # video_settings: VideoSettings
+    def __init__(self, video_settings):
+        self._video_settings = video_settings
+        self.__num_frames_filtered = 0
+        self.__total_filter_time = 0
+        self.__max_filter_time = 0
+
+    def apply(self, frame):
+        start = time.perf_counter()
+        filtered_frame = self._apply(frame)
+        filter_time = time.perf_counter() - start
+
+        self.__num_frames_filtered += 1
+        self.__total_filter_time += filter_time
+        if filter_time > self.__max_filter_time:
+            self.__max_filter_time = filter_time
+        return filtered_frame
+
+    def get_stats(self):
+        avg_filter_ms = None
+        if self.__num_frames_filtered > 0:
+            avg_filter_ms = self.__total_filter_time * 1000 / self.__num_frames_filtered
+        return {
+            'frames_filtered': self.__num_frames_filtered,
+            'avg_filter_ms': avg_filter_ms,
+            'max_filter_ms': self.__max_filter_time * 1000,
+        }
+
+    def _apply(self, frame):
+        raise NotImplementedError("implement in child class")
@@ -0,0 +1,15 @@
+# Applies frame filters one after the other. See: FrameFilter and FrameFilterFactory
+class FrameFilterChain:
+
+    # frame_filters: list of tuples of the filter's name and its FrameFilter, in the order they are applied
+    def __init__(self, frame_filters):
+        self.__frame_filters = frame_filters
+
+    def apply(self, frame):
+        for name, frame_filter in self.__frame_filters:
+            frame = frame_filter.apply(frame)
+        return frame
+
+    # Returns a list of each filter's stats, in the order they are applied. See: FrameFilter.get_stats
+    def get_stats(self):
+        return [dict(frame_filter.get_stats(), name = name) for name, frame_filter in self.__frame_filters]
@@ -0,0 +1,35 @@
+from pifi.framefilter.framefilterchain import FrameFilterChain
+from pifi.settings.videosettings import VideoSettings
+
+class FrameFilterFactory:
+
+    # video_settings: VideoSettings - the filters are created from its frame_filters
+    #
+    # Returns a FrameFilterChain
+    def create(self, video_settings):
+        frame_filters = []
+        for frame_filter_config in video_settings.frame_filters:
+            name = frame_filter_config['name']
+            params = {key: value for key, value in frame_filter_config.items() if key != 'name'}
+            try:
+                frame_filter = self.__create_filter(name, video_settings, params)
+            except TypeError as e:
+                raise Exception('Invalid parameters for the {} frame filter: {}. {}'.format(name, params, e))
+            frame_filters.append((name, frame_filter))
+        return FrameFilterChain(frame_filters)
+
+    def __create_filter(self, name, video_settings, params):
+        if name == VideoSettings.FRAME_FILTER_TEMPORAL_SMOOTHING:
+            from pifi.framefilter.temporalsmoothingframefilter import TemporalSmoothingFrameFilter
+            return TemporalSmoothingFrameFilter(video_settings, **params)
+        elif name == VideoSettings.FRAME_FILTER_SATURATION:
+            from pifi.framefilter.saturationframefilter import SaturationFrameFilter
+            return SaturationFrameFilter(video_settings, **params)
+        elif name == VideoSettings.FRAME_FILTER_LETTERBOX_CROP:
+            from pifi.framefilter.letterboxcropframefilter import LetterboxCropFrameFilter
+            return LetterboxCropFrameFilter(video_settings, **params)
+        elif name == VideoSettings.FRAME_FILTER_SHARPEN:
+            from pifi.framefilter.sharpenframefilter import SharpenFrameFilter
+            return SharpenFrameFilter(video_settings, **params)
+        else:
+            raise Exception('Unexpected frame filter: {}'.format(name))
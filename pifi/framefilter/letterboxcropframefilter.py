@@ -0,0 +1,65 @@
+import numpy as np
+from pifi.framefilter.framefilter import FrameFilter
+from pifi.framesource.framedownscaler import FrameDownscaler
+
+# Crops the black bars of letterboxed and pillarboxed videos, and zooms into the rest to fill the display. On a 28x18
+# display, the bars of a 2.39:1 movie take up a third of the rows.
+#
+# The rows and columns at the edges of the frame that have been dark in every frame so far are considered bars. A row
+# or column stops being a bar as soon as it isn't dark, and never becomes one again, so the crop never flickers in dark
+# scenes. Until any row isn't dark, i.e. during a black intro, frames are passed through unchanged.
+#
+# The cropped region is zoomed to the display's aspect ratio, so the picture isn't stretched: if the region is wider
+# than the display, its sides are cut off, and if it is taller, its top and bottom are.
+class LetterboxCropFrameFilter(FrameFilter):
+
+    # threshold: int from 0 to 255 - rows and columns whose brightest pixel is at most this bright are dark. Bars
+    #   aren't exactly black once they are scaled down and compressed.
+    def __init__(self, video_settings, threshold = 24):
+        super().__init__(video_settings)
+        self.__threshold = threshold
+        self.__frame_downscaler = FrameDownscaler(
+            video_settings.display_width, video_settings.display_height, video_settings.is_color_mode_rgb()
+        )
+
+        # booleans of whether each row and column has ever not been dark, or None before the first frame
+        self.__is_row_content = None
+        self.__is_column_content = None
+
+    def _apply(self, frame):
+        brightness = frame if frame.ndim == 2 else frame.max(axis = 2)
+        is_row_content = brightness.max(axis = 1) > self.__threshold
+        is_column_content = brightness.max(axis = 0) > self.__threshold
+        if self.__is_row_content is None:
+            self.__is_row_content = is_row_content
+            self.__is_column_content = is_column_content
+        else:
+            self.__is_row_content |= is_row_content
+            self.__is_column_content |= is_column_content
+
+        content_rows = np.flatnonzero(self.__is_row_content)
+        content_columns = np.flatnonzero(self.__is_column_content)
+        if len(content_rows) == 0 or len(content_columns) == 0:
+            return frame
+
+        top, bottom = self.__zoom_to_aspect_ratio(
+            content_rows[0], content_rows[-1] + 1, content_columns[-1] + 1 - content_columns[0],
+            frame.shape[0] / frame.shape[1]
+        )
+        left, right = self.__zoom_to_aspect_ratio(
+            content_columns[0], content_columns[-1] + 1, bottom - top, frame.shape[1] / frame.shape[0]
+        )
+        if (top, bottom, left, right) == (0, frame.shape[0], 0, frame.shape[1]):
+            return frame
+        return self.__frame_downscaler.downscale(frame[top:bottom, left:right])
+
+    # Shrinks the range [start, end) of one dimension around its center, if it is longer than `aspect_ratio` times
+    # the length of the other dimension.
+    #
+    # Returns a tuple of the new start and end.
+    def __zoom_to_aspect_ratio(self, start, end, other_length, aspect_ratio):
+        length = max(round(other_length * aspect_ratio), 1)
+        if end - start <= length:
+            return start, end
+        start += (end - start - length) // 2
+        return start, start + length
@@ -0,0 +1,22 @@
+import numpy as np
+from pifi.framefilter.framefilter import FrameFilter
+
+# Scales how saturated the colors are, i.e. to make up for how washed out videos look on the LEDs. Each pixel is moved
+# away from (or towards) its own gray level. Frames of color modes that aren't RGB are passed through unchanged.
+class SaturationFrameFilter(FrameFilter):
+
+    # ITU-R BT.601 luma coefficients, the same as ffmpeg's `gray` pixel format uses
+    __LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], np.float32)
+
+    # amount: float - 1 leaves the colors unchanged, higher values are more saturated, and 0 is grayscale.
+    def __init__(self, video_settings, amount = 1.3):
+        super().__init__(video_settings)
+        self.__amount = amount
+
+    def _apply(self, frame):
+        if frame.ndim != 3:
+            return frame
+
+        gray = (frame @ self.__LUMA_WEIGHTS)[:, :, np.newaxis]
+        saturated = gray + self.__amount * (frame - gray)
+        return np.rint(saturated, out = saturated).clip(0, 255).astype(np.uint8)
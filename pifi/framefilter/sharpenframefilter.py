@@ -0,0 +1,27 @@
+import numpy as np
+from pifi.framefilter.framefilter import FrameFilter
+
+# Enhances edges with an unsharp mask: the difference between each pixel and the average of its 3x3 neighborhood is
+# amplified. Scaled down to 28x18, outlines are a pixel wide at most, and sharpening them keeps shapes legible.
+class SharpenFrameFilter(FrameFilter):
+
+    # amount: float - how much to amplify the edges. 0 leaves the frame unchanged.
+    def __init__(self, video_settings, amount = 0.5):
+        super().__init__(video_settings)
+        self.__amount = amount
+
+    def _apply(self, frame):
+        height, width = frame.shape[0], frame.shape[1]
+        pad_width = [(1, 1), (1, 1)] + [(0, 0)] * (frame.ndim - 2)
+        padded = np.pad(frame.astype(np.float32), pad_width, mode = 'edge')
+
+        # sum of the 9 shifted copies of the frame
+        blurred = np.zeros(padded[1:-1, 1:-1].shape, np.float32)
+        for y in range(3):
+            for x in range(3):
+                blurred += padded[y:y + height, x:x + width]
+        blurred /= 9
+
+        sharpened = padded[1:-1, 1:-1]
+        sharpened += self.__amount * (sharpened - blurred)
+        return np.rint(sharpened, out = sharpened).clip(0, 255).astype(np.uint8)
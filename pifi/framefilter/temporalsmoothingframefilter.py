@@ -0,0 +1,28 @@
+import numpy as np
+from pifi.framefilter.framefilter import FrameFilter
+
+# Reduces flicker by blending each frame with the frames shown before it: an exponential moving average of the frames.
+# At 28x18, a few pixels of a video's fine detail or compression noise make the LEDs they land on flicker, which
+# blending smooths out.
+#
+# Blending would smear scene cuts, so the average is reset when a frame differs too much from the last one.
+class TemporalSmoothingFrameFilter(FrameFilter):
+
+    # strength: float in [0, 1) - the weight of the previous frames in each frame shown. 0 disables the filter.
+    # scene_cut_threshold: float - mean absolute difference of the pixels, from 0 to 255, above which a frame is
+    #   considered a scene cut, and is shown without blending.
+    def __init__(self, video_settings, strength = 0.5, scene_cut_threshold = 40):
+        super().__init__(video_settings)
+        self.__strength = strength
+        self.__scene_cut_threshold = scene_cut_threshold
+
+        # float32 moving average of the frames, or None before the first frame
+        self.__average = None
+
+    def _apply(self, frame):
+        if self.__average is None or np.abs(frame - self.__average).mean() > self.__scene_cut_threshold:
+            self.__average = frame.astype(np.float32)
+        else:
+            self.__average *= self.__strength
+            self.__average += (1 - self.__strength) * frame
+        return np.rint(self.__average).astype(np.uint8)
@@ -0,0 +1,86 @@
+import select
+import time
+
+# Lets VideoProcessor's playback loop sleep until it has something to do, rather than spinning on a core that ffmpeg
+# and the LED output need. The loop waits until whichever comes first: the fifo that ffmpeg writes frames to becomes
+# readable, or the next deadline, i.e. the time the next frame should be shown or the next skip check.
+#
+# Also measures how well the loop keeps up: how late each frame is shown relative to its presentation time, how many
+# frames are late or dropped, and how much CPU time the process uses.
+class FrameScheduler:
+
+    # late_threshold: seconds after its presentation time that a frame counts as late. If None, no frame does.
+    def __init__(self, late_threshold = None):
+        self.__late_threshold = late_threshold
+        self.__num_waits = 0
+        self.__num_frames_shown = 0
+        self.__num_frames_late = 0
+        self.__num_frames_dropped = 0
+        self.__first_frame_shown_time = None
+        self.__last_frame_shown_time = None
+        self.__total_lateness = 0
+        self.__max_lateness = 0
+        self.__start_time = time.time()
+        self.__start_cpu_time = time.process_time()
+
+    # Sleeps until `fifo` is readable or the earliest of the deadlines has passed.
+    #
+    # fifo: file object to wait on, or None to only wait for the deadlines
+    # deadlines: unix timestamps. None values are ignored.
+    #
+    # Returns True if the fifo is readable.
+    def wait(self, fifo, *deadlines):
+        self.__num_waits += 1
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        timeout = None
+        if deadlines:
+            timeout = max(min(deadlines) - time.time(), 0)
+
+        if fifo is None:
+            if timeout is None:
+                raise Exception('Nothing to wait for.')
+            time.sleep(timeout)
+            return False
+
+        is_ready_to_read, ignore1, ignore2 = select.select([fifo], [], [], timeout)
+        return bool(is_ready_to_read)
+
+    # presentation_time: unix timestamp at which the frame that was just shown should have been shown
+    def record_frame_shown(self, presentation_time):
+        now = time.time()
+        lateness = now - presentation_time
+        if self.__first_frame_shown_time is None:
+            self.__first_frame_shown_time = now
+        self.__last_frame_shown_time = now
+        self.__num_frames_shown += 1
+        self.__total_lateness += lateness
+        if lateness > self.__max_lateness:
+            self.__max_lateness = lateness
+        if self.__late_threshold is not None and lateness > self.__late_threshold:
+            self.__num_frames_late += 1
+
+    # num_frames: frames that were never shown, because by the time they could have been, it was time for a later frame
+    def record_frames_dropped(self, num_frames):
+        self.__num_frames_dropped += num_frames
+
+    def get_stats(self):
+        elapsed = time.time() - self.__start_time
+        avg_lateness_ms = None
+        if self.__num_frames_shown > 0:
+            avg_lateness_ms = self.__total_lateness * 1000 / self.__num_frames_shown
+        fps = None
+        if self.__num_frames_shown > 1 and self.__last_frame_shown_time > self.__first_frame_shown_time:
+            fps = (self.__num_frames_shown - 1) / (self.__last_frame_shown_time - self.__first_frame_shown_time)
+        cpu_percent = None
+        if elapsed > 0:
+            cpu_percent = (time.process_time() - self.__start_cpu_time) * 100 / elapsed
+        return {
+            'frames_shown': self.__num_frames_shown,
+            'frames_late': self.__num_frames_late,
+            'frames_dropped': self.__num_frames_dropped,
+            'fps': fps,
+            'waits': self.__num_waits,
+            'avg_lateness_ms': avg_lateness_ms,
+            'max_lateness_ms': self.__max_lateness * 1000,
+            'cpu_percent': cpu_percent,
+        }
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+
+# Scales frames of any size down to the display with area averaging: each of the display's pixels is the average of
+# the source pixels it covers, weighted by how much of each source pixel it covers. This is the same algorithm as
+# ffmpeg's `area` scaler (see: VideoSettings.SCALE_ALGORITHM_AREA), so frame sources look like videos do.
+#
+# Area averaging is separable, so a frame is scaled with two matrix multiplications: one by a matrix of row weights
+# and one by a matrix of column weights. The weights are computed once per source frame size.
+class FrameDownscaler:
+
+    # ITU-R BT.601 luma coefficients, which ffmpeg uses to convert RGB to its `gray` pixel format
+    __LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], np.float32)
+
+    # width, height: int - size of the display
+    # is_color: boolean - output RGB frames of shape (height, width, 3) if True, else grayscale frames of shape
+    #   (height, width)
+    def __init__(self, width, height, is_color):
+        self.__width = width
+        self.__height = height
+        self.__is_color = is_color
+
+        # tuple of the row and column weights, by the source frame's (height, width)
+        self.__weights = {}
+
+        self.__num_frames_downscaled = 0
+        self.__total_downscale_time = 0
+
+    # frame: uint8 numpy array of shape (h, w, 3) in RGB order, (h, w, 4) in RGBA order, or (h, w) for grayscale
+    #
+    # Returns a uint8 numpy array of shape (height, width, 3) or (height, width). See: self.__init__
+    def downscale(self, frame):
+        start = time.perf_counter()
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = frame[:, :, :3] # ignore the alpha channel
+        source_height, source_width = frame.shape[0], frame.shape[1]
+        weights = self.__weights.get((source_height, source_width))
+        if weights is None:
+            weights = (
+                self.__get_weights(source_height, self.__height),
+                self.__get_weights(source_width, self.__width),
+            )
+            self.__weights[(source_height, source_width)] = weights
+        row_weights, column_weights = weights
+
+        # (height, source_height) @ (source_height, source_width * channels)
+        rows = row_weights @ frame.reshape(source_height, -1).astype(np.float32)
+        if frame.ndim == 3:
+            # (width, source_width) @ (height, source_width, channels), broadcast over the rows
+            scaled = column_weights @ rows.reshape(self.__height, source_width, frame.shape[2])
+            if not self.__is_color:
+                scaled = scaled @ self.__LUMA_WEIGHTS
+        else:
+            scaled = rows @ column_weights.T
+            if self.__is_color:
+                scaled = np.repeat(scaled[:, :, np.newaxis], 3, axis = 2)
+
+        scaled = np.rint(scaled, out = scaled).clip(0, 255).astype(np.uint8)
+        self.__num_frames_downscaled += 1
+        self.__total_downscale_time += time.perf_counter() - start
+        return scaled
+
+    def get_stats(self):
+        avg_downscale_ms = None
+        if self.__num_frames_downscaled > 0:
+            avg_downscale_ms = self.__total_downscale_time * 1000 / self.__num_frames_downscaled
+        return {
+            'frames_downscaled': self.__num_frames_downscaled,
+            'avg_downscale_ms': avg_downscale_ms,
+        }
+
+    # Returns a float32 matrix of shape (target_length, source_length). Row i holds the weight of each source pixel
+    # in target pixel i: the fraction of the target pixel that the source pixel covers. Each row sums to 1.
+    def __get_weights(self, source_length, target_length):
+        scale = source_length / target_length
+        edges = np.arange(target_length + 1) * scale
+        target_starts = edges[:-1, np.newaxis]
+        target_ends = edges[1:, np.newaxis]
+        source_starts = np.arange(source_length)[np.newaxis, :]
+        overlap = np.minimum(target_ends, source_starts + 1) - np.maximum(target_starts, source_starts)
+        return (np.clip(overlap, 0, None) / scale).astype(np.float32)
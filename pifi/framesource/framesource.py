@@ -0,0 +1,55 @@
+import time
+
+# Base class for sources of frames that VideoProcessor plays in-process, without ffmpeg, i.e. a camera or generated
+# content. See: VideoProcessor.play_frame_source
+#
+# Frames are uint8 numpy arrays of shape (height, width, 3) in RGB order, or (height, width) for grayscale. They may
+# be any size: they are scaled down to the display. See: FrameDownscaler
+#
+# Child classes implement self._get_frames. How long the source takes to yield each frame is tracked here.
+class FrameSource:
+
+    # fps: float - how many frames per second to play the source's frames at. If None, each frame is shown as soon as
+    #   the source yields it, i.e. for live sources like a camera, which yield frames at their own pace.
+    def __init__(self, fps = None):
+        self.__fps = fps
+        self.__num_frames_read = 0
+        self.__total_read_time = 0
+        self.__max_read_time = 0
+
+    def get_fps(self):
+        return self.__fps
+
+    # Returns an iterator of the source's frames.
+    def get_frames(self):
+        frames = iter(self._get_frames())
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(frames)
+            except StopIteration:
+                return
+            read_time = time.perf_counter() - start
+            self.__num_frames_read += 1
+            self.__total_read_time += read_time
+            if read_time > self.__max_read_time:
+                self.__max_read_time = read_time
+            yield frame
+
+    # Releases the source's resources, i.e. the camera.
+    def close(self):
+        pass
+
+    def get_stats(self):
+        avg_read_ms = None
+        if self.__num_frames_read > 0:
+            avg_read_ms = self.__total_read_time * 1000 / self.__num_frames_read
+        return {
+            'source': self.__class__.__name__,
+            'frames_read': self.__num_frames_read,
+            'avg_read_ms': avg_read_ms,
+            'max_read_ms': self.__max_read_time * 1000,
+        }
+
+    def _get_frames(self):
+        raise NotImplementedError("implement in child class")
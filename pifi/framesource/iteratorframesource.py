@@ -0,0 +1,21 @@
+from pifi.framesource.framesource import FrameSource
+
+# Plays the frames of any iterable of numpy frames, i.e. generated content, or the frames of an image sequence or GIF
+# decoded by the caller. For example, with PIL:
+#
+#   IteratorFrameSource((np.asarray(frame.convert('RGB')) for frame in ImageSequence.Iterator(gif)), fps = 10)
+class IteratorFrameSource(FrameSource):
+
+    # frames: iterable of frames. See: FrameSource
+    # fps: float, or None. See: FrameSource
+    def __init__(self, frames, fps = None):
+        super().__init__(fps)
+        self.__frames = frames
+
+    def _get_frames(self):
+        return self.__frames
+
+    def close(self):
+        # i.e. a generator, which may hold resources until it is closed
+        if hasattr(self.__frames, 'close'):
+            self.__frames.close()
@@ -0,0 +1,26 @@
+from pifi.framesource.framesource import FrameSource
+
+# Frames captured from the raspberry pi camera, as fast as it captures them. Used by the mirror.
+class PiCameraFrameSource(FrameSource):
+
+    # width, height: int - capture resolution. 80x60 is as small as it goes without artifacts or breaking.
+    # vflip: boolean - flip the image vertically, i.e. if the camera is mounted upside down
+    def __init__(self, width = 80, height = 60, vflip = True):
+        super().__init__()
+
+        # Imported here rather than at the top, so that only users of the camera need picamera.
+        from picamera import PiCamera
+        from picamera.array import PiRGBArray
+
+        self.__camera = PiCamera()
+        self.__camera.resolution = (width, height)
+        self.__camera.vflip = vflip
+        self.__raw_capture = PiRGBArray(self.__camera, size = (width, height))
+
+    def _get_frames(self):
+        for frame in self.__camera.capture_continuous(self.__raw_capture, format = 'rgb', use_video_port = True):
+            yield frame.array
+            self.__raw_capture.truncate(0)
+
+    def close(self):
+        self.__camera.close()
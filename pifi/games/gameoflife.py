@@ -19,6 +19,7 @@ class GameOfLife:
         self.__video_player = VideoPlayer(self.__settings)
         self.__logger.info("Doing init with GameOfLifeSettings: {}".format(vars(self.__settings)))
         self.__game_color_helper = GameColorHelper()
+        self.__board = None
 
     def play(self, should_loop = False):
         if should_loop:
@@ -92,7 +93,9 @@ class GameOfLife:
         frame = self.__board_to_frame()
 
         if self.__settings.fade:
-            self.__video_player.fade_to_frame(frame)
+            self.__video_player.fade_to_frame(
+                frame, duration = self.__settings.fade_duration, easing = self.__settings.fade_easing
+            )
         else:
             self.__video_player.play_frame(frame)
 
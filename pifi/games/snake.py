@@ -64,6 +64,12 @@ class Snake:
         self.__game_color_mode = self.__game_color_helper.determine_game_color_mode(self.__settings)
 
     def play_snake(self):
+        try:
+            self.__play_snake()
+        finally:
+            self.__video_player.close()
+
+    def __play_snake(self):
         for i in range(self.__settings.num_players):
             self.__players[i].place_snake_at_starting_location()
         self.__place_apple()
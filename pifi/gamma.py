@@ -9,6 +9,8 @@ class Gamma:
     __MIN_GAMMA_CURVE = 2
     __MAX_GAMMA_CURVE = 6
 
+    NUM_GAMMA_CURVES = (__MAX_GAMMA_CURVE - __MIN_GAMMA_CURVE) * 10
+
     # % to scale down the max brightness of each individual led
     __RED_MAX_BRIGHTNESS = 1
     __GREEN_MAX_BRIGHTNESS = .45
@@ -17,18 +19,30 @@ class Gamma:
     def __init__(self, led_settings):
         self.__led_settings = led_settings
 
-        # list of gamma curves from min to max
-        self.scale_red_curves = []
-        self.scale_blue_curves = []
-        self.scale_green_curves = []
+        # Lookup tables keyed by color mode. Each is a uint8 numpy array of shape (NUM_GAMMA_CURVES, 256, 3):
+        # gamma curve index, input value, and output (r, g, b). Inversion, each color's max brightness, and black and
+        # white zero clamping are already folded in, so a whole frame is converted with a single lookup:
+        #
+        #   color modes:      luts[color_mode][gamma_index].take(frame.astype(np.intp) * 3 + [0, 1, 2])
+        #   monochrome modes: np.take(luts[color_mode][gamma_index], frame, axis = 0)
+        #
+        # See: VideoPlayer.__get_strip_pixels
+        self.luts = {}
+
+        # The same lookup tables, but float32 and not rounded to integers. Used when we have more than 8 bits of output
+        # precision available. See: LedSettings.should_use_per_pixel_brightness and LedSettings.should_dither
+        self.float_luts = {}
 
-        self.__generateGammaScales()
+        self.__generateGammaLuts()
 
     # powers auto dynamic gamma curve using the average brightness of the given frame
+    # See also: GammaEstimator, which is what VideoPlayer uses
     def getGammaIndexForMonochromeFrame(self, frame):
-        brightness_avg = np.mean(frame)
-        brightness_std = np.std(frame)
+        return int(round(self.getUnroundedGammaIndex(np.mean(frame), np.std(frame))))
 
+    # Returns the gamma curve index, as a float in the range [0, NUM_GAMMA_CURVES - 1], for a frame with the given
+    # brightness statistics.
+    def getUnroundedGammaIndex(self, brightness_avg, brightness_std):
         # magic defined here: https://docs.google.com/spreadsheets/d/1hF3N0hCOzZlIG9VZPjADr9MhL_TWClaLHs6NJCH47AM/edit#gid=0
         # calibrated with:
         #   * --brightness of 3 (i think?)
@@ -37,43 +51,51 @@ class Gamma:
         gamma_index = (-0.2653691135 * brightness_std) + (0.112790567 * (brightness_avg)) + 18.25205188
 
         if gamma_index < 0:
-            return 0
-        elif gamma_index >= ((self.__MAX_GAMMA_CURVE - self.__MIN_GAMMA_CURVE) * 10) - 1:
-            return ((self.__MAX_GAMMA_CURVE - self.__MIN_GAMMA_CURVE) * 10) - 1
+            return 0.0
+        elif gamma_index >= self.NUM_GAMMA_CURVES - 1:
+            return float(self.NUM_GAMMA_CURVES - 1)
         else:
-            return int(round(gamma_index))
+            return float(gamma_index)
 
-    # gamma: Correction factor
+    # gammas: Correction factors, one per curve
     # max_in: Top end of INPUT range
-    # max_out: Top end of OUTPUT range
+    # max_outs: Top end of OUTPUT range, one per color
     # https://learn.adafruit.com/led-tricks-gamma-correction/
-    def __getGammaScaleValues(self, gamma, max_in, max_out):
-        gamma_list = []
-        for i in range(0, max_in + 1):
-            gamma_list.append(
-                int(
-                    round(
-                        pow(float(i / max_in), gamma) * max_out
-                    )
-                )
-            )
-
-        return gamma_list
-
-    def __generateGammaScales(self):
-        for i in range(self.__MIN_GAMMA_CURVE * 10, self.__MAX_GAMMA_CURVE * 10):
-            self.scale_red_curves.append(self.__getGammaScaleValues(i / 10, 255, int(255 * self.__RED_MAX_BRIGHTNESS)))
-            self.scale_blue_curves.append(self.__getGammaScaleValues(i / 10, 255, int(255 * self.__BLUE_MAX_BRIGHTNESS)))
-            self.scale_green_curves.append(self.__getGammaScaleValues(i / 10, 255, int(255 * self.__GREEN_MAX_BRIGHTNESS)))
+    #
+    # Returns a float array of shape (len(gammas), max_in + 1, len(max_outs))
+    def __getGammaScaleValues(self, gammas, max_in, max_outs):
+        inputs = np.arange(0, max_in + 1) / max_in
+        scaled = np.power(inputs[np.newaxis, :], gammas[:, np.newaxis])
+        return scaled[:, :, np.newaxis] * max_outs[np.newaxis, np.newaxis, :]
+
+    def __generateGammaLuts(self):
+        gammas = np.arange(self.__MIN_GAMMA_CURVE * 10, self.__MAX_GAMMA_CURVE * 10) / 10
+        max_outs = np.array([
+            int(255 * self.__RED_MAX_BRIGHTNESS),
+            int(255 * self.__GREEN_MAX_BRIGHTNESS),
+            int(255 * self.__BLUE_MAX_BRIGHTNESS),
+        ])
+        float_rgb_lut = self.__getGammaScaleValues(gammas, 255, max_outs).astype(np.float32)
+        rgb_lut = np.round(float_rgb_lut).astype(np.uint8)
 
         # for black and white, if r, g, or b has a zero in the scale they all should be 0
         # otherwise dim pixels will be just that color
-        if self.__led_settings.color_mode == LedSettings.COLOR_MODE_BW:
-            for g in range(0, ((self.__MAX_GAMMA_CURVE - self.__MIN_GAMMA_CURVE) * 10)):
-                for i in range(0, 256):
-                    if min(self.scale_red_curves[g][i], self.scale_green_curves[g][i], self.scale_blue_curves[g][i]) == 0:
-                        self.scale_red_curves[g][i] = 0
-                        self.scale_green_curves[g][i] = 0
-                        self.scale_blue_curves[g][i] = 0
-                    else:
-                        break
+        bw_zeroes = np.min(rgb_lut, axis = 2) == 0
+
+        for luts, lut in ((self.luts, rgb_lut), (self.float_luts, float_rgb_lut)):
+            bw_lut = lut.copy()
+            bw_lut[bw_zeroes] = 0
+
+            single_color_luts = {}
+            for mode, channel in ((LedSettings.COLOR_MODE_R, 0), (LedSettings.COLOR_MODE_G, 1), (LedSettings.COLOR_MODE_B, 2)):
+                single_color_lut = np.zeros_like(lut)
+                single_color_lut[:, :, channel] = lut[:, :, channel]
+                single_color_luts[mode] = single_color_lut
+
+            luts.update({
+                LedSettings.COLOR_MODE_COLOR: lut,
+                LedSettings.COLOR_MODE_INVERT_COLOR: np.ascontiguousarray(lut[:, ::-1, :]),
+                LedSettings.COLOR_MODE_BW: bw_lut,
+                LedSettings.COLOR_MODE_INVERT_BW: np.ascontiguousarray(lut[:, ::-1, :]),
+                **single_color_luts,
+            })
@@ -0,0 +1,118 @@
+import math
+import time
+import numpy as np
+from pifi.gamma import Gamma
+
+# Picks the dynamic gamma curve for monochrome color modes, frame after frame. See: Gamma.getUnroundedGammaIndex
+#
+# Computing the gamma index from scratch for every frame is both wasteful and jumpy: the index can change from one
+# frame to the next, which makes the output flicker. Instead, we:
+#
+#   * compute the brightness statistics on a subsampled frame
+#   * only recompute them when a cheap scene change metric, the change in average brightness since we last computed
+#       them, crosses a threshold. They are also recomputed periodically, to pick up slower changes.
+#   * smooth the index with an exponential moving average, except on scene cuts, where we jump straight to the new
+#       index
+#   * apply hysteresis: the index that is used only changes once the smoothed index is well past the halfway point
+#       to a neighboring index
+class GammaEstimator:
+
+    # Statistics are computed on at most about this many pixels.
+    __MAX_SAMPLED_PIXELS = 1024
+
+    # Change in average brightness (0 - 255) since the statistics were last computed, above which they are recomputed.
+    __SCENE_CHANGE_THRESHOLD = 2
+
+    # Change in average brightness above which we consider it a scene cut, and skip the smoothing.
+    __SCENE_CUT_THRESHOLD = 40
+
+    # Recompute the statistics at least this often, even without a scene change.
+    __MAX_FRAMES_BETWEEN_ESTIMATES = 30
+
+    # weight of the newest estimate in the exponential moving average
+    __SMOOTHING_FACTOR = 0.25
+
+    # How far past the halfway point between two gamma indexes the smoothed index must be before we switch.
+    __HYSTERESIS = 0.25
+
+    # gamma: Gamma
+    def __init__(self, gamma):
+        self.__gamma = gamma
+        self.__gamma_index = Gamma.DEFAULT_GAMMA_INDEX
+        self.__smoothed_gamma_index = None
+        self.__last_estimate_brightness_avg = None
+        self.__frames_since_last_estimate = 0
+
+        self.__num_frames = 0
+        self.__num_estimates = 0
+        self.__num_gamma_index_changes = 0
+        self.__total_time = 0
+        self.__max_time = 0
+
+    # frame: numpy array of shape (display_height, display_width)
+    #
+    # Returns the index of the gamma curve to use for the given frame.
+    def get_gamma_index(self, frame):
+        start = time.perf_counter()
+
+        sample = self.__get_sample(frame)
+        brightness_avg = np.mean(sample)
+        self.__frames_since_last_estimate += 1
+
+        # the first frame is treated as a scene cut
+        brightness_change = math.inf
+        if self.__last_estimate_brightness_avg is not None:
+            brightness_change = abs(brightness_avg - self.__last_estimate_brightness_avg)
+
+        if (
+            brightness_change >= self.__SCENE_CHANGE_THRESHOLD or
+            self.__frames_since_last_estimate >= self.__MAX_FRAMES_BETWEEN_ESTIMATES
+        ):
+            self.__estimate(
+                brightness_avg, np.std(sample), is_scene_cut = brightness_change >= self.__SCENE_CUT_THRESHOLD
+            )
+
+        self.__num_frames += 1
+        elapsed = time.perf_counter() - start
+        self.__total_time += elapsed
+        if elapsed > self.__max_time:
+            self.__max_time = elapsed
+        return self.__gamma_index
+
+    def get_stats(self):
+        avg_ms = None
+        if self.__num_frames > 0:
+            avg_ms = self.__total_time * 1000 / self.__num_frames
+        return {
+            'gamma_index': self.__gamma_index,
+            'smoothed_gamma_index': self.__smoothed_gamma_index,
+            'frames': self.__num_frames,
+            'estimates': self.__num_estimates,
+            'gamma_index_changes': self.__num_gamma_index_changes,
+            'avg_ms': avg_ms,
+            'max_ms': self.__max_time * 1000,
+        }
+
+    def __estimate(self, brightness_avg, brightness_std, is_scene_cut):
+        gamma_index = self.__gamma.getUnroundedGammaIndex(brightness_avg, brightness_std)
+        if is_scene_cut:
+            self.__smoothed_gamma_index = gamma_index
+        else:
+            self.__smoothed_gamma_index += self.__SMOOTHING_FACTOR * (gamma_index - self.__smoothed_gamma_index)
+
+        if is_scene_cut or abs(self.__smoothed_gamma_index - self.__gamma_index) >= 0.5 + self.__HYSTERESIS:
+            new_gamma_index = int(round(self.__smoothed_gamma_index))
+            if new_gamma_index != self.__gamma_index:
+                self.__num_gamma_index_changes += 1
+                self.__gamma_index = new_gamma_index
+
+        self.__last_estimate_brightness_avg = brightness_avg
+        self.__frames_since_last_estimate = 0
+        self.__num_estimates += 1
+
+    def __get_sample(self, frame):
+        num_pixels = frame.shape[0] * frame.shape[1]
+        if num_pixels <= self.__MAX_SAMPLED_PIXELS:
+            return frame
+        step = math.ceil(math.sqrt(num_pixels / self.__MAX_SAMPLED_PIXELS))
+        return frame[::step, ::step]
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Encodes frames into the complete SPI payload for a strip of APA102 LEDs:
+#
+#   start frame: 4 bytes of 0x00
+#   one 4 byte frame per LED: 0b111 followed by the 5 bit brightness, then the 3 color bytes in the strip's order
+#   end frame: 0x00 bytes. The data is delayed by half a clock cycle per LED as it is passed down the strip, so we
+#       need at least num_led / 2 extra clock edges to push the data out to the last LED. See:
+#       https://cpldcpu.wordpress.com/2014/11/30/understanding-the-apa102-superled/
+#
+# The payload is a single preallocated bytearray that is updated in place via a numpy view, so that encoding a frame
+# is a couple of array assignments and the payload can be sent with a single SPI write.
+class Apa102Encoder:
+
+    LED_START = 0b11100000
+    MAX_BRIGHTNESS = 0b00011111
+
+    START_FRAME_SIZE = 4
+    __MIN_END_FRAME_SIZE = 4
+
+    # num_pixels: int - number of LEDs that frames are encoded for
+    # num_padding_leds: int - number of extra LEDs at the end of the strip, which always stay dark
+    # led_order: string - the order of the color bytes on the wire, i.e. 'bgr'
+    # brightness: int - global brightness value, max of 31
+    def __init__(self, num_pixels, num_padding_leds = 0, led_order = 'bgr', brightness = MAX_BRIGHTNESS):
+        if sorted(led_order) != ['b', 'g', 'r']:
+            raise Exception('Invalid led_order: {}'.format(led_order))
+
+        self.num_pixels = num_pixels
+        self.num_led = num_pixels + num_padding_leds
+        self.end_frame_size = max(self.__MIN_END_FRAME_SIZE, (self.num_led + 15) // 16)
+
+        self.payload = bytearray(self.START_FRAME_SIZE + (self.num_led * 4) + self.end_frame_size)
+        payload_view = np.frombuffer(self.payload, np.uint8)
+        self.__led_frames = payload_view[self.START_FRAME_SIZE:self.START_FRAME_SIZE + (self.num_led * 4)].reshape(
+            self.num_led, 4
+        )
+        self.__global_brightness_byte = self.LED_START | (brightness & self.MAX_BRIGHTNESS)
+        self.__led_frames[:, 0] = self.__global_brightness_byte
+
+        # offset of the (r, g, b) color bytes within each LED's frame
+        self.__color_byte_offsets = [1 + led_order.index(color) for color in 'rgb']
+
+    # pixels: uint8 numpy array of shape (num_pixels, 3). (r, g, b) values, in strip order.
+    # brightness: uint8 numpy array of shape (num_pixels,), or None. Per LED 5 bit brightness values. If None, the
+    #   global brightness is used for every LED.
+    #
+    # Returns the payload. Note that the same bytearray is updated and returned on every call.
+    def encode(self, pixels, brightness = None):
+        if brightness is None:
+            self.__led_frames[:self.num_pixels, 0] = self.__global_brightness_byte
+        else:
+            np.bitwise_and(brightness, self.MAX_BRIGHTNESS, out = self.__led_frames[:self.num_pixels, 0])
+            self.__led_frames[:self.num_pixels, 0] |= self.LED_START
+        self.__led_frames[:self.num_pixels, self.__color_byte_offsets] = pixels
+        return self.payload
@@ -0,0 +1,51 @@
+import numpy as np
+from apa102_pi.driver import apa102
+from pifi.led.ledoutput import LedOutput
+
+# Sends frames to the physical APA102 LED strip via the apa102_pi driver.
+class Apa102LedOutput(LedOutput):
+
+    __MOSI_PIN = 10
+    __SCLK_PIN = 11
+    __LED_ORDER = 'rbg'
+
+    # Add 8 because otherwise the last 8 LEDs don't powered correctly. Weird driver glitch?
+    __NUM_PADDING_LEDS = 8
+
+    def __init__(self, led_settings, strip_mapper):
+        super().__init__(led_settings, strip_mapper)
+        num_led = self._strip_mapper.num_pixels + self.__NUM_PADDING_LEDS
+        self.__pixels = apa102.APA102(
+            num_led = num_led,
+            mosi = self.__MOSI_PIN,
+            sclk = self.__SCLK_PIN,
+            order = self.__LED_ORDER
+        )
+        self.__pixels.set_global_brightness(self._led_settings.brightness)
+        self.__pixels.clear_strip()
+
+        # The strip's data, in the same layout the apa102 driver uses: 4 bytes per LED. The first byte of each LED
+        # is 0b111 followed by the 5 bit brightness. The remaining 3 bytes are the colors, in an order determined
+        # by self.__LED_ORDER. The padding LEDs at the end of the strip always stay dark.
+        self.__led_data = np.zeros((num_led, 4), np.uint8)
+        self.__global_brightness_byte = apa102.APA102.LED_START | (self._led_settings.brightness & 0b00011111)
+        self.__led_data[:, 0] = self.__global_brightness_byte
+
+        # We historically called `set_pixel(pixel_index, r, b, g)`, i.e. with the green and blue arguments swapped.
+        # Combined with self.__LED_ORDER, the driver's `rgb` attribute tells us where each color ends up.
+        # These are in (r, g, b) order, to match the order of the pixels passed to self._show.
+        self.__color_byte_offsets = [self.__pixels.rgb[0], self.__pixels.rgb[2], self.__pixels.rgb[1]]
+
+    def _show(self, pixels, brightness):
+        num_pixels = self._strip_mapper.num_pixels
+        if brightness is None:
+            self.__led_data[:num_pixels, 0] = self.__global_brightness_byte
+        else:
+            np.bitwise_and(brightness, 0b00011111, out = self.__led_data[:num_pixels, 0])
+            self.__led_data[:num_pixels, 0] |= apa102.APA102.LED_START
+        self.__led_data[:num_pixels, self.__color_byte_offsets] = pixels
+        self.__pixels.leds = self.__led_data.ravel().tolist()
+        self.__pixels.show()
+
+    def close(self):
+        self.__pixels.cleanup()
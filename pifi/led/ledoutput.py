@@ -0,0 +1,72 @@
+import time
+import numpy as np
+from pifi.logger import Logger
+
+# Base class for the places VideoPlayer can send frames to. See: LedOutputFactory
+#
+# Child classes implement self._show. Frame counts and timings are tracked here for every output backend.
+class LedOutput:
+
+    # led_settings: LedSettings
+    # strip_mapper: StripMapper
+    def __init__(self, led_settings, strip_mapper):
+        self._led_settings = led_settings
+        self._strip_mapper = strip_mapper
+        self._logger = Logger().set_namespace(self.__class__.__name__)
+        self.__black_pixels = np.zeros((self._strip_mapper.num_pixels, 3), np.uint8)
+
+        self.__num_frames_shown = 0
+        self.__total_show_time = 0
+        self.__max_show_time = 0
+        self.__first_show_time = None
+        self.__last_show_time = None
+
+    # pixels: uint8 numpy array of shape (num_pixels, 3). Gamma corrected (r, g, b) values, in strip order.
+    # brightness: uint8 numpy array of shape (num_pixels,), or None. Per LED brightness values, from 1 to
+    #   LedSettings.brightness. If None, every LED is shown at LedSettings.brightness.
+    #   See: LedSettings.should_use_per_pixel_brightness
+    def show(self, pixels, brightness = None):
+        start = time.perf_counter()
+        self._show(pixels, brightness)
+        end = time.perf_counter()
+
+        show_time = end - start
+        self.__num_frames_shown += 1
+        self.__total_show_time += show_time
+        if show_time > self.__max_show_time:
+            self.__max_show_time = show_time
+        if self.__first_show_time is None:
+            self.__first_show_time = start
+        self.__last_show_time = end
+
+    def clear(self):
+        self.show(self.__black_pixels)
+
+    def close(self):
+        pass
+
+    def get_stats(self):
+        fps = None
+        if self.__num_frames_shown > 1 and self.__last_show_time > self.__first_show_time:
+            fps = (self.__num_frames_shown - 1) / (self.__last_show_time - self.__first_show_time)
+        avg_show_ms = None
+        if self.__num_frames_shown > 0:
+            avg_show_ms = self.__total_show_time * 1000 / self.__num_frames_shown
+        return {
+            'frames_shown': self.__num_frames_shown,
+            'total_show_seconds': self.__total_show_time,
+            'avg_show_ms': avg_show_ms,
+            'max_show_ms': self.__max_show_time * 1000,
+            'fps': fps,
+        }
+
+    def _show(self, pixels, brightness):
+        raise NotImplementedError("implement in child class")
+
+    # For backends that have no per LED brightness: returns the (r, g, b) values that would look the same as
+    # `pixels` shown at `brightness`, when shown at LedSettings.brightness.
+    def _apply_per_pixel_brightness(self, pixels, brightness):
+        if brightness is None:
+            return pixels
+        scale = brightness.astype(np.float32) / max(self._led_settings.brightness, 1)
+        return np.rint(pixels * scale[:, np.newaxis]).astype(np.uint8)
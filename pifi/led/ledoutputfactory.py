@@ -0,0 +1,78 @@
+import copy
+from pifi.led.stripmapper import StripMapper
+from pifi.settings.ledsettings import LedSettings
+
+class LedOutputFactory:
+
+    # Output backends that can push to several SPI devices concurrently when the display is tiled out of panels that
+    # are wired to different SPI devices. See: TiledLedOutput
+    __TILED_OUTPUT_BACKENDS = [LedSettings.OUTPUT_BACKEND_SPIDEV, LedSettings.OUTPUT_BACKEND_NULL]
+
+    # Output backends are imported lazily, so that e.g. the apa102_pi driver only needs to be installed on machines
+    # that actually drive an LED strip.
+    #
+    # led_settings: LedSettings
+    # strip_mapper: StripMapper
+    def create(self, led_settings, strip_mapper):
+        spi_device_strip_ranges = self.__get_spi_device_strip_ranges(led_settings, strip_mapper)
+        if len(spi_device_strip_ranges) > 1:
+            if led_settings.output_backend == LedSettings.OUTPUT_BACKEND_APA102:
+                raise Exception('The {} output backend only supports a single SPI device. Use the {} output backend.'
+                    .format(LedSettings.OUTPUT_BACKEND_APA102, LedSettings.OUTPUT_BACKEND_SPIDEV))
+
+        if len(spi_device_strip_ranges) > 1 and led_settings.output_backend in self.__TILED_OUTPUT_BACKENDS:
+            from pifi.led.tiledledoutput import TiledLedOutput
+            led_outputs = []
+            for (spi_bus, spi_device), (start, end) in spi_device_strip_ranges:
+                spi_device_led_settings = copy.copy(led_settings)
+                spi_device_led_settings.output_spi_bus = spi_bus
+                spi_device_led_settings.output_spi_device = spi_device
+                # The panels wired to an SPI device are daisy chained, so they are driven as a single strip.
+                spi_device_strip_mapper = StripMapper(end - start, 1)
+                led_outputs.append(
+                    (start, end, self.__create_backend(spi_device_led_settings, spi_device_strip_mapper))
+                )
+            led_output = TiledLedOutput(led_settings, strip_mapper, led_outputs)
+        else:
+            led_output = self.__create_backend(led_settings, strip_mapper)
+
+        if led_settings.should_use_output_thread:
+            from pifi.led.threadedledoutput import ThreadedLedOutput
+            led_output = ThreadedLedOutput(led_settings, strip_mapper, led_output)
+        return led_output
+
+    def __create_backend(self, led_settings, strip_mapper):
+        if led_settings.output_backend == LedSettings.OUTPUT_BACKEND_APA102:
+            from pifi.led.apa102ledoutput import Apa102LedOutput
+            return Apa102LedOutput(led_settings, strip_mapper)
+        elif led_settings.output_backend == LedSettings.OUTPUT_BACKEND_SPIDEV:
+            from pifi.led.spidevledoutput import SpidevLedOutput
+            return SpidevLedOutput(led_settings, strip_mapper)
+        elif led_settings.output_backend == LedSettings.OUTPUT_BACKEND_NULL:
+            from pifi.led.nullledoutput import NullLedOutput
+            return NullLedOutput(led_settings, strip_mapper)
+        elif led_settings.output_backend == LedSettings.OUTPUT_BACKEND_RECORDER:
+            from pifi.led.recorderledoutput import RecorderLedOutput
+            return RecorderLedOutput(led_settings, strip_mapper)
+        elif led_settings.output_backend == LedSettings.OUTPUT_BACKEND_TERMINAL:
+            from pifi.led.terminalledoutput import TerminalLedOutput
+            return TerminalLedOutput(led_settings, strip_mapper)
+        else:
+            raise Exception('Unexpected output backend: {}'.format(led_settings.output_backend))
+
+    # Returns a list of tuples of ((spi_bus, spi_device), (start, end)): each SPI device that panels are wired to,
+    # and the range of the strip that is sent to it.
+    def __get_spi_device_strip_ranges(self, led_settings, strip_mapper):
+        spi_device_strip_ranges = []
+        for panel, (start, end) in zip(strip_mapper.panels, strip_mapper.panel_strip_ranges):
+            spi_bus = led_settings.output_spi_bus if panel.output_spi_bus is None else panel.output_spi_bus
+            spi_device = led_settings.output_spi_device if panel.output_spi_device is None else panel.output_spi_device
+            if spi_device_strip_ranges and spi_device_strip_ranges[-1][0] == (spi_bus, spi_device):
+                # daisy chained to the previous panel
+                spi_device_strip_ranges[-1] = ((spi_bus, spi_device), (spi_device_strip_ranges[-1][1][0], end))
+            elif (spi_bus, spi_device) in [spi_bus_device for spi_bus_device, _ in spi_device_strip_ranges]:
+                raise Exception(('Panels wired to SPI bus {}, device {} must be listed one after the other, in the ' +
+                    'order in which they are daisy chained.').format(spi_bus, spi_device))
+            else:
+                spi_device_strip_ranges.append(((spi_bus, spi_device), (start, end)))
+        return spi_device_strip_ranges
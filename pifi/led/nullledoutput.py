@@ -0,0 +1,30 @@
+import time
+from pifi.led.apa102encoder import Apa102Encoder
+from pifi.led.ledoutput import LedOutput
+
+# Discards every frame. Frame counts and timings are still tracked (see: LedOutput.get_stats), which makes this
+# useful for measuring the throughput of the video and game pipelines on a machine without an LED strip.
+#
+# With LedSettings.output_null_simulate_spi_transfer, each frame is encoded the way SpidevLedOutput encodes it, and
+# we then sleep for as long as sending it over SPI at LedSettings.output_spi_max_speed_hz would take.
+class NullLedOutput(LedOutput):
+
+    # Same as SpidevLedOutput
+    __NUM_PADDING_LEDS = 8
+
+    def __init__(self, led_settings, strip_mapper):
+        super().__init__(led_settings, strip_mapper)
+        self.__encoder = None
+        if self._led_settings.output_null_simulate_spi_transfer:
+            self.__encoder = Apa102Encoder(
+                self._strip_mapper.num_pixels, self.__NUM_PADDING_LEDS, brightness = self._led_settings.brightness
+            )
+            self.__spi_transfer_seconds = len(self.__encoder.payload) * 8 / self._led_settings.output_spi_max_speed_hz
+
+    def _show(self, pixels, brightness):
+        if self.__encoder is not None:
+            self.__encoder.encode(pixels, brightness)
+            time.sleep(self.__spi_transfer_seconds)
+
+    def close(self):
+        self._logger.info("Output stats: {}".format(self.get_stats()))
@@ -0,0 +1,62 @@
+import numpy as np
+
+# One LED panel of a display that is tiled out of several panels. See: LedSettings.panels
+#
+# Each panel is a zig-zagged strip of LEDs, i.e. every other row (or column) of the panel runs in the opposite
+# direction. Panels that are wired to the same SPI device are daisy chained, in the order they are listed in the
+# config. Panels that are wired to different SPI devices are pushed to concurrently. See: TiledLedOutput
+class Panel:
+
+    # The strip runs along the panel's rows, and every other row runs in the opposite direction.
+    SERPENTINE_ROWS = 'rows'
+    # The strip runs along the panel's columns, and every other column runs in the opposite direction.
+    SERPENTINE_COLUMNS = 'columns'
+
+    SERPENTINES = [SERPENTINE_ROWS, SERPENTINE_COLUMNS]
+
+    # x: int - position of the panel's left column within the display
+    # y: int - position of the panel's top row within the display
+    # width: int - Number of pixels / units
+    # height: int - Number of pixels / units
+    # flip_x: boolean - swap left to right, depending on wiring
+    # flip_y: boolean - swap top to bottom, depending on wiring
+    # serpentine: one of the SERPENTINE_* constants
+    # output_spi_bus: int - SPI bus the panel is wired to. If None, LedSettings.output_spi_bus is used.
+    # output_spi_device: int - SPI device the panel is wired to. If None, LedSettings.output_spi_device is used.
+    def __init__(
+        self, x, y, width, height, flip_x = False, flip_y = False, serpentine = None,
+        output_spi_bus = None, output_spi_device = None
+    ):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.num_pixels = width * height
+        self.flip_x = flip_x
+        self.flip_y = flip_y
+
+        if serpentine not in self.SERPENTINES:
+            serpentine = self.SERPENTINE_ROWS
+        self.serpentine = serpentine
+
+        self.output_spi_bus = output_spi_bus
+        self.output_spi_device = output_spi_device
+
+    # Returns a tuple of two int arrays of shape (num_pixels,): the y and x coordinates within the display of each
+    # of the panel's pixels, in the order they appear on the panel's strip.
+    def get_strip_coordinates(self):
+        strip_indexes = np.arange(self.num_pixels)
+        if self.serpentine == self.SERPENTINE_ROWS:
+            ys, xs = np.divmod(strip_indexes, self.width)
+            # the first row runs right to left
+            xs = np.where(ys % 2 == 0, self.width - xs - 1, xs)
+        else:
+            xs, ys = np.divmod(strip_indexes, self.height)
+            # the first column runs bottom to top
+            ys = np.where(xs % 2 == 0, self.height - ys - 1, ys)
+
+        if self.flip_x:
+            xs = self.width - xs - 1
+        if self.flip_y:
+            ys = self.height - ys - 1
+        return ys + self.y, xs + self.x
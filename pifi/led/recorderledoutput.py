@@ -0,0 +1,95 @@
+import mmap
+import os
+import time
+import numpy as np
+from pifi.directoryutils import DirectoryUtils
+from pifi.led.ledoutput import LedOutput
+
+# Records every frame to a memory-mapped file, exactly as it would have been sent to the LED strip: gamma corrected,
+# in strip order. Useful for inspecting output and for measuring throughput without an LED strip. Frames shown with
+# per LED brightness are recorded as their equivalent at the global brightness, which may lose some precision.
+#
+# File layout:
+#   header (64 bytes): see __HEADER_DTYPE
+#   max_frames slots, each of which is:
+#       float64 unix timestamp at which the frame was shown
+#       num_pixels * 3 bytes of (r, g, b) values
+#
+# The recording wraps around after max_frames frames. The header's frames_written counter is the total number of
+# frames ever written, so the most recent frame is in slot (frames_written - 1) % max_frames. Because the write
+# position lives in the file, several VideoPlayers in the same process (i.e. in the Queue) may safely take turns
+# recording to the same file.
+class RecorderLedOutput(LedOutput):
+
+    __DEFAULT_RECORDING_FILENAME = 'data/led_output_recording.raw'
+
+    __MAGIC = b'PIFILEDS'
+    __VERSION = 1
+    __HEADER_SIZE = 64
+    __HEADER_DTYPE = np.dtype([
+        ('magic', 'S8'),
+        ('version', '<u4'),
+        ('display_width', '<u4'),
+        ('display_height', '<u4'),
+        ('num_pixels', '<u4'),
+        ('max_frames', '<u8'),
+        ('frames_written', '<u8'),
+    ])
+
+    def __init__(self, led_settings, strip_mapper):
+        super().__init__(led_settings, strip_mapper)
+        path = self._led_settings.output_recorder_path
+        if path is None:
+            path = DirectoryUtils().root_dir + '/' + self.__DEFAULT_RECORDING_FILENAME
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+
+        self.__max_frames = self._led_settings.output_recorder_max_frames
+        self.__slot_dtype = np.dtype([
+            ('timestamp', '<f8'),
+            ('pixels', 'u1', (self._strip_mapper.num_pixels, 3)),
+        ])
+        file_size = self.__HEADER_SIZE + (self.__max_frames * self.__slot_dtype.itemsize)
+
+        self.__file = open(path, 'a+b')
+        if os.path.getsize(path) != file_size:
+            self.__file.truncate(0)
+            self.__file.truncate(file_size)
+        self.__mmap = mmap.mmap(self.__file.fileno(), file_size)
+
+        self.__header = np.frombuffer(self.__mmap, self.__HEADER_DTYPE, count = 1)
+        if not self.__is_header_valid():
+            self.__header['magic'] = self.__MAGIC
+            self.__header['version'] = self.__VERSION
+            self.__header['display_width'] = self._strip_mapper.display_width
+            self.__header['display_height'] = self._strip_mapper.display_height
+            self.__header['num_pixels'] = self._strip_mapper.num_pixels
+            self.__header['max_frames'] = self.__max_frames
+            self.__header['frames_written'] = 0
+        self.__slots = np.frombuffer(
+            self.__mmap, self.__slot_dtype, count = self.__max_frames, offset = self.__HEADER_SIZE
+        )
+        self._logger.info("Recording LED output to: {}".format(path))
+
+    def _show(self, pixels, brightness):
+        frames_written = int(self.__header['frames_written'][0])
+        slot = self.__slots[frames_written % self.__max_frames]
+        slot['timestamp'] = time.time()
+        slot['pixels'] = self._apply_per_pixel_brightness(pixels, brightness)
+        self.__header['frames_written'] = frames_written + 1
+
+    def close(self):
+        self.__mmap.flush()
+        self.__header = None
+        self.__slots = None
+        self.__mmap.close()
+        self.__file.close()
+
+    def __is_header_valid(self):
+        header = self.__header[0]
+        return (
+            header['magic'] == self.__MAGIC and
+            header['version'] == self.__VERSION and
+            header['display_width'] == self._strip_mapper.display_width and
+            header['display_height'] == self._strip_mapper.display_height and
+            header['max_frames'] == self.__max_frames
+        )
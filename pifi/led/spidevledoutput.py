@@ -0,0 +1,35 @@
+import numpy as np
+import spidev
+from pifi.led.apa102encoder import Apa102Encoder
+from pifi.led.ledoutput import LedOutput
+
+# Sends frames to the physical APA102 LED strip by writing directly to the SPI device.
+#
+# Unlike Apa102LedOutput, there are no per LED python calls: each frame is encoded into a preallocated payload (see:
+# Apa102Encoder) and sent with a single `writebytes2` call, which also takes care of splitting the payload into
+# chunks no bigger than the SPI driver's buffer size.
+class SpidevLedOutput(LedOutput):
+
+    # Order of the color bytes on the wire. This is equivalent to what Apa102LedOutput sends, given apa102_pi's
+    # 'rbg' order combined with its `set_pixel(pixel_index, r, b, g)` call.
+    __LED_ORDER = 'bgr'
+
+    # Add 8 because otherwise the last 8 LEDs don't powered correctly. Weird driver glitch?
+    __NUM_PADDING_LEDS = 8
+
+    def __init__(self, led_settings, strip_mapper):
+        super().__init__(led_settings, strip_mapper)
+        self.__encoder = Apa102Encoder(
+            self._strip_mapper.num_pixels, self.__NUM_PADDING_LEDS, self.__LED_ORDER, self._led_settings.brightness
+        )
+
+        self.__spi = spidev.SpiDev()
+        self.__spi.open(self._led_settings.output_spi_bus, self._led_settings.output_spi_device)
+        self.__spi.max_speed_hz = self._led_settings.output_spi_max_speed_hz
+        self._show(np.zeros((self._strip_mapper.num_pixels, 3), np.uint8), None)
+
+    def _show(self, pixels, brightness):
+        self.__spi.writebytes2(self.__encoder.encode(pixels, brightness))
+
+    def close(self):
+        self.__spi.close()
@@ -0,0 +1,72 @@
+import numpy as np
+from pifi.led.panel import Panel
+
+# Maps frames, which are indexed by (y, x), onto the order in which the pixels appear on the LED strip.
+#
+# Each row of the LED array is zig-zagged, so every other row runs in the opposite direction. Depending on how
+# the array is wired, the whole thing may additionally be flipped horizontally and / or vertically. All of this is
+# baked into an index array once at construction time. Mapping a frame is then a single `np.take`, rather than a
+# python loop over every pixel.
+#
+# A display may also be tiled out of several panels (see: Panel), each with its own zig-zagged strip. The strip
+# order is then each panel's strip, one after the other, in the order the panels are listed.
+class StripMapper:
+
+    # display_width: int - Number of pixels / units
+    # display_height: int - Number of pixels / units
+    # flip_x: boolean - swap left to right, depending on wiring
+    # flip_y: boolean - swap top to bottom, depending on wiring
+    # panels: list of Panel, which must exactly cover the display. If None, the display is a single panel.
+    def __init__(self, display_width, display_height, flip_x = False, flip_y = False, panels = None):
+        self.display_width = display_width
+        self.display_height = display_height
+        self.num_pixels = display_width * display_height
+
+        if not panels:
+            panels = [Panel(0, 0, display_width, display_height)]
+        self.panels = panels
+
+        # (start, end) range of each panel's pixels within the strip
+        self.panel_strip_ranges = []
+        frame_offsets = []
+        start = 0
+        for panel in panels:
+            if (
+                panel.x < 0 or panel.y < 0 or
+                panel.x + panel.width > display_width or panel.y + panel.height > display_height
+            ):
+                raise Exception('Panel at ({}, {}) of size {}x{} does not fit within the {}x{} display.'.format(
+                    panel.x, panel.y, panel.width, panel.height, display_width, display_height
+                ))
+            ys, xs = panel.get_strip_coordinates()
+            if flip_x:
+                xs = display_width - xs - 1
+            if flip_y:
+                ys = display_height - ys - 1
+            self.panel_strip_ranges.append((start, start + panel.num_pixels))
+            frame_offsets.append((ys * display_width) + xs)
+            start += panel.num_pixels
+        # The offset into the flattened frame of each pixel on the strip.
+        self.__frame_offsets = np.concatenate(frame_offsets).astype(np.intp)
+
+        if (
+            len(self.__frame_offsets) != self.num_pixels or
+            np.any(np.bincount(self.__frame_offsets, minlength = self.num_pixels) != 1)
+        ):
+            raise Exception('Panels must cover the {}x{} display exactly once.'.format(display_width, display_height))
+
+        # The inverse of self.__frame_offsets: strip index of each (y, x) pixel of the frame.
+        self.pixel_index_map = np.empty(self.num_pixels, np.intp)
+        self.pixel_index_map[self.__frame_offsets] = np.arange(self.num_pixels, dtype = np.intp)
+        self.pixel_index_map = self.pixel_index_map.reshape(display_height, display_width)
+
+    # frame: np array of shape (display_height, display_width) or (display_height, display_width, channels)
+    # out: optional preallocated array to write into, of shape (num_pixels,) or (num_pixels, channels)
+    #
+    # Returns the frame's pixels in strip order, i.e. an array of shape (num_pixels,) or (num_pixels, channels).
+    def map_frame(self, frame, out = None):
+        if frame.ndim == 3:
+            flat_frame = frame.reshape(self.num_pixels, frame.shape[2])
+        else:
+            flat_frame = frame.reshape(self.num_pixels)
+        return np.take(flat_frame, self.__frame_offsets, axis = 0, out = out)
@@ -0,0 +1,53 @@
+import sys
+import time
+from pifi.led.ledoutput import LedOutput
+
+# Renders frames in the terminal using ANSI truecolor escape codes. Each character cell shows two pixels stacked
+# vertically: the upper half block's foreground color is the top pixel and its background color is the bottom pixel.
+#
+# The colors shown are the gamma corrected values that would be sent to the LED strip.
+class TerminalLedOutput(LedOutput):
+
+    # Rendering is throttled so that we don't flood the terminal. Frames that arrive faster than this are still
+    # counted, they just aren't drawn.
+    __MAX_RENDER_FPS = 30
+
+    __UPPER_HALF_BLOCK = '▀'
+    __CURSOR_HOME = '\x1b[H'
+    __CLEAR_SCREEN = '\x1b[2J'
+    __RESET_COLORS = '\x1b[0m'
+
+    def __init__(self, led_settings, strip_mapper):
+        super().__init__(led_settings, strip_mapper)
+        self.__last_render_time = 0
+        sys.stdout.write(self.__CLEAR_SCREEN)
+
+    def _show(self, pixels, brightness):
+        now = time.time()
+        if (now - self.__last_render_time) < (1 / self.__MAX_RENDER_FPS):
+            return
+        self.__last_render_time = now
+
+        # back into (y, x) order
+        frame = self._apply_per_pixel_brightness(pixels, brightness)[self._strip_mapper.pixel_index_map].tolist()
+        lines = [self.__CURSOR_HOME]
+        for y in range(0, self._strip_mapper.display_height, 2):
+            top_row = frame[y]
+            bottom_row = frame[y + 1] if (y + 1) < self._strip_mapper.display_height else None
+            line = []
+            for x in range(self._strip_mapper.display_width):
+                r, g, b = top_row[x]
+                if bottom_row is None:
+                    line.append('\x1b[38;2;{};{};{}m\x1b[49m{}'.format(r, g, b, self.__UPPER_HALF_BLOCK))
+                else:
+                    br, bg, bb = bottom_row[x]
+                    line.append('\x1b[38;2;{};{};{}m\x1b[48;2;{};{};{}m{}'.format(
+                        r, g, b, br, bg, bb, self.__UPPER_HALF_BLOCK
+                    ))
+            lines.append(''.join(line) + self.__RESET_COLORS + '\n')
+        sys.stdout.write(''.join(lines))
+        sys.stdout.flush()
+
+    def close(self):
+        sys.stdout.write(self.__RESET_COLORS)
+        sys.stdout.flush()
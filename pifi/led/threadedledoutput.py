@@ -0,0 +1,103 @@
+import collections
+import threading
+import traceback
+import numpy as np
+from pifi.led.ledoutput import LedOutput
+
+# Pushes frames to another LedOutput from a dedicated thread, so that a slow push to the LEDs (i.e. a blocking SPI
+# transfer) doesn't stall whoever is producing frames (i.e. VideoProcessor reading frames from ffmpeg).
+#
+# Frames are handed off via a triple buffer. At any time, one buffer may be in the process of being displayed by the
+# output thread, one may hold the most recently published frame that is waiting to be displayed, and one is free to
+# be filled by the next call to self.show. Publishing never waits for the output thread: if the previously
+# published frame has not been displayed yet by the time a newer frame is published, the stale frame is dropped.
+#
+# The hand off is done with deque's append and popleft operations, which are atomic, so no locks are needed.
+class ThreadedLedOutput(LedOutput):
+
+    __NUM_BUFFERS = 3
+
+    # Each buffer holds a frame's pixels and, optionally, its per LED brightness. See: LedOutput.show
+    class __Buffer:
+
+        def __init__(self, num_pixels):
+            self.pixels = np.zeros((num_pixels, 3), np.uint8)
+            self.brightness = np.zeros(num_pixels, np.uint8)
+            self.has_brightness = False
+
+    # led_output: LedOutput - the output backend to push frames to
+    def __init__(self, led_settings, strip_mapper, led_output):
+        super().__init__(led_settings, strip_mapper)
+        self.__led_output = led_output
+
+        self.__free_buffers = collections.deque(
+            self.__Buffer(self._strip_mapper.num_pixels) for _ in range(self.__NUM_BUFFERS)
+        )
+        # holds at most one buffer: the most recently published frame that has not been displayed yet
+        self.__pending_buffers = collections.deque()
+        self.__new_frame_event = threading.Event()
+        self.__is_closed = False
+
+        self.__num_frames_published = 0
+        self.__num_frames_displayed = 0
+        self.__num_frames_dropped = 0
+
+        self.__thread = threading.Thread(target = self.__run, name = self.__class__.__name__, daemon = True)
+        self.__thread.start()
+
+    def _show(self, pixels, brightness):
+        buffer = self.__free_buffers.popleft()
+        np.copyto(buffer.pixels, pixels)
+        buffer.has_brightness = brightness is not None
+        if buffer.has_brightness:
+            np.copyto(buffer.brightness, brightness)
+
+        try:
+            stale_buffer = self.__pending_buffers.popleft()
+        except IndexError:
+            stale_buffer = None
+        self.__pending_buffers.append(buffer)
+        self.__num_frames_published += 1
+        self.__new_frame_event.set()
+
+        if stale_buffer is not None:
+            self.__num_frames_dropped += 1
+            self.__free_buffers.append(stale_buffer)
+
+    # Waits for the most recently published frame to be displayed, then stops the output thread.
+    def close(self):
+        self.__is_closed = True
+        self.__new_frame_event.set()
+        self.__thread.join()
+        self._logger.info("Output stats: {}".format(self.get_stats()))
+        self.__led_output.close()
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['frames_published'] = self.__num_frames_published
+        stats['frames_displayed'] = self.__num_frames_displayed
+        stats['frames_dropped'] = self.__num_frames_dropped
+        stats['output'] = self.__led_output.get_stats()
+        return stats
+
+    def __run(self):
+        while True:
+            if not self.__is_closed:
+                self.__new_frame_event.wait()
+            # Clear the event before taking the pending buffer so that we can't miss a wakeup for a frame that is
+            # published in between.
+            self.__new_frame_event.clear()
+            try:
+                buffer = self.__pending_buffers.popleft()
+            except IndexError:
+                buffer = None
+
+            if buffer is not None:
+                try:
+                    self.__led_output.show(buffer.pixels, buffer.brightness if buffer.has_brightness else None)
+                except Exception:
+                    self._logger.error('Caught exception pushing frame: {}'.format(traceback.format_exc()))
+                self.__num_frames_displayed += 1
+                self.__free_buffers.append(buffer)
+            elif self.__is_closed:
+                return
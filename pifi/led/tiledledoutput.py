@@ -0,0 +1,39 @@
+import concurrent.futures
+from pifi.led.ledoutput import LedOutput
+
+# Pushes frames to a display that is tiled out of several panels, which are wired to several SPI devices. See: Panel
+#
+# Each SPI device has its own LedOutput, which is sent its slice of the strip. The slices are pushed concurrently
+# from a thread pool, so as long as the SPI writes release the GIL, a frame takes about as long to push as the
+# slowest SPI device takes, rather than the sum of all of them.
+class TiledLedOutput(LedOutput):
+
+    # led_outputs: list of tuples of (start, end, LedOutput). Each LedOutput is sent the pixels in the range
+    #   [start, end) of the strip.
+    def __init__(self, led_settings, strip_mapper, led_outputs):
+        super().__init__(led_settings, strip_mapper)
+        self.__led_outputs = led_outputs
+        self.__executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers = len(led_outputs), thread_name_prefix = self.__class__.__name__
+        )
+
+    def _show(self, pixels, brightness):
+        futures = []
+        for start, end, led_output in self.__led_outputs:
+            futures.append(self.__executor.submit(
+                led_output.show, pixels[start:end], None if brightness is None else brightness[start:end]
+            ))
+        # Wait for every push, since the pixels may be modified once we return. Re-raises any exception.
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self.__executor.shutdown()
+        for _, _, led_output in self.__led_outputs:
+            led_output.close()
+        self._logger.info("Output stats: {}".format(self.get_stats()))
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['outputs'] = [led_output.get_stats() for _, _, led_output in self.__led_outputs]
+        return stats
@@ -0,0 +1,289 @@
+import collections
+import os
+import subprocess
+import threading
+import time
+import traceback
+from pifi.logger import Logger
+
+# Runs the processes that stream a video: a source (i.e. yt-dlp downloading the video, or a saved video file) whose
+# bytes are fanned out to several sinks (i.e. ffmpeg, which converts the video into frames, ffplay, which plays the
+# audio, and a file the video is saved to).
+#
+# The fan out happens in this process: a thread reads the source, and each sink has a bounded buffer that a
+# dedicated thread drains into the sink. A sink that is slow to accept bytes (i.e. ffplay, which only plays audio in
+# real-time) thus doesn't hold up the other sinks until its buffer is full. At that point, reading from the source
+# waits for it, i.e. there is backpressure. The time spent waiting is measured per sink, along with each stage's
+# throughput, and each process's CPU time and peak memory. See: self.get_stats
+#
+# Only processes started by the supervisor are ever killed. See: self.terminate
+class PipelineSupervisor:
+
+    __CHUNK_SIZE = 64 * 1024
+
+    # A bounded buffer of chunks of bytes, and the thread that writes them to a sink.
+    class __Sink:
+
+        def __init__(self, name, file, max_buffered_bytes, process = None, is_required = True):
+            self.name = name
+            self.file = file
+            self.process = process
+            self.is_required = is_required
+            self.max_buffered_bytes = max_buffered_bytes
+            self.chunks = collections.deque()
+            self.num_buffered_bytes = 0
+            self.max_num_buffered_bytes = 0
+            self.condition = threading.Condition()
+            # no more chunks will be added
+            self.is_source_done = False
+            # the sink stopped accepting bytes, i.e. the process exited
+            self.is_closed = False
+            self.thread = None
+
+            self.num_bytes_written = 0
+            self.write_seconds = 0
+            self.backpressure_seconds = 0
+
+    def __init__(self):
+        self.__logger = Logger().set_namespace(self.__class__.__name__)
+        self.__sinks = []
+        self.__source_process = None
+        self.__source_name = None
+        self.__source_thread = None
+        self.__source_error = None
+        self.__is_terminated = False
+        self.__start_time = None
+        self.__end_time = None
+
+        self.__num_source_bytes_read = 0
+        self.__source_read_seconds = 0
+
+        # resource.struct_rusage of each process that exited, by name. See: self.__wait_for_process
+        self.__process_rusages = {}
+
+    # Starts a process that reads the source's bytes from its stdin.
+    #
+    # name: string - used in logs and stats
+    # cmd: list of strings - the command to run
+    # max_buffered_bytes: int - size of the sink's buffer
+    # stdout: passed to subprocess.Popen, i.e. subprocess.PIPE to read the process's output
+    # stderr: passed to subprocess.Popen
+    # is_required: boolean - if False, the sink failing doesn't fail the pipeline (see: self.wait). Check the returned
+    #   process's returncode after self.wait to find out whether it succeeded.
+    #
+    # Returns the subprocess.Popen
+    def add_process_sink(self, name, cmd, max_buffered_bytes, stdout = None, stderr = None, is_required = True):
+        process = subprocess.Popen(cmd, stdin = subprocess.PIPE, stdout = stdout, stderr = stderr, bufsize = 0)
+        self.__sinks.append(self.__Sink(name, process.stdin, max_buffered_bytes, process, is_required))
+        return process
+
+    # Writes the source's bytes to a file at `path`.
+    def add_file_sink(self, name, path, max_buffered_bytes):
+        self.__sinks.append(self.__Sink(name, open(path, 'wb'), max_buffered_bytes))
+
+    # Starts the pipeline, with a process's stdout as its source. Sinks must be added before this is called.
+    def start_with_source_process(self, name, cmd):
+        self.__source_process = subprocess.Popen(cmd, stdout = subprocess.PIPE, bufsize = 0)
+        self.__start(name, self.__source_process.stdout)
+
+    # Starts the pipeline, with a file as its source. Sinks must be added before this is called.
+    def start_with_source_file(self, name, path):
+        self.__start(name, open(path, 'rb', buffering = 0))
+
+    # Kills the pipeline's processes. Other processes, i.e. the ones that a previous video's pipeline may have left
+    # behind, are not touched.
+    def terminate(self):
+        self.__is_terminated = True
+        for sink in self.__sinks:
+            with sink.condition:
+                sink.is_closed = True
+                sink.condition.notify_all()
+        for process in self.__get_processes():
+            try:
+                process.terminate()
+            except Exception:
+                # might raise: `ProcessLookupError: [Errno 3] No such process`
+                pass
+
+    # Waits for every process and thread of the pipeline to finish.
+    #
+    # Returns True if every stage of the pipeline succeeded, i.e. the source was read to the end, every required sink
+    # accepted every byte, and every required process exited with status 0. Pipelines that were terminated return
+    # False.
+    def wait(self):
+        is_success = not self.__is_terminated
+        if self.__source_thread is not None:
+            self.__source_thread.join()
+        if self.__source_error is not None and not self.__is_terminated:
+            self.__logger.error('Caught exception reading {}: {}'.format(self.__source_name, self.__source_error))
+            is_success = False
+        for sink in self.__sinks:
+            if sink.thread is not None:
+                sink.thread.join()
+            if sink.is_closed and not self.__is_terminated:
+                if sink.is_required:
+                    self.__logger.error('Sink {} stopped accepting input before the end of the source.'.format(sink.name))
+                    is_success = False
+                else:
+                    self.__logger.info('Optional sink {} stopped accepting input before the end of the source.'
+                        .format(sink.name))
+
+        for name, process, is_required in self.__get_named_processes():
+            exit_status = self.__wait_for_process(name, process)
+            if exit_status != 0 and not self.__is_terminated:
+                if is_required:
+                    self.__logger.error('Got non-zero exit_status for {}: {}'.format(name, exit_status))
+                    is_success = False
+                else:
+                    self.__logger.info('Got non-zero exit_status for optional sink {}: {}'.format(name, exit_status))
+
+        if self.__end_time is None:
+            self.__end_time = time.time()
+        return is_success
+
+    def get_stats(self):
+        elapsed = None
+        if self.__start_time is not None:
+            elapsed = (self.__end_time or time.time()) - self.__start_time
+        stats = {'elapsed_seconds': elapsed}
+        if self.__source_name is not None:
+            stats[self.__source_name] = self.__get_throughput_stats(self.__num_source_bytes_read, elapsed)
+            stats[self.__source_name]['read_seconds'] = self.__source_read_seconds
+        for sink in self.__sinks:
+            sink_stats = self.__get_throughput_stats(sink.num_bytes_written, elapsed)
+            sink_stats['write_seconds'] = sink.write_seconds
+            sink_stats['backpressure_seconds'] = sink.backpressure_seconds
+            sink_stats['max_buffered_bytes'] = sink.max_num_buffered_bytes
+            stats[sink.name] = sink_stats
+        for name, rusage in self.__process_rusages.items():
+            stats[name]['cpu_seconds'] = rusage.ru_utime + rusage.ru_stime
+            stats[name]['max_rss_kb'] = rusage.ru_maxrss
+        return stats
+
+    def __start(self, name, source_file):
+        self.__source_name = name
+        self.__start_time = time.time()
+        for sink in self.__sinks:
+            sink.thread = threading.Thread(
+                target = self.__write_sink, args = (sink,), name = self.__class__.__name__ + '__' + sink.name,
+                daemon = True
+            )
+            sink.thread.start()
+        self.__source_thread = threading.Thread(
+            target = self.__read_source, args = (source_file,), name = self.__class__.__name__ + '__' + name,
+            daemon = True
+        )
+        self.__source_thread.start()
+
+    def __read_source(self, source_file):
+        try:
+            while not self.__is_terminated:
+                start = time.perf_counter()
+                chunk = source_file.read(self.__CHUNK_SIZE)
+                self.__source_read_seconds += time.perf_counter() - start
+                if not chunk:
+                    break
+                self.__num_source_bytes_read += len(chunk)
+                for sink in self.__sinks:
+                    self.__put(sink, chunk)
+        except Exception:
+            self.__source_error = traceback.format_exc()
+        finally:
+            source_file.close()
+            for sink in self.__sinks:
+                with sink.condition:
+                    sink.is_source_done = True
+                    sink.condition.notify_all()
+            self.__end_time = time.time()
+
+    # Adds a chunk to the sink's buffer, waiting for room in the buffer if it is full.
+    def __put(self, sink, chunk):
+        with sink.condition:
+            if sink.is_closed:
+                return
+            if sink.num_buffered_bytes >= sink.max_buffered_bytes:
+                start = time.perf_counter()
+                while sink.num_buffered_bytes >= sink.max_buffered_bytes and not sink.is_closed:
+                    sink.condition.wait()
+                sink.backpressure_seconds += time.perf_counter() - start
+            sink.chunks.append(chunk)
+            sink.num_buffered_bytes += len(chunk)
+            if sink.num_buffered_bytes > sink.max_num_buffered_bytes:
+                sink.max_num_buffered_bytes = sink.num_buffered_bytes
+            sink.condition.notify_all()
+
+    def __write_sink(self, sink):
+        is_done = False
+        try:
+            while True:
+                with sink.condition:
+                    while not sink.chunks and not sink.is_source_done and not sink.is_closed:
+                        sink.condition.wait()
+                    if sink.is_closed:
+                        break
+                    if not sink.chunks:
+                        # every byte of the source was written
+                        is_done = True
+                        break
+                    chunk = sink.chunks.popleft()
+
+                start = time.perf_counter()
+                sink.file.write(chunk)
+                sink.write_seconds += time.perf_counter() - start
+                sink.num_bytes_written += len(chunk)
+
+                with sink.condition:
+                    sink.num_buffered_bytes -= len(chunk)
+                    sink.condition.notify_all()
+        except BrokenPipeError:
+            # the process exited
+            pass
+        except Exception:
+            self.__logger.error('Caught exception writing to {}: {}'.format(sink.name, traceback.format_exc()))
+        finally:
+            with sink.condition:
+                if not is_done:
+                    sink.is_closed = True
+                sink.chunks.clear()
+                sink.num_buffered_bytes = 0
+                sink.condition.notify_all()
+            try:
+                sink.file.close()
+            except BrokenPipeError:
+                pass
+
+    # Waits for the process to exit, and records the CPU time and peak memory it used.
+    #
+    # Returns the process's exit status.
+    def __wait_for_process(self, name, process):
+        if process.returncode is None:
+            try:
+                pid, wait_status, rusage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(wait_status)
+                self.__process_rusages[name] = rusage
+            except ChildProcessError:
+                # the process was already reaped
+                pass
+        return process.wait()
+
+    def __get_throughput_stats(self, num_bytes, elapsed):
+        mb_per_second = None
+        if elapsed:
+            mb_per_second = num_bytes / elapsed / (1024 * 1024)
+        return {
+            'bytes': num_bytes,
+            'mb_per_second': mb_per_second,
+        }
+
+    def __get_processes(self):
+        return [process for name, process, is_required in self.__get_named_processes()]
+
+    # Returns a list of tuples: (name, process, is_required)
+    def __get_named_processes(self):
+        named_processes = []
+        if self.__source_process is not None:
+            named_processes.append((self.__source_name, self.__source_process, True))
+        for sink in self.__sinks:
+            if sink.process is not None:
+                named_processes.append((sink.name, sink.process, sink.is_required))
+        return named_processes
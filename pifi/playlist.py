@@ -44,7 +44,8 @@ class Playlist:
                 color_mode VARCHAR(20),
                 status VARCHAR(20),
                 is_skip_requested INTEGER DEFAULT 0,
-                settings TEXT DEFAULT ''
+                settings TEXT DEFAULT '',
+                resume_position REAL DEFAULT 0
             )""")
 
         self.__cursor.execute("DROP INDEX IF EXISTS status_idx")
@@ -142,6 +143,16 @@ class Playlist:
             return True
         return False
 
+    # Records where to resume the video from if it is played again, i.e. after it was re-enqueued because a game
+    # pre-empted it. See: VideoProcessor.process_and_play
+    #
+    # resume_position: float - seconds from the start of the video
+    def set_resume_position(self, playlist_video_id, resume_position):
+        self.__cursor.execute(
+            "UPDATE playlist_videos set resume_position = ? WHERE playlist_video_id = ?",
+            [resume_position, playlist_video_id]
+        )
+
     def end_video(self, playlist_video_id):
         self.__cursor.execute(
             "UPDATE playlist_videos set status=? WHERE playlist_video_id=?",
@@ -8,6 +8,7 @@ from pifi.settings.videosettings import VideoSettings
 from pifi.settings.gameoflifesettings import GameOfLifeSettings
 from pifi.videoplayer import VideoPlayer
 from pifi.videoprocessor import VideoProcessor
+from pifi.videoprefetcher import VideoPrefetcher
 from pifi.config import Config
 from pifi.games.gameoflife import GameOfLife
 from pifi.games.unixsockethelper import UnixSocketHelper
@@ -33,11 +34,13 @@ class Queue:
         self.__logger = Logger().set_namespace(self.__class__.__name__)
         self.__unix_socket = UnixSocketHelper().create_server_unix_socket(self.UNIX_SOCKET_PATH)
         self.__video_player = VideoPlayer(VideoSettings().from_playlist_item_in_queue())
+        self.__video_prefetcher = VideoPrefetcher()
 
         # house keeping
         self.__clear_screen()
         (VolumeController()).set_vol_pct(50)
         self.__playlist.clean_up_state()
+        self.__video_prefetcher.start()
 
     def run(self):
         is_game_reset_needed = False
@@ -63,7 +66,13 @@ class Queue:
             video_settings = VideoSettings().from_playlist_item_in_queue(playlist_item)
             video_player = VideoPlayer(video_settings)
             video_processor = VideoProcessor(video_settings, playlist_item['playlist_video_id'])
-            video_processor.process_and_play(url = playlist_item["url"], video_player = video_player)
+            try:
+                video_processor.process_and_play(
+                    url = playlist_item["url"], video_player = video_player,
+                    start_position = playlist_item["resume_position"]
+                )
+            finally:
+                video_player.close()
         elif playlist_item["type"] == Playlist.TYPE_GAME:
             if playlist_item["title"] == Snake.GAME_TITLE:
                 snake_settings = SnakeSettings().from_playlist_item_in_queue(playlist_item)
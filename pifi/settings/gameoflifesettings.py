@@ -11,16 +11,19 @@ class GameOfLifeSettings(LedSettings):
     DEFAULT_INVERT = False
 
     # tick_sleep: in seconds
+    # fade_duration: in seconds. If None, VideoPlayer.DEFAULT_FADE_DURATION is used.
+    # fade_easing: one of the VideoPlayer.FADE_EASING_* constants. If None, fades are linear.
     def __init__(
         self, display_width = None, display_height = None,
         brightness = None, flip_x = False, flip_y = False, log_level = None,
         seed_liveness_probability = None, tick_sleep = None,
         game_over_detection_lookback = None, game_color_mode = None,
-        fade = None, invert = None
+        fade = None, invert = None, fade_duration = None, fade_easing = None, output_backend = None
     ):
         super().__init__(
             color_mode = self.COLOR_MODE_COLOR, display_width = display_width, display_height = display_height,
-            brightness = brightness, flip_x = flip_x, flip_y = flip_y, log_level = log_level
+            brightness = brightness, flip_x = flip_x, flip_y = flip_y, log_level = log_level,
+            output_backend = output_backend
         )
 
         if seed_liveness_probability is None:
@@ -45,6 +48,9 @@ class GameOfLifeSettings(LedSettings):
             invert = self.DEFAULT_INVERT
         self.invert = invert
 
+        self.fade_duration = fade_duration
+        self.fade_easing = fade_easing
+
     def from_config(self):
         super().from_config()
         config = self.get_values_from_config()
@@ -61,6 +67,10 @@ class GameOfLifeSettings(LedSettings):
             self.fade = config['fade']
         if 'invert' in config:
             self.invert = config['invert']
+        if 'fade_duration' in config:
+            self.fade_duration = config['fade_duration']
+        if 'fade_easing' in config:
+            self.fade_easing = config['fade_easing']
 
         return self
 
@@ -1,3 +1,5 @@
+from pifi.config import Config
+from pifi.led.panel import Panel
 from pifi.logger import Logger
 
 class LedSettings:
@@ -28,15 +30,45 @@ class LedSettings:
 
     DEFAULT_BRIGHTNESS = 3
 
+    # Where frames are sent. See: LedOutputFactory
+    OUTPUT_BACKEND_APA102 = 'apa102' # the physical LED strip, via the apa102_pi driver
+    OUTPUT_BACKEND_SPIDEV = 'spidev' # the physical LED strip, written to directly via spidev
+    OUTPUT_BACKEND_NULL = 'null' # discards frames, only counting them and timing them
+    OUTPUT_BACKEND_RECORDER = 'recorder' # records raw frames to a memory-mapped file
+    OUTPUT_BACKEND_TERMINAL = 'terminal' # renders frames in the terminal with ANSI truecolor escape codes
+
+    OUTPUT_BACKENDS = [
+        OUTPUT_BACKEND_APA102,
+        OUTPUT_BACKEND_SPIDEV,
+        OUTPUT_BACKEND_NULL,
+        OUTPUT_BACKEND_RECORDER,
+        OUTPUT_BACKEND_TERMINAL,
+    ]
+
+    DEFAULT_OUTPUT_BACKEND = OUTPUT_BACKEND_APA102
+
+    # seconds
+    DEFAULT_OUTPUT_KEEP_ALIVE_INTERVAL = 1
+
+    # SPI bus 0, device 0 is on MOSI pin 10 and SCLK pin 11
+    DEFAULT_OUTPUT_SPI_BUS = 0
+    DEFAULT_OUTPUT_SPI_DEVICE = 0
+    DEFAULT_OUTPUT_SPI_MAX_SPEED_HZ = 8000000
+
+    # at 28x18, this is ~27 MB and 10 minutes of 30 fps video
+    DEFAULT_OUTPUT_RECORDER_MAX_FRAMES = 18000
+
     # color_mode: one of the COLOR_MODE_* constants
     # display_width: int - Number of pixels / units
     # display_height: int - Number of pixels / units
     # brightness: int - Global brightness value, max of 31
     # flip_x: boolean - swap left to right, depending on wiring
     # flip_y: boolean - swap top to bottom, depending on wiring
+    # output_backend: one of the OUTPUT_BACKEND_* constants. If None, it is read from config.json's led_settings.
     def __init__(
         self, color_mode = None, display_width = None, display_height = None,
         brightness = None, flip_x = False, flip_y = False, log_level = None,
+        output_backend = None,
     ):
         # logger: used in child class(es)
         self._logger = Logger().set_namespace(self.__class__.__name__)
@@ -64,8 +96,47 @@ class LedSettings:
             log_level = self.LOG_LEVEL_NORMAL
         self.log_level = log_level
 
+        # Output settings describe the physical installation rather than whatever is being played, so they are read
+        # from config.json even when the rest of the settings are specified on the command line.
+        self.set_output_backend(self.DEFAULT_OUTPUT_BACKEND)
+        # output_recorder_path: where the recorder output backend writes frames. If None, a file in the data
+        #   directory is used. See: RecorderLedOutput
+        self.output_recorder_path = None
+        # output_recorder_max_frames: the recording wraps around after this many frames
+        self.output_recorder_max_frames = self.DEFAULT_OUTPUT_RECORDER_MAX_FRAMES
+        # output_spi_bus, output_spi_device, output_spi_max_speed_hz: used by the spidev output backend. See:
+        #   SpidevLedOutput
+        self.output_spi_bus = self.DEFAULT_OUTPUT_SPI_BUS
+        self.output_spi_device = self.DEFAULT_OUTPUT_SPI_DEVICE
+        self.output_spi_max_speed_hz = self.DEFAULT_OUTPUT_SPI_MAX_SPEED_HZ
+        # output_null_simulate_spi_transfer: make the null output backend encode each frame and sleep for as long as
+        #   sending it over SPI would take, to benchmark without an LED strip. See: NullLedOutput
+        self.output_null_simulate_spi_transfer = False
+        # panels: list of Panel, if the display is tiled out of several panels. If None, the display is a single
+        #   panel. See: StripMapper and TiledLedOutput
+        self.panels = None
+        # should_use_output_thread: push frames to the output backend from a dedicated thread. See: ThreadedLedOutput
+        self.should_use_output_thread = False
+        # should_skip_unchanged_frames: don't push a frame to the output backend if it is identical to the last
+        #   frame pushed. See: VideoPlayer.__show
+        self.should_skip_unchanged_frames = True
+        # output_keep_alive_interval: in seconds. Push unchanged frames anyway if it has been at least this long since
+        #   the last push. Set to 0 to never push unchanged frames.
+        self.output_keep_alive_interval = self.DEFAULT_OUTPUT_KEEP_ALIVE_INTERVAL
+        # should_use_per_pixel_brightness: use the APA102's per LED 5 bit brightness in addition to its 8 bit colors,
+        #   for finer gradations in dark colors. See: VideoPlayer.__get_precise_strip_pixels
+        self.should_use_per_pixel_brightness = False
+        # should_dither: temporally dither the gamma corrected colors across frames, so that on average, each LED
+        #   shows the exact value from the gamma curve rather than its rounded value.
+        #   See: VideoPlayer.__get_precise_strip_pixels
+        self.should_dither = False
+        self.__set_output_settings_from_config(Config().get_led_settings())
+        if output_backend is not None:
+            self.set_output_backend(output_backend)
+
     def from_config(self):
         config = self.get_values_from_config()
+        self.__set_output_settings_from_config(config)
 
         if 'display_width' in config:
             self.display_width = config['display_width']
@@ -92,5 +163,65 @@ class LedSettings:
         else:
             self.color_mode = self.COLOR_MODE_COLOR
 
+    def set_output_backend(self, output_backend):
+        output_backend = output_backend.lower()
+        if output_backend in self.OUTPUT_BACKENDS:
+            self.output_backend = output_backend
+        else:
+            self._logger.warning("Unknown output_backend: {}. Using: {}.".format(output_backend, self.DEFAULT_OUTPUT_BACKEND))
+            self.output_backend = self.DEFAULT_OUTPUT_BACKEND
+
+    # panels: list of dicts, i.e. from config.json:
+    #
+    #   "panels": [
+    #       {"x": 0, "y": 0, "width": 28, "height": 18, "output_spi_bus": 0},
+    #       {"x": 28, "y": 0, "width": 28, "height": 18, "output_spi_bus": 1, "flip_x": true}
+    #   ]
+    #
+    # See Panel for the meaning of each key.
+    def set_panels(self, panels):
+        if not panels:
+            self.panels = None
+            return
+
+        self.panels = []
+        for panel in panels:
+            self.panels.append(Panel(
+                panel['x'], panel['y'], panel['width'], panel['height'],
+                flip_x = panel.get('flip_x', False),
+                flip_y = panel.get('flip_y', False),
+                serpentine = panel.get('serpentine', Panel.SERPENTINE_ROWS),
+                output_spi_bus = panel.get('output_spi_bus'),
+                output_spi_device = panel.get('output_spi_device'),
+            ))
+
     def is_color_mode_rgb(self):
         return self.color_mode in [self.COLOR_MODE_COLOR, self.COLOR_MODE_INVERT_COLOR]
+
+    def __set_output_settings_from_config(self, config):
+        if 'output_backend' in config:
+            self.set_output_backend(config['output_backend'])
+        if 'output_recorder_path' in config:
+            self.output_recorder_path = config['output_recorder_path']
+        if 'output_recorder_max_frames' in config:
+            self.output_recorder_max_frames = config['output_recorder_max_frames']
+        if 'output_spi_bus' in config:
+            self.output_spi_bus = config['output_spi_bus']
+        if 'output_spi_device' in config:
+            self.output_spi_device = config['output_spi_device']
+        if 'output_spi_max_speed_hz' in config:
+            self.output_spi_max_speed_hz = config['output_spi_max_speed_hz']
+        if 'output_null_simulate_spi_transfer' in config:
+            self.output_null_simulate_spi_transfer = config['output_null_simulate_spi_transfer']
+        if 'panels' in config:
+            self.set_panels(config['panels'])
+        if 'should_use_output_thread' in config:
+            self.should_use_output_thread = config['should_use_output_thread']
+        if 'should_skip_unchanged_frames' in config:
+            self.should_skip_unchanged_frames = config['should_skip_unchanged_frames']
+        if 'output_keep_alive_interval' in config:
+            self.output_keep_alive_interval = config['output_keep_alive_interval']
+        if 'should_use_per_pixel_brightness' in config:
+            self.should_use_per_pixel_brightness = config['should_use_per_pixel_brightness']
+        if 'should_dither' in config:
+            self.should_dither = config['should_dither']
@@ -1,27 +1,98 @@
 from pifi.config import Config
 from pifi.settings.ledsettings import LedSettings
+from pifi.videocache import VideoCache
 
 class VideoSettings(LedSettings):
 
+    DEFAULT_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+    DEFAULT_CACHE_EVICTION_POLICY = VideoCache.EVICTION_POLICY_LRU
+
+    DEFAULT_PREFETCH_NUM_VIDEOS = 1
+
+    # Clocks that drive video playback. See: PlaybackClock
+    PLAYBACK_CLOCK_AUDIO = 'audio' # slaved to the position of the audio ffplay is playing. See: AudioPlaybackClock
+    PLAYBACK_CLOCK_WALL = 'wall' # the wall clock. See: WallPlaybackClock
+
+    PLAYBACK_CLOCKS = [PLAYBACK_CLOCK_AUDIO, PLAYBACK_CLOCK_WALL]
+
+    DEFAULT_PLAYBACK_CLOCK = PLAYBACK_CLOCK_AUDIO
+
+    # ffmpeg scaling algorithms, see: https://ffmpeg.org/ffmpeg-scaler.html#sws_005fflags
+    SCALE_ALGORITHM_AREA = 'area' # averages the pixels that each output pixel covers. Cheap, and smooth colors.
+    SCALE_ALGORITHM_BICUBIC = 'bicubic' # ffmpeg's default
+    SCALE_ALGORITHM_BILINEAR = 'bilinear'
+    SCALE_ALGORITHM_FAST_BILINEAR = 'fast_bilinear'
+    SCALE_ALGORITHM_NEIGHBOR = 'neighbor'
+
+    SCALE_ALGORITHMS = [
+        SCALE_ALGORITHM_AREA, SCALE_ALGORITHM_BICUBIC, SCALE_ALGORITHM_BILINEAR, SCALE_ALGORITHM_FAST_BILINEAR,
+        SCALE_ALGORITHM_NEIGHBOR,
+    ]
+
+    DEFAULT_SCALE_ALGORITHM = SCALE_ALGORITHM_AREA
+
+    # Filters that post-process frames before they are shown. See: FrameFilterFactory
+    FRAME_FILTER_TEMPORAL_SMOOTHING = 'temporal_smoothing' # reduces flicker. See: TemporalSmoothingFrameFilter
+    FRAME_FILTER_SATURATION = 'saturation' # boosts colors. See: SaturationFrameFilter
+    FRAME_FILTER_LETTERBOX_CROP = 'letterbox_crop' # crops black bars. See: LetterboxCropFrameFilter
+    FRAME_FILTER_SHARPEN = 'sharpen' # enhances edges. See: SharpenFrameFilter
+
+    FRAME_FILTERS = [
+        FRAME_FILTER_TEMPORAL_SMOOTHING, FRAME_FILTER_SATURATION, FRAME_FILTER_LETTERBOX_CROP, FRAME_FILTER_SHARPEN,
+    ]
+
     # should_play_audio: boolean
     # should_save_video: boolean - saving the video allows us to avoid youtube-dl network calls to download the video
     #   if it's played again.
     # should_check_playlist: boolean - if True, the videoprocessor will periodically check the DB to see if it should
     #   skip playing the current video.
     # should_predownload_video: boolean - force the video to fully download before playing
+    # playback_clock: one of the PLAYBACK_CLOCK_* constants. Videos without audio always use the wall clock.
+    # max_fps: number - videos with a higher fps are converted into this many frames per second, which saves
+    #   scaling and showing frames that the LEDs can't keep up with anyway. If None, the fps isn't capped.
+    # scale_algorithm: one of the SCALE_ALGORITHM_* constants - how ffmpeg scales videos down to the display
+    # frame_filters: list of dicts, the filters that post-process frames before they are shown. See:
+    #   self.set_frame_filters
     def __init__(
         self, color_mode = None, display_width = None, display_height = None,
         brightness = None, flip_x = False, flip_y = False, log_level = None,
         should_play_audio = True, should_save_video = False, should_check_playlist = False,
-        should_predownload_video = False,
+        should_predownload_video = False, output_backend = None, playback_clock = None, max_fps = None,
+        scale_algorithm = None, frame_filters = None,
     ):
         super().__init__(
-            color_mode, display_width, display_height, brightness, flip_x, flip_y, log_level
+            color_mode, display_width, display_height, brightness, flip_x, flip_y, log_level, output_backend
         )
         self.should_play_audio = should_play_audio
         self.should_save_video = should_save_video
         self.should_check_playlist = should_check_playlist
         self.should_predownload_video = should_predownload_video
+        if playback_clock is None:
+            playback_clock = self.DEFAULT_PLAYBACK_CLOCK
+        self.set_playback_clock(playback_clock)
+        self.max_fps = max_fps
+        if scale_algorithm is None:
+            scale_algorithm = self.DEFAULT_SCALE_ALGORITHM
+        self.set_scale_algorithm(scale_algorithm)
+        self.set_frame_filters(frame_filters)
+
+        # Cache settings describe the installation's disk rather than whatever is being played, so they are read from
+        # config.json even when the rest of the settings are specified on the command line. See: VideoCache
+        # cache_max_bytes: byte budget of the saved videos and the frame cache in the data directory
+        self.cache_max_bytes = self.DEFAULT_CACHE_MAX_BYTES
+        # cache_eviction_policy: one of the VideoCache.EVICTION_POLICY_* constants
+        self.set_cache_eviction_policy(self.DEFAULT_CACHE_EVICTION_POLICY)
+        # prefetch_num_videos: how many of the next videos in the queue to download while the current one plays. Only
+        #   used if should_save_video is set. Set to 0 to not prefetch. See: VideoPrefetcher
+        self.prefetch_num_videos = self.DEFAULT_PREFETCH_NUM_VIDEOS
+        # should_prefetch_frames: also convert prefetched videos into frames (see: FrameCache). This runs ffmpeg at the
+        #   lowest CPU priority while the current video plays.
+        self.should_prefetch_frames = False
+        # prefetch_max_download_rate: limits the download rate of prefetching, i.e. '1M' for 1 MB/s. See yt-dlp's
+        #   --limit-rate. If None, the rate isn't limited.
+        self.prefetch_max_download_rate = None
+        self.__set_cache_settings_from_config(self.get_values_from_config())
 
     def from_config(self):
         super().from_config()
@@ -35,6 +106,15 @@ class VideoSettings(LedSettings):
             self.should_save_video = config['should_save_video']
         if 'should_predownload_video' in config:
             self.should_predownload_video = config['should_predownload_video']
+        if 'playback_clock' in config:
+            self.set_playback_clock(config['playback_clock'])
+        if 'max_fps' in config:
+            self.max_fps = config['max_fps']
+        if 'scale_algorithm' in config:
+            self.set_scale_algorithm(config['scale_algorithm'])
+        if 'frame_filters' in config:
+            self.set_frame_filters(config['frame_filters'])
+        self.__set_cache_settings_from_config(config)
 
         return self
 
@@ -46,3 +126,60 @@ class VideoSettings(LedSettings):
 
     def get_values_from_config(self):
         return Config().get_video_settings()
+
+    def set_playback_clock(self, playback_clock):
+        playback_clock = playback_clock.lower()
+        if playback_clock in self.PLAYBACK_CLOCKS:
+            self.playback_clock = playback_clock
+        else:
+            self._logger.warning("Unknown playback_clock: {}. Using: {}."
+                .format(playback_clock, self.DEFAULT_PLAYBACK_CLOCK))
+            self.playback_clock = self.DEFAULT_PLAYBACK_CLOCK
+
+    def set_scale_algorithm(self, scale_algorithm):
+        scale_algorithm = scale_algorithm.lower()
+        if scale_algorithm in self.SCALE_ALGORITHMS:
+            self.scale_algorithm = scale_algorithm
+        else:
+            self._logger.warning("Unknown scale_algorithm: {}. Using: {}."
+                .format(scale_algorithm, self.DEFAULT_SCALE_ALGORITHM))
+            self.scale_algorithm = self.DEFAULT_SCALE_ALGORITHM
+
+    # frame_filters: list of dicts, in the order the filters are applied. Each has the filter's name, one of the
+    #   FRAME_FILTER_* constants, and optionally the filter's parameters, i.e. from config.json:
+    #
+    #   "frame_filters": [
+    #       {"name": "letterbox_crop"},
+    #       {"name": "temporal_smoothing", "strength": 0.6},
+    #       {"name": "saturation", "amount": 1.5}
+    #   ]
+    #
+    # See each filter's constructor for its parameters. Filters with an unknown name are ignored.
+    def set_frame_filters(self, frame_filters):
+        self.frame_filters = []
+        for frame_filter in frame_filters or []:
+            if frame_filter.get('name') in self.FRAME_FILTERS:
+                self.frame_filters.append(frame_filter)
+            else:
+                self._logger.warning("Unknown frame filter: {}. Ignoring it.".format(frame_filter))
+
+    def set_cache_eviction_policy(self, cache_eviction_policy):
+        cache_eviction_policy = cache_eviction_policy.lower()
+        if cache_eviction_policy in VideoCache.EVICTION_POLICIES:
+            self.cache_eviction_policy = cache_eviction_policy
+        else:
+            self._logger.warning("Unknown cache_eviction_policy: {}. Using: {}."
+                .format(cache_eviction_policy, self.DEFAULT_CACHE_EVICTION_POLICY))
+            self.cache_eviction_policy = self.DEFAULT_CACHE_EVICTION_POLICY
+
+    def __set_cache_settings_from_config(self, config):
+        if 'cache_max_bytes' in config:
+            self.cache_max_bytes = config['cache_max_bytes']
+        if 'cache_eviction_policy' in config:
+            self.set_cache_eviction_policy(config['cache_eviction_policy'])
+        if 'prefetch_num_videos' in config:
+            self.prefetch_num_videos = config['prefetch_num_videos']
+        if 'should_prefetch_frames' in config:
+            self.should_prefetch_frames = config['should_prefetch_frames']
+        if 'prefetch_max_download_rate' in config:
+            self.prefetch_max_download_rate = config['prefetch_max_download_rate']
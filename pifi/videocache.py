@@ -0,0 +1,243 @@
+import glob
+import json
+import os
+import threading
+import time
+import traceback
+from pifi.directoryutils import DirectoryUtils
+from pifi.framecache import FrameCache
+from pifi.logger import Logger
+import pifi.database
+
+# Keeps the data directory, where videos are cached, within a byte budget. See: VideoSettings.cache_max_bytes
+#
+# Two types of entries are cached:
+#   videos - the original video files, saved when VideoSettings.should_save_video is set
+#   frames - videos converted into frames for the display. See: FrameCache
+#
+# Each entry's size, last access time and number of hits are tracked in the DB. When the cache is over budget, entries
+# are evicted until it isn't, least recently used first (or least frequently used first, see:
+# VideoSettings.cache_eviction_policy). Files in the data directory that aren't tracked yet, i.e. videos saved before
+# their cache was tracked, are added to the DB when evicting, using their modification time as their last access time.
+#
+# Per entry type, the number of hits and misses and the number of bytes that hits saved are also tracked. A hit saves
+# the entry's size: that many bytes didn't need to be downloaded or transcoded. See: self.get_stats
+class VideoCache:
+
+    TYPE_VIDEO = 'video'
+    TYPE_FRAMES = 'frames'
+
+    TYPES = [TYPE_VIDEO, TYPE_FRAMES]
+
+    EVICTION_POLICY_LRU = 'lru' # least recently used
+    EVICTION_POLICY_LFU = 'lfu' # least frequently used
+
+    EVICTION_POLICIES = [EVICTION_POLICY_LRU, EVICTION_POLICY_LFU]
+
+    # See: VideoProcessor.__DEFAULT_VIDEO_EXTENSION
+    __VIDEO_GLOB = '*.mp4'
+
+    # Only one eviction runs at a time. See: self.evict_async
+    __eviction_lock = threading.Lock()
+
+    def __init__(self):
+        self.__cursor = pifi.database.Database().get_cursor()
+        self.__logger = Logger().set_namespace(self.__class__.__name__)
+
+    def construct(self):
+        self.__cursor.execute("DROP TABLE IF EXISTS video_cache_entries")
+        self.__cursor.execute("""
+            CREATE TABLE video_cache_entries (
+                cache_key TEXT PRIMARY KEY,
+                type VARCHAR(20),
+                url TEXT,
+                paths TEXT,
+                size_bytes INTEGER,
+                num_hits INTEGER DEFAULT 0,
+                last_access_time REAL,
+                create_date DATETIME DEFAULT CURRENT_TIMESTAMP
+            )""")
+
+        self.__cursor.execute("DROP TABLE IF EXISTS video_cache_stats")
+        self.__cursor.execute("""
+            CREATE TABLE video_cache_stats (
+                type VARCHAR(20) PRIMARY KEY,
+                num_hits INTEGER DEFAULT 0,
+                num_misses INTEGER DEFAULT 0,
+                num_bytes_saved INTEGER DEFAULT 0,
+                num_evictions INTEGER DEFAULT 0,
+                num_bytes_evicted INTEGER DEFAULT 0
+            )""")
+
+    # Tracks an entry that was just added to the cache.
+    #
+    # cache_type: one of the TYPE_* constants
+    # url: string - url of the video
+    # paths: list of strings - the entry's files. The first one is the entry's key. When the entry is evicted, the
+    #   files are deleted in order.
+    def add(self, cache_type, url, paths):
+        self.__cursor.execute(
+            ("INSERT INTO video_cache_entries (cache_key, type, url, paths, size_bytes, last_access_time) " +
+                "VALUES(?, ?, ?, ?, ?, ?) ON CONFLICT(cache_key) DO UPDATE SET " +
+                "size_bytes=excluded.size_bytes, last_access_time=excluded.last_access_time"),
+            [paths[0], cache_type, url, json.dumps(paths), self.__get_size(paths), time.time()]
+        )
+
+    # Records a hit of an entry. The entry is tracked if it wasn't already. See: self.add
+    def record_hit(self, cache_type, url, paths):
+        size_bytes = self.__get_size(paths)
+        self.__cursor.execute(
+            ("INSERT INTO video_cache_entries (cache_key, type, url, paths, size_bytes, num_hits, last_access_time) " +
+                "VALUES(?, ?, ?, ?, ?, 1, ?) ON CONFLICT(cache_key) DO UPDATE SET " +
+                "num_hits=num_hits + 1, size_bytes=excluded.size_bytes, last_access_time=excluded.last_access_time"),
+            [paths[0], cache_type, url, json.dumps(paths), size_bytes, time.time()]
+        )
+        self.__increment_stats(cache_type, num_hits = 1, num_bytes_saved = size_bytes)
+
+    def record_miss(self, cache_type):
+        self.__increment_stats(cache_type, num_misses = 1)
+
+    # Evicts entries in a background thread, so that playback isn't held up. If an eviction is already running, this
+    # does nothing.
+    #
+    # max_bytes: int - the cache's byte budget
+    # eviction_policy: one of the EVICTION_POLICY_* constants
+    def evict_async(self, max_bytes, eviction_policy):
+        if not self.__eviction_lock.acquire(blocking = False):
+            return
+
+        def evict():
+            try:
+                # the DB cursor is per thread, so create a new VideoCache in the eviction thread
+                VideoCache().evict(max_bytes, eviction_policy)
+            except Exception:
+                self.__logger.error('Caught exception evicting from the video cache: {}'.format(traceback.format_exc()))
+            finally:
+                self.__eviction_lock.release()
+
+        threading.Thread(target = evict, name = self.__class__.__name__ + '__evict', daemon = True).start()
+
+    # Evicts entries until the cache's total size is at most `max_bytes`. See: self.evict_async
+    #
+    # Returns the number of bytes evicted.
+    def evict(self, max_bytes, eviction_policy):
+        self.__track_untracked_entries()
+
+        order_by = "last_access_time ASC"
+        if eviction_policy == self.EVICTION_POLICY_LFU:
+            order_by = "num_hits ASC, last_access_time ASC"
+        self.__cursor.execute("SELECT * FROM video_cache_entries ORDER BY " + order_by)
+        entries = self.__cursor.fetchall()
+
+        total_bytes = sum(entry['size_bytes'] for entry in entries)
+        num_bytes_evicted = 0
+        for entry in entries:
+            if total_bytes <= max_bytes:
+                break
+            self.__logger.info("Evicting {} from the video cache ({} bytes, {} hits): {}"
+                .format(entry['type'], entry['size_bytes'], entry['num_hits'], entry['url']))
+            self.__delete_entry(entry)
+            self.__increment_stats(entry['type'], num_evictions = 1, num_bytes_evicted = entry['size_bytes'])
+            total_bytes -= entry['size_bytes']
+            num_bytes_evicted += entry['size_bytes']
+
+        self.__logger.info("Video cache size: {} bytes of {} bytes. Evicted {} bytes. Stats: {}"
+            .format(total_bytes, max_bytes, num_bytes_evicted, self.get_stats()))
+        return num_bytes_evicted
+
+    # Returns a dict of per entry type stats.
+    def get_stats(self):
+        stats = {}
+        for cache_type in self.TYPES:
+            stats[cache_type] = {
+                'num_entries': 0,
+                'size_bytes': 0,
+                'num_hits': 0,
+                'num_misses': 0,
+                'hit_ratio': None,
+                'num_bytes_saved': 0,
+                'num_evictions': 0,
+                'num_bytes_evicted': 0,
+            }
+
+        self.__cursor.execute(
+            "SELECT type, COUNT(*) AS num_entries, SUM(size_bytes) AS size_bytes FROM video_cache_entries GROUP BY type"
+        )
+        for row in self.__cursor.fetchall():
+            if row['type'] in stats:
+                stats[row['type']]['num_entries'] = row['num_entries']
+                stats[row['type']]['size_bytes'] = row['size_bytes']
+
+        self.__cursor.execute("SELECT * FROM video_cache_stats")
+        for row in self.__cursor.fetchall():
+            if row['type'] not in stats:
+                continue
+            type_stats = stats[row['type']]
+            for key in ['num_hits', 'num_misses', 'num_bytes_saved', 'num_evictions', 'num_bytes_evicted']:
+                type_stats[key] = row[key]
+            if type_stats['num_hits'] + type_stats['num_misses'] > 0:
+                type_stats['hit_ratio'] = type_stats['num_hits'] / (type_stats['num_hits'] + type_stats['num_misses'])
+        return stats
+
+    def __increment_stats(
+        self, cache_type, num_hits = 0, num_misses = 0, num_bytes_saved = 0, num_evictions = 0, num_bytes_evicted = 0
+    ):
+        self.__cursor.execute(
+            ("INSERT INTO video_cache_stats " +
+                "(type, num_hits, num_misses, num_bytes_saved, num_evictions, num_bytes_evicted) " +
+                "VALUES(?, ?, ?, ?, ?, ?) ON CONFLICT(type) DO UPDATE SET " +
+                "num_hits=num_hits + excluded.num_hits, num_misses=num_misses + excluded.num_misses, " +
+                "num_bytes_saved=num_bytes_saved + excluded.num_bytes_saved, " +
+                "num_evictions=num_evictions + excluded.num_evictions, " +
+                "num_bytes_evicted=num_bytes_evicted + excluded.num_bytes_evicted"),
+            [cache_type, num_hits, num_misses, num_bytes_saved, num_evictions, num_bytes_evicted]
+        )
+
+    # Adds entries whose files exist, but that aren't in the DB, and removes entries from the DB whose files no longer
+    # exist, i.e. because they were deleted by hand.
+    def __track_untracked_entries(self):
+        self.__cursor.execute("SELECT cache_key FROM video_cache_entries")
+        tracked_cache_keys = set(row['cache_key'] for row in self.__cursor.fetchall())
+
+        existing_entries = [
+            (self.TYPE_VIDEO, [path])
+            for path in glob.glob(glob.escape(DirectoryUtils().data_dir) + '/' + self.__VIDEO_GLOB)
+        ]
+        existing_entries += [(self.TYPE_FRAMES, paths) for paths in FrameCache().list_entries()]
+
+        for cache_type, paths in existing_entries:
+            cache_key = paths[0]
+            if cache_key in tracked_cache_keys:
+                tracked_cache_keys.remove(cache_key)
+                continue
+            try:
+                last_access_time = os.path.getmtime(cache_key)
+            except FileNotFoundError:
+                continue
+            self.__logger.info("Tracking {} that was already in the video cache: {}".format(cache_type, cache_key))
+            self.__cursor.execute(
+                ("INSERT OR IGNORE INTO video_cache_entries " +
+                    "(cache_key, type, url, paths, size_bytes, last_access_time) VALUES(?, ?, NULL, ?, ?, ?)"),
+                [cache_key, cache_type, json.dumps(paths), self.__get_size(paths), last_access_time]
+            )
+
+        for cache_key in tracked_cache_keys:
+            if not os.path.exists(cache_key):
+                self.__cursor.execute("DELETE FROM video_cache_entries WHERE cache_key = ?", [cache_key])
+
+    def __delete_entry(self, entry):
+        for path in json.loads(entry['paths']):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.__cursor.execute("DELETE FROM video_cache_entries WHERE cache_key = ?", [entry['cache_key']])
+
+    def __get_size(self, paths):
+        size_bytes = 0
+        for path in paths:
+            try:
+                size_bytes += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return size_bytes
@@ -0,0 +1,182 @@
+import json
+import subprocess
+import threading
+import time
+import traceback
+from pifi.directoryutils import DirectoryUtils
+from pifi.logger import Logger
+import pifi.database
+
+# A cache of the video metadata that youtube-dl's extract_info returns, keyed by url. Extracting the metadata takes a
+# couple seconds, so it is done at most once per TTL for each video. See: self.get_video_info
+#
+# Only the fields that we use are cached: fps, dimensions, audio codec, duration, and the resolved format (its id,
+# extension, and the url of the stream). The resolved stream url expires after a few hours, so entries expire too.
+#
+# The number of hits and misses is tracked. See: self.get_stats
+class VideoMetadataCache:
+
+    YOUTUBE_DL_FORMAT = 'worst[ext=mp4]/worst' # mp4 scales quicker than webm in ffmpeg scaling
+
+    # Youtube's stream urls expire after 6 hours (see their `expire` query parameter). Expire entries a bit earlier
+    # so that a cached stream url is always still valid.
+    __TTL_SECONDS = 5 * 60 * 60
+
+    __CACHED_FIELDS = ['fps', 'width', 'height', 'acodec', 'vcodec', 'duration', 'format_id', 'ext', 'url']
+
+    __STAT_NUM_HITS = 'num_hits'
+    __STAT_NUM_MISSES = 'num_misses'
+    __STAT_NUM_INVALIDATIONS = 'num_invalidations'
+
+    def __init__(self):
+        self.__cursor = pifi.database.Database().get_cursor()
+        self.__logger = Logger().set_namespace(self.__class__.__name__)
+
+    def construct(self):
+        self.__cursor.execute("DROP TABLE IF EXISTS video_metadata_cache")
+        self.__cursor.execute("""
+            CREATE TABLE video_metadata_cache (
+                url TEXT PRIMARY KEY,
+                metadata TEXT,
+                fetch_time REAL
+            )""")
+
+        self.__cursor.execute("DROP TABLE IF EXISTS video_metadata_cache_stats")
+        self.__cursor.execute("""
+            CREATE TABLE video_metadata_cache_stats (
+                stat_name VARCHAR(20) PRIMARY KEY,
+                value INTEGER DEFAULT 0
+            )""")
+
+    # Returns a dict of the video's metadata. See: self.__CACHED_FIELDS
+    #
+    # If the video's metadata isn't cached, it is downloaded from youtube, which takes a couple seconds. If that fails,
+    # youtube-dl is updated and the download is retried once. Raises if the retry fails too.
+    def get_video_info(self, url):
+        video_info = self.get(url)
+        if video_info is not None:
+            self.__increment_stat(self.__STAT_NUM_HITS)
+            return video_info
+
+        self.__increment_stat(self.__STAT_NUM_MISSES)
+        video_info = self.__extract_info(url)
+        self.__cursor.execute(
+            "INSERT OR REPLACE INTO video_metadata_cache (url, metadata, fetch_time) VALUES(?, ?, ?)",
+            [url, json.dumps(video_info), time.time()]
+        )
+        self.__delete_expired_entries()
+        return video_info
+
+    # Populates the cache in a background thread, so that the caller doesn't wait for youtube. Errors are logged.
+    def get_video_info_async(self, url):
+        def get_video_info():
+            try:
+                # the DB cursor is per thread, so create a new VideoMetadataCache in this thread
+                VideoMetadataCache().get_video_info(url)
+            except Exception:
+                self.__logger.error('Caught exception getting video info for {}: {}'.format(url, traceback.format_exc()))
+
+        threading.Thread(target = get_video_info, name = self.__class__.__name__ + '__get', daemon = True).start()
+
+    # Returns the video's cached metadata, or None if it isn't cached or has expired. Neither hits nor misses are
+    # recorded.
+    def get(self, url):
+        self.__cursor.execute(
+            "SELECT metadata FROM video_metadata_cache WHERE url = ? AND fetch_time > ?",
+            [url, time.time() - self.__TTL_SECONDS]
+        )
+        row = self.__cursor.fetchone()
+        if row is None:
+            return None
+        return json.loads(row['metadata'])
+
+    # Deletes every entry. Used when youtube-dl had to be updated, i.e. because youtube changed in a way that may
+    # have made the cached metadata stale.
+    def invalidate(self):
+        self.__cursor.execute("DELETE FROM video_metadata_cache")
+        self.__increment_stat(self.__STAT_NUM_INVALIDATIONS)
+
+    def get_stats(self):
+        stats = {
+            'num_entries': 0,
+            self.__STAT_NUM_HITS: 0,
+            self.__STAT_NUM_MISSES: 0,
+            'hit_ratio': None,
+            self.__STAT_NUM_INVALIDATIONS: 0,
+        }
+        self.__cursor.execute("SELECT COUNT(*) AS num_entries FROM video_metadata_cache")
+        stats['num_entries'] = self.__cursor.fetchone()['num_entries']
+        self.__cursor.execute("SELECT * FROM video_metadata_cache_stats")
+        for row in self.__cursor.fetchall():
+            if row['stat_name'] in stats:
+                stats[row['stat_name']] = row['value']
+        if stats[self.__STAT_NUM_HITS] + stats[self.__STAT_NUM_MISSES] > 0:
+            stats['hit_ratio'] = (
+                stats[self.__STAT_NUM_HITS] / (stats[self.__STAT_NUM_HITS] + stats[self.__STAT_NUM_MISSES])
+            )
+        return stats
+
+    def __extract_info(self, url):
+        # Imported here rather than at the top, so that every user of the DB doesn't need youtube-dl. See: Database
+        import youtube_dl
+
+        self.__logger.info("Downloading and populating video metadata...")
+        ydl_opts = {
+            'format': self.YOUTUBE_DL_FORMAT,
+            'logger': Logger(),
+            'restrictfilenames': True, # get rid of a warning ytdl gives about special chars in file names
+        }
+        ydl = youtube_dl.YoutubeDL(ydl_opts)
+
+        # Automatically try to update youtube-dl and retry failed youtube-dl operations when we get a youtube-dl
+        # error.
+        #
+        # The youtube-dl package needs updating periodically when youtube make updates. This is
+        # handled on a cron once a day: https://github.com/dasl-/pifi/blob/a614b33e1be093f6ee3bb62b036ee6472ffe5132/install/pifi_cron.sh#L5
+        #
+        # But we also attempt to update it on the fly here if we get youtube-dl errors when trying to play
+        # a video.
+        #
+        # Example of how this would look in logs: https://gist.github.com/dasl-/09014dca55a2e31bb7d27f1398fd8155
+        max_attempts = 2
+        for attempt in range(1, (max_attempts + 1)):
+            try:
+                video_info = ydl.extract_info(url, download = False)
+                break
+            except Exception as e:
+                caught_or_raising = "Raising"
+                if attempt < max_attempts:
+                    caught_or_raising = "Caught"
+                self.__logger.warning("Problem downloading video info during attempt {} of {}. {} exception: {}"
+                    .format(attempt, max_attempts, caught_or_raising, traceback.format_exc()))
+                if attempt < max_attempts:
+                    self.__logger.warning("Attempting to update youtube-dl before retrying download...")
+                    update_youtube_dl_output = (subprocess
+                        .check_output(
+                            'sudo ' + DirectoryUtils().root_dir + '/utils/update_youtube-dl.sh',
+                            shell = True,
+                            executable = '/bin/bash',
+                            stderr = subprocess.STDOUT
+                        )
+                        .decode("utf-8"))
+                    self.__logger.info("Update youtube-dl output: {}".format(update_youtube_dl_output))
+                    self.__logger.info("Invalidating the video metadata cache, which the old youtube-dl populated.")
+                    self.invalidate()
+                else:
+                    self.__logger.error("Unable to download video info after {} attempts.".format(max_attempts))
+                    raise e
+
+        self.__logger.info("Done downloading and populating video metadata.")
+        return {field: video_info.get(field) for field in self.__CACHED_FIELDS}
+
+    def __delete_expired_entries(self):
+        self.__cursor.execute(
+            "DELETE FROM video_metadata_cache WHERE fetch_time <= ?", [time.time() - self.__TTL_SECONDS]
+        )
+
+    def __increment_stat(self, stat_name):
+        self.__cursor.execute(
+            ("INSERT INTO video_metadata_cache_stats (stat_name, value) VALUES(?, 1) " +
+                "ON CONFLICT(stat_name) DO UPDATE SET value=value + 1"),
+            [stat_name]
+        )
@@ -1,156 +1,272 @@
+import math
+import time
 import numpy as np
-from apa102_pi.driver import apa102
 from pifi.gamma import Gamma
-from pifi.settings.ledsettings import LedSettings
+from pifi.gammaestimator import GammaEstimator
+from pifi.led.ledoutputfactory import LedOutputFactory
+from pifi.led.stripmapper import StripMapper
 
 class VideoPlayer:
 
-    # LED Settings
-    __MOSI_PIN = 10
-    __SCLK_PIN = 11
-    __LED_ORDER = 'rbg'
+    FADE_EASING_LINEAR = 'linear'
+    FADE_EASING_EASE_IN_OUT = 'ease_in_out'
+    FADE_EASINGS = [FADE_EASING_LINEAR, FADE_EASING_EASE_IN_OUT]
 
-    __FADE_STEPS = 5
+    # seconds
+    DEFAULT_FADE_DURATION = 0.1
+
+    __RGB_CHANNEL_OFFSETS = np.arange(3, dtype = np.intp)
+
+    # Each frame, the dither thresholds are shifted by this amount (mod 1). Stepping by the golden ratio spreads each
+    # LED's thresholds evenly over [0, 1) across consecutive frames. See: self.__get_precise_strip_pixels
+    __DITHER_PHASE_STEP = (math.sqrt(5) - 1) / 2
+
+    # What was last pushed to each output, by output. See: self.__get_output_key
+    #
+    # Several VideoPlayers push to the same LEDs, i.e. the Queue's, the game of life's, and each video's. If each of
+    # them remembered only what it pushed itself, a player could skip a frame that differs from what the LEDs show,
+    # because another player pushed something else in the meantime. See: self.__show
+    __last_shown_by_output = {}
+
+    # A frame that was pushed to an output.
+    class __ShownFrame:
+
+        def __init__(self):
+            self.pixels = None
+            self.brightness = None
+            self.time = 0
 
     def __init__(self, led_settings):
         self.__led_settings = led_settings
         self.__current_frame = None
-        self.__pixels = None
+        self.__led_output = None
         self.__gamma_controller = Gamma(self.__led_settings)
+        self.__strip_mapper = StripMapper(
+            self.__led_settings.display_width, self.__led_settings.display_height,
+            self.__led_settings.flip_x, self.__led_settings.flip_y, self.__led_settings.panels
+        )
 
-        # static gamma curve
-        self.__scale_red_gamma_curve = None
-        self.__scale_green_gamma_curve = None
-        self.__scale_blue_gamma_curve = None
+        # Gamma lookup table for our color mode, shape: (Gamma.NUM_GAMMA_CURVES, 256, 3).
+        # See: self.__get_strip_pixels
+        self.__gamma_lut = self.__gamma_controller.luts[self.__led_settings.color_mode]
 
-        # dynamic gamma curves
-        self.__scale_red_gamma_curves = None
-        self.__scale_green_gamma_curves = None
-        self.__scale_blue_gamma_curves = None
+        # Picks the dynamic gamma curve in monochrome color modes.
+        self.__gamma_estimator = GammaEstimator(self.__gamma_controller)
 
-        # Memoizing the specific gamma curve index for static gamma videos enables us to shave
-        # 1 or 2 milliseconds off the loop per frame. See: self.__set_frame_pixels
-        if self.__led_settings.is_color_mode_rgb():
-            # static gamma
-            self.__scale_red_gamma_curve = self.__gamma_controller.scale_red_curves[Gamma.DEFAULT_GAMMA_INDEX]
-            self.__scale_green_gamma_curve = self.__gamma_controller.scale_green_curves[Gamma.DEFAULT_GAMMA_INDEX]
-            self.__scale_blue_gamma_curve = self.__gamma_controller.scale_blue_curves[Gamma.DEFAULT_GAMMA_INDEX]
-        else:
-            # dynamic gamma
-            self.__scale_red_gamma_curves = self.__gamma_controller.scale_red_curves
-            self.__scale_green_gamma_curves = self.__gamma_controller.scale_green_curves
-            self.__scale_blue_gamma_curves = self.__gamma_controller.scale_blue_curves
-        self.__setup_pixels()
+        # More than 8 bits of output precision. See: self.__get_precise_strip_pixels
+        self.__should_use_per_pixel_brightness = (
+            self.__led_settings.should_use_per_pixel_brightness and self.__led_settings.brightness >= 1
+        )
+        self.__should_use_precise_output = self.__should_use_per_pixel_brightness or self.__led_settings.should_dither
+        if self.__should_use_precise_output:
+            self.__float_gamma_lut = self.__gamma_controller.float_luts[self.__led_settings.color_mode]
+            # A fixed random threshold per LED and color, so that neighboring LEDs don't all round up or down in the
+            # same frame.
+            self.__dither_thresholds = (
+                np.random.RandomState(0).random_sample((self.__strip_mapper.num_pixels, 3)).astype(np.float32)
+            )
+            self.__dither_phase = 0
+
+        # Where frames are sent, i.e. the LED strip. See: LedSettings.output_backend
+        self.__led_output = LedOutputFactory().create(self.__led_settings, self.__strip_mapper)
+
+        # What was last sent to the LEDs, by any VideoPlayer, to skip sending identical frames. See: self.__show
+        self.__black_pixels = np.zeros((self.__strip_mapper.num_pixels, 3), np.uint8)
+        self.__last_shown = self.__last_shown_by_output.setdefault(self.__get_output_key(), self.__ShownFrame())
+        self.__num_unchanged_frames_skipped = 0
 
     def clear_screen(self):
-        self.__pixels.clear_strip()
+        self.__show(self.__black_pixels)
 
     def play_frame(self, avg_color_frame):
-        self.__set_frame_pixels(avg_color_frame)
-        self.__pixels.show()
+        if self.__should_use_precise_output:
+            self.__show(*self.__get_precise_strip_pixels(avg_color_frame))
+        else:
+            self.__show(self.__get_strip_pixels(avg_color_frame))
+
+    # Frame counts and timings of the output backend. See: LedOutput.get_stats
+    def get_output_stats(self):
+        stats = self.__led_output.get_stats()
+        stats['unchanged_frames_skipped'] = self.__num_unchanged_frames_skipped
+        return stats
+
+    # Timings and the current gamma curve of the dynamic gamma used in monochrome color modes.
+    # See: GammaEstimator.get_stats
+    def get_gamma_stats(self):
+        return self.__gamma_estimator.get_stats()
+
+    def close(self):
+        self.__led_output.close()
 
-    def fade_to_frame(self, avg_color_frame):
+    # Fades from the last frame passed to this method to avg_color_frame over `duration` seconds. Intermediate frames
+    # are shown as fast as we can compute and push them, so the number of intermediate frames depends on how fast
+    # the hardware is rather than on a fixed number of steps.
+    #
+    # duration: float - length of the fade in seconds. Defaults to DEFAULT_FADE_DURATION.
+    # easing: one of the FADE_EASING_* constants. Defaults to FADE_EASING_LINEAR.
+    #
+    # Returns the number of intermediate frames that were shown within the duration.
+    def fade_to_frame(self, avg_color_frame, duration = None, easing = None):
         if (self.__current_frame is None):
             self.__current_frame = avg_color_frame
-            return self.play_frame(avg_color_frame)
+            self.play_frame(avg_color_frame)
+            return 0
+
+        if duration is None:
+            duration = self.DEFAULT_FADE_DURATION
+        if easing not in self.FADE_EASINGS:
+            easing = self.FADE_EASING_LINEAR
 
-        frame_steps = np.zeros([self.__led_settings.display_height, self.__led_settings.display_width, 3], np.int8)
+        start_frame = self.__current_frame.astype(np.float32)
+        frame_delta = avg_color_frame.astype(np.float32) - start_frame
+        intermediate_frame = np.empty_like(start_frame)
 
-        for x in range(self.__led_settings.display_width):
-            for y in range(self.__led_settings.display_height):
-                for rgb in range(0, 3):
-                    frame_steps[y, x, rgb] = ((avg_color_frame[y, x, rgb].astype(np.int16) - self.__current_frame[y, x, rgb].astype(np.int16)) / self.__FADE_STEPS).astype(np.int8)
+        num_intermediate_frames = 0
+        start_time = time.time()
+        while True:
+            progress = (time.time() - start_time) / duration if duration > 0 else 1
+            if progress >= 1:
+                break
+            if easing == self.FADE_EASING_EASE_IN_OUT:
+                progress = (1 - math.cos(math.pi * progress)) / 2
 
-        for current_step in range(1, self.__FADE_STEPS):
-            new_frame = np.zeros([self.__led_settings.display_height, self.__led_settings.display_width, 3], np.uint8)
-            for x in range(self.__led_settings.display_width):
-                for y in range(self.__led_settings.display_height):
-                    for rgb in range(0, 3):
-                        new_frame[y, x, rgb] = self.__current_frame[y, x, rgb] + (frame_steps[y, x, rgb] * current_step)
+            np.multiply(frame_delta, progress, out = intermediate_frame)
+            intermediate_frame += start_frame
+            np.rint(intermediate_frame, out = intermediate_frame)
 
             # no need to sleep since the above calculation takes some small amount of time
-            self.__set_frame_pixels(new_frame)
-            self.__pixels.show()
+            self.play_frame(intermediate_frame.astype(np.uint8))
+            num_intermediate_frames += 1
 
+        # Always finish exactly on the target frame.
         self.__current_frame = avg_color_frame
-        self.__set_frame_pixels(avg_color_frame)
-        self.__pixels.show()
-
-    def __setup_pixels(self):
-        # Add 8 because otherwise the last 8 LEDs don't powered correctly. Weird driver glitch?
-        self.__pixels = apa102.APA102(
-            num_led=(self.__led_settings.display_width * self.__led_settings.display_height + 8),
-            mosi=self.__MOSI_PIN,
-            sclk=self.__SCLK_PIN,
-            order=self.__LED_ORDER
+        self.play_frame(avg_color_frame)
+        return num_intermediate_frames
+
+    # Many things show the same frame over and over: the loading screen, the final states of a game of life, static
+    # or letterboxed video, etc. Pushing a frame to the LEDs is the most expensive part of playing it, so we skip
+    # pushes that wouldn't change anything. Frames are compared to the last frame pushed to the same LEDs by any
+    # VideoPlayer, not just by this one.
+    #
+    # An identical frame is still pushed if LedSettings.output_keep_alive_interval seconds have passed since the last
+    # push, in case the LEDs picked up any glitches in the meantime. See: https://github.com/dasl-/pifi/issues/6
+    # With the default interval, the Queue's once a second screen clears while the screensaver is off are pushed on
+    # purpose, for the same reason.
+    #
+    # Note that with LedSettings.should_dither, the pixels of a static frame change every frame, so they are never
+    # skipped.
+    def __show(self, pixels, brightness = None):
+        now = time.time()
+        last_shown = self.__last_shown
+        if (
+            self.__led_settings.should_skip_unchanged_frames and
+            last_shown.pixels is not None and
+            (
+                not self.__led_settings.output_keep_alive_interval or
+                (now - last_shown.time) < self.__led_settings.output_keep_alive_interval
+            ) and
+            np.array_equal(pixels, last_shown.pixels) and
+            (
+                (brightness is None and last_shown.brightness is None) or
+                (
+                    brightness is not None and last_shown.brightness is not None and
+                    np.array_equal(brightness, last_shown.brightness)
+                )
+            )
+        ):
+            self.__num_unchanged_frames_skipped += 1
+            return
+
+        self.__led_output.show(pixels, brightness)
+        if last_shown.pixels is None or last_shown.pixels.shape != pixels.shape:
+            last_shown.pixels = pixels.copy()
+        else:
+            np.copyto(last_shown.pixels, pixels)
+        last_shown.brightness = None if brightness is None else brightness.copy()
+        last_shown.time = now
+
+    # Returns a key that identifies the LEDs that self.__led_output pushes to. VideoPlayers with the same key push to
+    # the same LEDs.
+    def __get_output_key(self):
+        return (
+            self.__led_settings.output_backend, self.__led_settings.output_spi_bus,
+            self.__led_settings.output_spi_device
         )
-        self.__pixels.set_global_brightness(self.__led_settings.brightness)
-        self.__pixels.clear_strip()
-        return self.__pixels
 
     # CAUTION:
-    # This method has been heavily optimized. The program spends the bulk of its execution time in this loop.
-    # If making any changes, profile your code first to see if there are regressions, i.e.:
+    # The program spends the bulk of its execution time in this method. If making any changes, profile your code
+    # first to see if there are regressions, i.e.:
     #
     #   python3 -m cProfile -s cumtime video --url https://www.youtube.com/watch?v=AxuvUAjHYWQ --color-mode color
     #
-    # In the nested for loop, function calls are to be avoided. Inlining them is more performant.
+    # or run ./utils/benchmark_frame_mapping, or ./utils/benchmark_video_pipeline --profile
+    #
+    # Everything is done with whole frame numpy operations: the frame is first reordered to match the LEDs' order
+    # on the strip (see: StripMapper), and then gamma corrected with a single lookup. Avoid introducing any per pixel
+    # python code here.
+    #
+    # Returns a uint8 numpy array of shape (num_pixels, 3): gamma corrected (r, g, b) values in strip order.
+    def __get_strip_pixels(self, avg_color_frame):
+        strip_frame = self.__strip_mapper.map_frame(avg_color_frame)
+
+        # calculate gamma corrected colors
+        if self.__led_settings.is_color_mode_rgb():
+            # static gamma
+            # index into the flattened (256, 3) table: the offset of color c of value v is v * 3 + c
+            return self.__gamma_lut[Gamma.DEFAULT_GAMMA_INDEX].take(
+                strip_frame.astype(np.intp) * 3 + self.__RGB_CHANNEL_OFFSETS
+            )
+        else:
+            # dynamic gamma
+            gamma_index = self.__gamma_estimator.get_gamma_index(avg_color_frame)
+            return np.take(self.__gamma_lut[gamma_index], strip_frame, axis = 0)
+
+    # Like self.__get_strip_pixels, but computes the gamma corrected colors with more than 8 bits of precision:
+    #
+    # With LedSettings.should_use_per_pixel_brightness, the APA102's 5 bit per LED brightness is used in addition to
+    # its 8 bit colors. The light an LED emits is proportional to its brightness times its color, so we show each LED
+    # at the lowest brightness that can still reach its brightest color channel, and scale its colors up to match.
+    # Dark colors are thus shown with much finer steps than the global brightness alone would allow. At a global
+    # brightness of 31, this gives roughly 13 bits of effective depth.
+    #
+    # With LedSettings.should_dither, the colors are temporally dithered rather than rounded: each LED and color
+    # rounds up or down based on a threshold that moves every frame, such that on average over several frames, it
+    # shows the exact value of the gamma curve.
     #
-    # See: https://github.com/dasl-/pifi/commit/9640268084acb0c46b2624178f350017ab666d41
-    def __set_frame_pixels(self, avg_color_frame):
-        if not (self.__led_settings.is_color_mode_rgb()):
-            gamma_index = self.__gamma_controller.getGammaIndexForMonochromeFrame(avg_color_frame)
-
-        for x in range(self.__led_settings.display_width):
-            for y in range(self.__led_settings.display_height):
-                # calculate gamma corrected colors
-                if self.__led_settings.color_mode == LedSettings.COLOR_MODE_COLOR:
-                    r, g, b = [
-                        self.__scale_red_gamma_curve[avg_color_frame[y, x, 0]],
-                        self.__scale_green_gamma_curve[avg_color_frame[y, x, 1]],
-                        self.__scale_blue_gamma_curve[avg_color_frame[y, x, 2]]
-                    ]
-                elif self.__led_settings.color_mode == LedSettings.COLOR_MODE_R:
-                    r = self.__scale_red_gamma_curves[gamma_index][avg_color_frame[y, x]]
-                    g, b = [0, 0]
-                elif self.__led_settings.color_mode == LedSettings.COLOR_MODE_G:
-                    g = self.__scale_green_gamma_curves[gamma_index][avg_color_frame[y, x]]
-                    r, b = [0, 0]
-                elif self.__led_settings.color_mode == LedSettings.COLOR_MODE_B:
-                    b = self.__scale_blue_gamma_curves[gamma_index][avg_color_frame[y, x]]
-                    r, g = [0, 0]
-                elif self.__led_settings.color_mode == LedSettings.COLOR_MODE_BW:
-                    r, g, b = [
-                        self.__scale_red_gamma_curves[gamma_index][avg_color_frame[y, x]],
-                        self.__scale_green_gamma_curves[gamma_index][avg_color_frame[y, x]],
-                        self.__scale_blue_gamma_curves[gamma_index][avg_color_frame[y, x]]
-                    ]
-                elif self.__led_settings.color_mode == LedSettings.COLOR_MODE_INVERT_COLOR:
-                    r, g, b = [
-                        self.__scale_red_gamma_curve[255 - avg_color_frame[y, x, 0]],
-                        self.__scale_green_gamma_curve[255 - avg_color_frame[y, x, 1]],
-                        self.__scale_blue_gamma_curve[255 - avg_color_frame[y, x, 2]]
-                    ]
-                elif self.__led_settings.color_mode == LedSettings.COLOR_MODE_INVERT_BW:
-                    r, g, b = [
-                        self.__scale_red_gamma_curves[gamma_index][255 - avg_color_frame[y, x]],
-                        self.__scale_green_gamma_curves[gamma_index][255 - avg_color_frame[y, x]],
-                        self.__scale_blue_gamma_curves[gamma_index][255 - avg_color_frame[y, x]]
-                    ]
-                else:
-                    raise Exception('Unexpected color mode: {}'.format(self.__led_settings.color_mode))
-
-                # set pixel
-                if (self.__led_settings.flip_x):
-                    x = self.__led_settings.display_width - x - 1
-                if (self.__led_settings.flip_y):
-                    y = self.__led_settings.display_height - y - 1
-
-                # each row is zig-zagged, so every other row needs to be flipped horizontally
-                if (y % 2 == 0):
-                    pixel_index = (y * self.__led_settings.display_width) + (self.__led_settings.display_width - x - 1)
-                else:
-                    pixel_index = (y * self.__led_settings.display_width) + x
-
-                # order on the strip is RBG (refer to self.__LED_ORDER)
-                self.__pixels.set_pixel(pixel_index, r, b, g)
+    # As in self.__get_strip_pixels, this uses whole frame numpy operations only. Measure the cost with
+    # ./utils/benchmark_bit_depth
+    #
+    # Returns a tuple of:
+    #   a uint8 numpy array of shape (num_pixels, 3): gamma corrected (r, g, b) values in strip order
+    #   a uint8 numpy array of shape (num_pixels,) of per LED brightness values, or None
+    def __get_precise_strip_pixels(self, avg_color_frame):
+        strip_frame = self.__strip_mapper.map_frame(avg_color_frame)
+
+        # float32 gamma corrected colors, in the range [0, 255], at the global brightness
+        if self.__led_settings.is_color_mode_rgb():
+            colors = self.__float_gamma_lut[Gamma.DEFAULT_GAMMA_INDEX].take(
+                strip_frame.astype(np.intp) * 3 + self.__RGB_CHANNEL_OFFSETS
+            )
+        else:
+            gamma_index = self.__gamma_estimator.get_gamma_index(avg_color_frame)
+            colors = np.take(self.__float_gamma_lut[gamma_index], strip_frame, axis = 0)
+
+        brightness = None
+        if self.__should_use_per_pixel_brightness:
+            max_brightness = self.__led_settings.brightness
+            brightness = np.ceil(colors.max(axis = 1) * (max_brightness / 255))
+            np.clip(brightness, 1, max_brightness, out = brightness)
+            colors *= (max_brightness / brightness)[:, np.newaxis]
+            brightness = brightness.astype(np.uint8)
+
+        if self.__led_settings.should_dither:
+            self.__dither_phase = (self.__dither_phase + self.__DITHER_PHASE_STEP) % 1
+            thresholds = self.__dither_thresholds + np.float32(self.__dither_phase)
+            np.mod(thresholds, 1, out = thresholds)
+            colors += thresholds
+            np.floor(colors, out = colors)
+        else:
+            np.rint(colors, out = colors)
+        np.clip(colors, 0, 255, out = colors)
+
+        return colors.astype(np.uint8), brightness
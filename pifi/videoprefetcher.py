@@ -0,0 +1,128 @@
+import glob
+import os
+import threading
+import time
+import traceback
+from pifi.datastructure.limitedsizedict import LimitedSizeDict
+from pifi.directoryutils import DirectoryUtils
+from pifi.logger import Logger
+from pifi.playlist import Playlist
+from pifi.settings.videosettings import VideoSettings
+from pifi.videoprocessor import VideoProcessor
+
+# Downloads the next videos in the queue while the current one plays, so that they start without waiting for the
+# download (and maybe ffmpeg, see: VideoSettings.should_prefetch_frames). See: VideoProcessor.prefetch
+#
+# A background thread polls the queue. The next VideoSettings.prefetch_num_videos videos are prefetched one at a
+# time. If the video being prefetched stops being one of the next videos because it was removed from the queue, its
+# prefetch is cancelled. If it stops being one because it started playing, playback cancels the prefetch itself, as
+# soon as it starts, and streams the video instead. See: VideoProcessor.process_and_play
+#
+# Prefetched videos are saved like any other saved video, so prefetching requires VideoSettings.should_save_video.
+class VideoPrefetcher:
+
+    # Incomplete files are written here rather than in the data directory. See: VideoProcessor.prefetch
+    __TEMP_DIRECTORY = 'prefetch'
+
+    # seconds
+    __POLL_INTERVAL = 1
+
+    # A video being prefetched.
+    class __Job:
+
+        def __init__(self, playlist_video_id, video_processor, thread):
+            self.playlist_video_id = playlist_video_id
+            self.video_processor = video_processor
+            self.thread = thread
+
+    def __init__(self):
+        self.__logger = Logger().set_namespace(self.__class__.__name__)
+        self.__video_settings = VideoSettings().from_config()
+        self.__temp_directory = DirectoryUtils().data_dir + '/' + self.__TEMP_DIRECTORY
+        self.__job = None
+
+        # playlist_video_ids that have been prefetched, or attempted to be. They aren't attempted again.
+        self.__attempted_playlist_video_ids = LimitedSizeDict(capacity = 100)
+
+    def start(self):
+        if not self.__video_settings.should_save_video or self.__video_settings.prefetch_num_videos <= 0:
+            self.__logger.info("Not prefetching videos: it requires should_save_video and prefetch_num_videos > 0.")
+            return
+
+        threading.Thread(target = self.__run, name = self.__class__.__name__, daemon = True).start()
+
+    def __run(self):
+        self.__delete_temp_files()
+
+        # the DB cursor is per thread, so create the Playlist in this thread
+        playlist = Playlist()
+        while True:
+            try:
+                self.__prefetch_next_videos(playlist)
+            except Exception:
+                self.__logger.error('Caught exception: {}'.format(traceback.format_exc()))
+            time.sleep(self.__POLL_INTERVAL)
+
+    def __prefetch_next_videos(self, playlist):
+        queue = playlist.get_queue()
+        next_videos = [
+            playlist_item for playlist_item in queue
+            if playlist_item['status'] == Playlist.STATUS_QUEUED and playlist_item['type'] == Playlist.TYPE_VIDEO
+        ][:self.__video_settings.prefetch_num_videos]
+        next_playlist_video_ids = [playlist_item['playlist_video_id'] for playlist_item in next_videos]
+        playing_playlist_video_ids = [
+            playlist_item['playlist_video_id'] for playlist_item in queue
+            if playlist_item['status'] == Playlist.STATUS_PLAYING
+        ]
+
+        if self.__job is not None:
+            if not self.__job.thread.is_alive():
+                self.__job = None
+            else:
+                if (
+                    self.__job.playlist_video_id not in next_playlist_video_ids and
+                    self.__job.playlist_video_id not in playing_playlist_video_ids
+                ):
+                    self.__logger.info(("Cancelling prefetch of playlist_video_id {}: it is no longer one of the " +
+                        "next videos in the queue.").format(self.__job.playlist_video_id))
+                    self.__job.video_processor.cancel_prefetch()
+                return
+
+        for playlist_item in next_videos:
+            if playlist_item['playlist_video_id'] not in self.__attempted_playlist_video_ids:
+                self.__start_job(playlist_item)
+                return
+
+    def __start_job(self, playlist_item):
+        playlist_video_id = playlist_item['playlist_video_id']
+        self.__attempted_playlist_video_ids[playlist_video_id] = True
+
+        video_settings = VideoSettings().from_playlist_item_in_queue(playlist_item)
+        # the video isn't playing, so there is nothing to skip
+        video_settings.should_check_playlist = False
+        video_settings.should_save_video = True
+        video_processor = VideoProcessor(video_settings)
+        thread = threading.Thread(
+            target = self.__prefetch, args = (video_processor, playlist_item['url']),
+            name = self.__class__.__name__ + '__' + str(playlist_video_id), daemon = True
+        )
+        self.__job = self.__Job(playlist_video_id, video_processor, thread)
+        thread.start()
+
+    def __prefetch(self, video_processor, url):
+        try:
+            video_processor.prefetch(
+                url, self.__video_settings.should_prefetch_frames, self.__temp_directory,
+                self.__video_settings.prefetch_max_download_rate
+            )
+        except Exception:
+            self.__logger.error('Caught exception prefetching {}: {}'.format(url, traceback.format_exc()))
+
+    # Deletes incomplete files left behind by the previous process, i.e. if it died while prefetching.
+    def __delete_temp_files(self):
+        os.makedirs(self.__temp_directory, exist_ok = True)
+        for path in glob.glob(glob.escape(self.__temp_directory) + '/*'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
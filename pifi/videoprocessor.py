@@ -1,39 +1,71 @@
+import glob
+import json
 import numpy as np
 import time
 import os
 import sys
-import youtube_dl
 import subprocess
 import math
 import shlex
-import tempfile
 import hashlib
 import select
-import signal
 import random
 import string
+import threading
 import traceback
 
 from pifi.logger import Logger
-from pifi.datastructure.readoncecircularbuffer import ReadOnceCircularBuffer
+from pifi.clock.audioplaybackclock import AudioPlaybackClock
+from pifi.clock.wallplaybackclock import WallPlaybackClock
+from pifi.datastructure.frameringbuffer import FrameRingBuffer
+from pifi.framecache import FrameCache
+from pifi.framefilter.framefilterfactory import FrameFilterFactory
+from pifi.framescheduler import FrameScheduler
+from pifi.framesource.framedownscaler import FrameDownscaler
+from pifi.pipelinesupervisor import PipelineSupervisor
 from pifi.settings.videosettings import VideoSettings
+from pifi.videocache import VideoCache
+from pifi.videometadatacache import VideoMetadataCache
 from pifi.directoryutils import DirectoryUtils
 from pifi.playlist import Playlist
 
 class VideoProcessor:
 
-    __DATA_DIRECTORY = 'data'
-
-    __YOUTUBE_DL_FORMAT = 'worst[ext=mp4]/worst' # mp4 scales quicker than webm in ffmpeg scaling
+    __YOUTUBE_DL_FORMAT = VideoMetadataCache.YOUTUBE_DL_FORMAT
     __DEFAULT_VIDEO_EXTENSION = '.mp4'
     __TEMP_VIDEO_DOWNLOAD_SUFFIX = '.dl_part'
 
-    __FFMPEG_TO_PYTHON_FIFO_PREFIX = 'pifi_ffmpeg_to_python_fifo__'
+    # Size of the buffer of each of the video pipeline's sinks. See: PipelineSupervisor
+    __PIPELINE_BUFFER_SIZE_BYTES = 1024 * 1024 * 10
 
     __FRAMES_BUFFER_LENGTH = 1024
 
+    # seconds
+    __SKIP_CHECK_INTERVAL = 0.1
+
+    # seconds. How often to check the playback clock while it doesn't know its position yet. See: AudioPlaybackClock
+    __CLOCK_POLL_INTERVAL = 0.01
+
+    # seconds. With the wall clock, how long to give ffplay to start playing the audio before the video starts.
+    __AUDIO_START_DELAY_SECONDS = 0.15
+
+    # Weight of the latest measurement in the moving average of how long playing a frame takes. See: self.__play_video
+    __PLAY_FRAME_SECONDS_SMOOTHING = 0.1
+
+    # Loading screen frames, by path. Each is loaded from disk once per process. See: self.__show_loading_screen
+    __loading_screens = {}
+
+    # The VideoProcessors that are prefetching videos in this process, by url.
+    # See: self.prefetch and self.__cancel_prefetch_of_video
+    __prefetches_in_progress = {}
+    __prefetches_in_progress_lock = threading.Lock()
+
     def __init__(self, video_settings, playlist_video_id = None):
         self.__url = None
+
+        # seconds into the video to start playing it from. See: self.process_and_play
+        self.__start_position = 0
+
         self.__playlist = None
         self.__playlist_video_id = None
         self.__video_settings = video_settings
@@ -49,39 +81,321 @@ class VideoProcessor:
 
         # True if the video already exists (see: VideoSettings.should_save_video)
         self.__is_video_already_downloaded = False
-        self.__was_video_skipped = False
+
+        # Tracks hits, misses and additions to the video cache, if the video is saved (see: VideoSettings.should_save_video)
+        self.__video_cache = None
+
+        # Set if the video's frames are already in the frame cache. See: FrameCache
+        self.__frame_cache = None
+        self.__frame_cache_entry = None
+
+        # Process that writes the video's audio track to the frame cache, while its frames are cached.
+        self.__frame_cache_audio_process = None
+
+        # The ffmpeg video filter that converts the video into frames for the display, and the fps of the frames if
+        # the filter caps it. See: self.__init_video_filter
+        self.__video_filter = None
+        self.__capped_fps = None
+
+        # Process that probes the video's fps. See: self.__get_probed_fps
+        self.__ffprobe_process = None
+
+        # Process that plays the video's audio, if it is played.
+        self.__ffplay_process = None
+
+        # Drive the video's playback, and measure how well it keeps up. See: self.get_playback_stats
+        self.__playback_clock = None
+        self.__frame_scheduler = None
+
+        # Moving average of how long filtering a frame, converting it, and pushing it to the LEDs takes.
+        # See: self.__play_video
+        self.__avg_play_frame_seconds = 0
+
+        # More playback stats. See: self.get_playback_stats
+        self.__process_and_play_start_time = None
+        self.__time_to_first_frame = None
+        self.__vid_processing_lag_counter = 0
+
+        # List of tuples of the name and duration of each stage between process_and_play being called and the first
+        # frame being shown. See: self.__record_startup_stage
+        self.__startup_timeline = []
+        self.__startup_stage_start_time = None
+
+        # Stats of the last video pipeline. See: PipelineSupervisor.get_stats
+        self.__pipeline_stats = None
+
+        # Post-processes each frame before it is shown. See: VideoSettings.frame_filters
+        self.__frame_filter_chain = FrameFilterFactory().create(self.__video_settings)
+
+        # Set while playing a frame source. See: self.play_frame_source
+        self.__frame_source = None
+        self.__frame_downscaler = None
+
+        # Set while prefetching the video. See: self.prefetch
+        self.__prefetch_temp_directory = None
+        self.__prefetch_max_download_rate = None
+        self.__prefetch_pipeline_supervisor = None
+        self.__is_prefetch_cancelled = False
 
         log_namespace_unique_id = ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(5))
         self.__logger = Logger().set_namespace(self.__class__.__name__ + "__" + log_namespace_unique_id)
 
-    def process_and_play(self, url, video_player):
-        self.__logger.info("Starting process_and_play for url: {}, VideoSettings: {}".format(url, vars(self.__video_settings)))
+    # url: string - youtube url of the video, or the path of a local video file. Local video files are never cached.
+    # start_position: float - seconds into the video to start playing it from, i.e. to resume a video that was
+    #   pre-empted by a game. If the video is skipped, the position it was skipped at is recorded in the playlist.
+    #   See: Playlist.set_resume_position
+    def process_and_play(self, url, video_player, start_position = 0):
+        self.__logger.info("Starting process_and_play for url: {}, start_position: {}, VideoSettings: {}"
+            .format(url, start_position, vars(self.__video_settings)))
+        self.__process_and_play_start_time = time.time()
+        self.__startup_stage_start_time = self.__process_and_play_start_time
+        self.__startup_timeline = []
         self.__show_loading_screen(video_player)
+        self.__record_startup_stage('loading_screen')
         self.__url = url
+        self.__start_position = start_position or 0
+        self.__init_video_filter()
         video_save_path = self.__get_video_save_path()
 
-        if os.path.isfile(video_save_path):
-            self.__logger.info('Video has already been downloaded. Using saved video: {}'.format(video_save_path))
+        if self.__video_settings.should_save_video and not self.__is_local_video_file():
+            self.__cancel_prefetch_of_video()
+            self.__video_cache = VideoCache()
+            self.__frame_cache = FrameCache()
+            self.__frame_cache_entry = self.__frame_cache.get(
+                self.__url, self.__video_settings.display_width, self.__video_settings.display_height,
+                self.__get_pix_fmt(), self.__video_filter
+            )
+            if self.__frame_cache_entry:
+                self.__video_cache.record_hit(VideoCache.TYPE_FRAMES, self.__url, self.__get_frame_cache_entry_paths())
+            else:
+                self.__video_cache.record_miss(VideoCache.TYPE_FRAMES)
+        self.__record_startup_stage('cache_lookup')
+
+        if self.__frame_cache_entry:
+            self.__logger.info('Video frames have already been cached. Playing cached frames.')
+        elif self.__is_local_video_file():
+            self.__logger.info('Playing local video file: {}'.format(self.__url))
             self.__is_video_already_downloaded = True
-        elif self.__video_settings.should_predownload_video:
-            download_command = self.__download_youtube_video()
-            self.__logger.info('Downloading video: {}'.format(download_command))
-            subprocess.call(download_command, shell=True)
-            self.__logger.info('Video download complete: {}'.format(video_save_path))
+        elif os.path.isfile(video_save_path):
+            self.__logger.info('Video has already been downloaded. Using saved video: {}'.format(video_save_path))
             self.__is_video_already_downloaded = True
+            if self.__video_cache:
+                self.__video_cache.record_hit(VideoCache.TYPE_VIDEO, self.__url, [video_save_path])
+        else:
+            if self.__video_cache:
+                self.__video_cache.record_miss(VideoCache.TYPE_VIDEO)
+            if self.__video_settings.should_predownload_video:
+                download_command = self.__download_youtube_video()
+                self.__logger.info('Downloading video: {}'.format(download_command))
+                subprocess.call(download_command, shell=True)
+                self.__logger.info('Video download complete: {}'.format(video_save_path))
+                self.__is_video_already_downloaded = True
+                self.__record_startup_stage('predownload')
 
         self.__process_and_play_video(video_player)
         video_player.clear_screen()
         self.__logger.info("Finished process_and_play")
 
+    # Plays frames from an in-process source, i.e. a camera, rather than from a video. The frames are scaled down to
+    # the display (see: FrameDownscaler), and paced, skipped, and shown the same way a video's frames are. Plays until
+    # the source runs out of frames or the playlist item is skipped.
+    #
+    # frame_source: FrameSource
+    def play_frame_source(self, frame_source, video_player):
+        self.__logger.info("Starting play_frame_source for source: {}, VideoSettings: {}"
+            .format(frame_source.__class__.__name__, vars(self.__video_settings)))
+        self.__process_and_play_start_time = time.time()
+        self.__time_to_first_frame = None
+        self.__frame_source = frame_source
+        self.__frame_downscaler = FrameDownscaler(
+            self.__video_settings.display_width, self.__video_settings.display_height,
+            self.__video_settings.is_color_mode_rgb()
+        )
+        fps = frame_source.get_fps()
+        frame_length = None
+        if fps is not None:
+            frame_length = 1 / fps
+        self.__frame_scheduler = FrameScheduler(late_threshold = None if frame_length is None else frame_length / 2)
+        self.__playback_clock = WallPlaybackClock()
+
+        last_skip_check_time = 0
+        try:
+            for frame_index, frame in enumerate(frame_source.get_frames()):
+                t = time.time()
+                if (t - last_skip_check_time) >= self.__SKIP_CHECK_INTERVAL:
+                    if self.__maybe_skip_video():
+                        break
+                    last_skip_check_time = t
+
+                if frame_length is None:
+                    # A live source: show each frame as soon as the source yields it.
+                    presentation_time = t
+                else:
+                    if not self.__playback_clock.is_started():
+                        self.__playback_clock.start()
+                    # Same as self.__play_video: frames that could only be shown late are dropped without ever being
+                    # scaled down.
+                    position = self.__playback_clock.get_position()
+                    if position + self.__avg_play_frame_seconds >= (frame_index + 1) * frame_length:
+                        self.__frame_scheduler.record_frames_dropped(1)
+                        continue
+                    presentation_time = self.__playback_clock.get_time_at_position(frame_index * frame_length)
+                    self.__frame_scheduler.wait(None, presentation_time - self.__avg_play_frame_seconds)
+
+                play_frame_start = time.perf_counter()
+                video_player.play_frame(self.__frame_filter_chain.apply(self.__frame_downscaler.downscale(frame)))
+                if self.__time_to_first_frame is None:
+                    self.__time_to_first_frame = time.time() - self.__process_and_play_start_time
+                self.__avg_play_frame_seconds += (
+                    self.__PLAY_FRAME_SECONDS_SMOOTHING *
+                    (time.perf_counter() - play_frame_start - self.__avg_play_frame_seconds)
+                )
+                self.__frame_scheduler.record_frame_shown(presentation_time)
+        finally:
+            frame_source.close()
+            self.__logger.info("Playback stats: {}".format(self.get_playback_stats()))
+
+        video_player.clear_screen()
+        self.__logger.info("Finished play_frame_source")
+
+    # Downloads the video, and maybe converts it into frames, without playing it. Playing the video later then
+    # doesn't wait for the download (see: VideoSettings.should_save_video), nor for ffmpeg (see: FrameCache). This is
+    # used to prefetch the next videos in the queue while the current one plays. See: VideoPrefetcher
+    #
+    # The download and ffmpeg are niced so that they don't compete with the video that is playing.
+    #
+    # should_convert_to_frames: boolean
+    # temp_directory: string - where incomplete files are written to. They must not be in the data directory, where
+    #   the pre-cleanup of the video that is playing would delete them.
+    # max_download_rate: string - passed to yt-dlp's --limit-rate, i.e. '1M'. If None, the rate isn't limited.
+    def prefetch(self, url, should_convert_to_frames, temp_directory, max_download_rate = None):
+        self.__url = url
+        self.__init_video_filter()
+        self.__prefetch_temp_directory = temp_directory
+        self.__prefetch_max_download_rate = max_download_rate
+        self.__video_cache = VideoCache()
+        self.__frame_cache = FrameCache()
+        self.__frame_cache_entry = self.__frame_cache.get(
+            self.__url, self.__video_settings.display_width, self.__video_settings.display_height,
+            self.__get_pix_fmt(), self.__video_filter
+        )
+        self.__is_video_already_downloaded = os.path.isfile(self.__get_video_save_path())
+        if self.__frame_cache_entry or (self.__is_video_already_downloaded and not should_convert_to_frames):
+            self.__logger.info("Video has already been prefetched: {}".format(url))
+            return
+
+        self.__logger.info("Prefetching video: {}".format(url))
+        with self.__prefetches_in_progress_lock:
+            self.__prefetches_in_progress[url] = self
+        try:
+            self.__prefetch(should_convert_to_frames)
+        finally:
+            with self.__prefetches_in_progress_lock:
+                if self.__prefetches_in_progress.get(url) is self:
+                    del self.__prefetches_in_progress[url]
+        if self.__is_prefetch_cancelled:
+            self.__logger.info("Cancelled prefetching video: {}".format(url))
+        else:
+            self.__logger.info("Finished prefetching video: {}".format(url))
+
+    # Stops self.prefetch, which may be running in another thread. Its incomplete files are deleted.
+    def cancel_prefetch(self):
+        self.__is_prefetch_cancelled = True
+        if self.__prefetch_pipeline_supervisor is not None:
+            self.__prefetch_pipeline_supervisor.terminate()
+
+    # Downloads the video, and maybe converts it into frames. See: self.prefetch
+    def __prefetch(self, should_convert_to_frames):
+        fps = None
+        frame_cache_writer = None
+        if should_convert_to_frames:
+            frame_cache_writer = self.__frame_cache.create_writer(
+                self.__url, self.__video_settings.display_width, self.__video_settings.display_height,
+                self.__get_pix_fmt(), self.__video_filter, temp_directory = self.__prefetch_temp_directory
+            )
+
+        pipeline_supervisor, ffmpeg_output = self.__start_pipeline(frame_cache_writer)
+        self.__prefetch_pipeline_supervisor = pipeline_supervisor
+        if self.__is_prefetch_cancelled:
+            # cancelled while the pipeline was starting
+            pipeline_supervisor.terminate()
+        try:
+            if ffmpeg_output is not None:
+                fps = self.__get_output_fps()
+                frame_shape = [self.__video_settings.display_height, self.__video_settings.display_width]
+                if self.__video_settings.is_color_mode_rgb():
+                    frame_shape.append(3)
+                frames = FrameRingBuffer(1, frame_shape)
+                while frames.readinto(ffmpeg_output):
+                    frame_cache_writer.append(frames[len(frames) - 1])
+        except Exception:
+            pipeline_supervisor.terminate()
+            raise
+        finally:
+            if ffmpeg_output is not None:
+                ffmpeg_output.close()
+            self.__do_post_cleanup(pipeline_supervisor, frame_cache_writer, fps)
+
+    # Returns stats about how well the video's playback kept up: how long it took until the first frame was shown, how
+    # many frames were shown, late, or dropped, and how far the playback clock drifted from the wall clock.
+    # See: FrameScheduler and PlaybackClock
+    def get_playback_stats(self):
+        stats = {}
+        if self.__frame_scheduler:
+            stats.update(self.__frame_scheduler.get_stats())
+        if self.__playback_clock:
+            stats.update(self.__playback_clock.get_stats())
+        stats['avg_play_frame_ms'] = self.__avg_play_frame_seconds * 1000
+        stats['time_to_first_frame_ms'] = None if self.__time_to_first_frame is None else self.__time_to_first_frame * 1000
+        stats['vid_processing_lag_counter'] = self.__vid_processing_lag_counter
+        stats['startup_timeline_ms'] = {stage: seconds * 1000 for stage, seconds in self.__startup_timeline}
+        stats['frame_filters'] = self.__frame_filter_chain.get_stats()
+        if self.__frame_source:
+            stats.update(self.__frame_source.get_stats())
+            stats.update(self.__frame_downscaler.get_stats())
+        return stats
+
+    # Returns the stats of the processes that downloaded, converted, and played the video, or None if they haven't
+    # finished yet. See: PipelineSupervisor.get_stats
+    def get_pipeline_stats(self):
+        return self.__pipeline_stats
+
     def __show_loading_screen(self, video_player):
         filename = 'loading_screen_monochrome.npy'
         if self.__video_settings.is_color_mode_rgb():
             filename = 'loading_screen_color.npy'
         loading_screen_path = DirectoryUtils().root_dir + '/' + filename
-        video_player.play_frame(np.load(loading_screen_path))
+        loading_screen = self.__loading_screens.get(loading_screen_path)
+        if loading_screen is None:
+            loading_screen = np.load(loading_screen_path)
+            # it is shared by every VideoProcessor, so make sure it is never modified
+            loading_screen.flags.writeable = False
+            self.__loading_screens[loading_screen_path] = loading_screen
+        video_player.play_frame(loading_screen)
+
+    # If the video is being prefetched (see: VideoPrefetcher), i.e. because it started playing before its prefetch
+    # finished, cancels the prefetch, and the video is streamed instead. The prefetch's download is rate limited and
+    # niced, and with VideoSettings.should_prefetch_frames it converts the whole video before its files are cached,
+    # so waiting for it could show the loading screen for far longer than streaming the video takes to start.
+    # Streaming saves the video and caches its frames, just like the prefetch would have.
+    def __cancel_prefetch_of_video(self):
+        with self.__prefetches_in_progress_lock:
+            video_processor = self.__prefetches_in_progress.get(self.__url)
+        if video_processor is None:
+            return
+
+        self.__logger.info("Video is being prefetched. Cancelling the prefetch to stream the video instead: {}"
+            .format(self.__url))
+        video_processor.cancel_prefetch()
 
-    # Lazily populate video_info from youtube. This takes a couple seconds.
+    # Records that the startup stage `stage` just ended. Its duration is the time since the previous stage ended.
+    def __record_startup_stage(self, stage):
+        now = time.time()
+        self.__startup_timeline.append((stage, now - self.__startup_stage_start_time))
+        self.__startup_stage_start_time = now
+
+    # Lazily populate video_info from youtube. This takes a couple seconds, unless the video's metadata is cached.
+    # See: VideoMetadataCache
     def __get_video_info(self):
         if self.__is_video_already_downloaded:
             raise Exception('We should avoid populating video metadata from youtube if the video already ' +
@@ -90,50 +404,7 @@ class VideoProcessor:
         if self.__video_info:
             return self.__video_info
 
-        self.__logger.info("Downloading and populating video metadata...")
-        ydl_opts = {
-            'format': self.__YOUTUBE_DL_FORMAT,
-            'logger': Logger(),
-            'restrictfilenames': True, # get rid of a warning ytdl gives about special chars in file names
-        }
-        ydl = youtube_dl.YoutubeDL(ydl_opts)
-
-        # Automatically try to update youtube-dl and retry failed youtube-dl operations when we get a youtube-dl
-        # error.
-        #
-        # The youtube-dl package needs updating periodically when youtube make updates. This is
-        # handled on a cron once a day: https://github.com/dasl-/pifi/blob/a614b33e1be093f6ee3bb62b036ee6472ffe5132/install/pifi_cron.sh#L5
-        #
-        # But we also attempt to update it on the fly here if we get youtube-dl errors when trying to play
-        # a video.
-        #
-        # Example of how this would look in logs: https://gist.github.com/dasl-/09014dca55a2e31bb7d27f1398fd8155
-        max_attempts = 2
-        for attempt in range(1, (max_attempts + 1)):
-            try:
-                self.__video_info = ydl.extract_info(self.__url, download = False)
-            except Exception as e:
-                caught_or_raising = "Raising"
-                if attempt < max_attempts:
-                    caught_or_raising = "Caught"
-                self.__logger.warning("Problem downloading video info during attempt {} of {}. {} exception: {}"
-                    .format(attempt, max_attempts, caught_or_raising, traceback.format_exc()))
-                if attempt < max_attempts:
-                    self.__logger.warning("Attempting to update youtube-dl before retrying download...")
-                    update_youtube_dl_output = (subprocess
-                        .check_output(
-                            'sudo ' + DirectoryUtils().root_dir + '/utils/update_youtube-dl.sh',
-                            shell = True,
-                            executable = '/bin/bash',
-                            stderr = subprocess.STDOUT
-                        )
-                        .decode("utf-8"))
-                    self.__logger.info("Update youtube-dl output: {}".format(update_youtube_dl_output))
-                else:
-                    self.__logger.error("Unable to download video info after {} attempts.".format(max_attempts))
-                    raise e
-
-        self.__logger.info("Done downloading and populating video metadata.")
+        self.__video_info = VideoMetadataCache().get_video_info(self.__url)
 
         video_type = 'video_only'
         if self.__video_info['acodec'] != 'none':
@@ -149,8 +420,17 @@ class VideoProcessor:
             hashlib.md5(self.__url.encode('utf-8')).hexdigest() + self.__DEFAULT_VIDEO_EXTENSION
         )
 
+    # Returns the path of the video file to play, if the video was already downloaded.
+    def __get_video_file_path(self):
+        if self.__is_local_video_file():
+            return self.__url
+        return self.__get_video_save_path()
+
+    def __is_local_video_file(self):
+        return os.path.isfile(self.__url)
+
     def __get_data_directory(self):
-        save_dir = DirectoryUtils().root_dir + '/' + self.__DATA_DIRECTORY
+        save_dir = DirectoryUtils().data_dir
         os.makedirs(save_dir, exist_ok=True)
         return save_dir
 
@@ -159,68 +439,98 @@ class VideoProcessor:
             return
 
         self.__do_pre_cleanup()
+        self.__record_startup_stage('pre_cleanup')
 
-        fps = None
-        try:
-            fps = self.__calculate_fps()
-        except subprocess.CalledProcessError as ex:
-            self.__logger.error("Got an error calculating fps: " + str(ex))
-            return
-
-        ffmpeg_to_python_fifo_name = self.__make_ffmpeg_to_python_fifo()
-
-        if self.__maybe_skip_video():
-            return
-
-        process_and_play_vid_cmd = self.__get_process_and_play_vid_cmd(ffmpeg_to_python_fifo_name)
-        self.__logger.info('executing process and play cmd: ' + process_and_play_vid_cmd)
-        process_and_play_vid_proc = subprocess.Popen(
-            process_and_play_vid_cmd, shell = True, executable = '/bin/bash', start_new_session = True
-        )
-        # Store the PGID separately, because attempting to get the PGID later via `os.getpgid` can
-        # raise `ProcessLookupError: [Errno 3] No such process` if the process is no longer running
-        process_and_play_vid_proc_pgid = os.getpgid(process_and_play_vid_proc.pid)
-
-        bytes_per_frame = self.__video_settings.display_width * self.__video_settings.display_height
-        np_array_shape = [self.__video_settings.display_height, self.__video_settings.display_width]
-        if self.__video_settings.is_color_mode_rgb():
-            bytes_per_frame = bytes_per_frame * 3
-            np_array_shape.append(3)
-
-        vid_start_time = None
         last_skip_check_time = 0
-        frame_length = 1 / fps
         last_frame = None
+        is_skipped = False
         vid_processing_lag_counter = 0
-        is_ffmpeg_done_outputting = False
-        avg_color_frames = ReadOnceCircularBuffer(self.__FRAMES_BUFFER_LENGTH)
-        ffmpeg_to_python_fifo = open(ffmpeg_to_python_fifo_name, 'rb')
-        while True:
-            t = time.time()
-            if (t - last_skip_check_time) > 0.100:
-                if self.__maybe_skip_video(process_and_play_vid_proc_pgid):
-                    break
-                last_skip_check_time = t
-
-            if is_ffmpeg_done_outputting or avg_color_frames.is_full():
-                pass
-            else:
-                is_ffmpeg_done_outputting, vid_start_time = self.__populate_avg_color_frames(
-                    avg_color_frames, ffmpeg_to_python_fifo, vid_start_time, bytes_per_frame, np_array_shape
+        fps = None
+        frame_cache_writer = None
+        if self.__frame_cache_entry:
+            fps = self.__frame_cache_entry.fps
+            pipeline_supervisor, ffmpeg_output = self.__start_cached_audio_pipeline(), None
+            # Seek inside the cached frames. Slicing the memory map doesn't read any of the skipped frames.
+            avg_color_frames = self.__frame_cache_entry.frames[round(self.__start_position * fps):]
+            is_ffmpeg_done_outputting = True
+        else:
+            # The frames of a video that doesn't start at the beginning are incomplete, so they aren't cached.
+            if self.__frame_cache and not self.__start_position:
+                frame_cache_writer = self.__frame_cache.create_writer(
+                    self.__url, self.__video_settings.display_width, self.__video_settings.display_height,
+                    self.__get_pix_fmt(), self.__video_filter
                 )
+            pipeline_supervisor, ffmpeg_output = self.__start_pipeline(frame_cache_writer)
+
+            frame_shape = [self.__video_settings.display_height, self.__video_settings.display_width]
+            if self.__video_settings.is_color_mode_rgb():
+                frame_shape.append(3)
+            avg_color_frames = FrameRingBuffer(self.__FRAMES_BUFFER_LENGTH, frame_shape)
+            is_ffmpeg_done_outputting = False
+        self.__record_startup_stage('pipeline_start')
+        self.__playback_clock = self.__create_playback_clock()
+        if self.__frame_cache_entry:
+            # All the frames are available up front, so there is nothing to read and the video can start right away.
+            self.__playback_clock.start()
+        try:
+            if fps is None:
+                fps = self.__get_output_fps()
+                self.__record_startup_stage('fps_probe')
+            frame_length = 1 / fps
+            self.__frame_scheduler = FrameScheduler(late_threshold = frame_length / 2)
+            while True:
+                t = time.time()
+                if (t - last_skip_check_time) >= self.__SKIP_CHECK_INTERVAL:
+                    if self.__maybe_skip_video(pipeline_supervisor):
+                        is_skipped = True
+                        break
+                    last_skip_check_time = t
+
+                should_read_frames = not (is_ffmpeg_done_outputting or avg_color_frames.is_full())
+                if should_read_frames:
+                    is_ffmpeg_done_outputting = self.__populate_avg_color_frames(
+                        avg_color_frames, ffmpeg_output, frame_cache_writer
+                    )
+                    should_read_frames = not (is_ffmpeg_done_outputting or avg_color_frames.is_full())
 
-            if vid_start_time is None:
-                # video has not started being processed yet
-                pass
-            else:
-                is_video_done_playing, last_frame, vid_processing_lag_counter = self.__play_video(
-                    video_player, avg_color_frames, vid_start_time, frame_length, is_ffmpeg_done_outputting,
-                    last_frame, vid_processing_lag_counter
+                next_frame_time = None
+                if not self.__playback_clock.is_started():
+                    # video has not started being processed yet
+                    pass
+                else:
+                    is_video_done_playing, last_frame, vid_processing_lag_counter = self.__play_video(
+                        video_player, avg_color_frames, frame_length, is_ffmpeg_done_outputting,
+                        last_frame, vid_processing_lag_counter
+                    )
+                    if is_video_done_playing:
+                        break
+                    next_frame_time = self.__get_next_frame_time(
+                        avg_color_frames, frame_length, is_ffmpeg_done_outputting, last_frame
+                    )
+
+                # Sleep until there is something to do
+                next_skip_check_time = None
+                if self.__video_settings.should_check_playlist:
+                    next_skip_check_time = last_skip_check_time + self.__SKIP_CHECK_INTERVAL
+                self.__frame_scheduler.wait(
+                    ffmpeg_output if should_read_frames else None, next_frame_time, next_skip_check_time
                 )
-                if is_video_done_playing:
-                    break
 
-        self.__do_post_cleanup(process_and_play_vid_proc)
+            if is_skipped:
+                # Resume from here if the video is played again. See: Queue.__reenqueue_or_end_playlist_item
+                resume_position = self.__start_position
+                if last_frame is not None:
+                    resume_position += last_frame * frame_length
+                self.__logger.info("Video was skipped at position: {:.2f} s.".format(resume_position))
+                self.__playlist.set_resume_position(self.__playlist_video_id, resume_position)
+        except Exception:
+            pipeline_supervisor.terminate()
+            raise
+        finally:
+            self.__vid_processing_lag_counter = vid_processing_lag_counter
+            if ffmpeg_output is not None:
+                ffmpeg_output.close()
+            self.__do_post_cleanup(pipeline_supervisor, frame_cache_writer, fps)
 
     def __download_youtube_video(self):
         return (
@@ -232,43 +542,62 @@ class VideoProcessor:
             shlex.quote(self.__url) # url to download
         )
 
-    def __populate_avg_color_frames(
-        self, avg_color_frames, ffmpeg_to_python_fifo, vid_start_time, bytes_per_frame, np_array_shape
-    ):
-        is_ready_to_read, ignore1, ignore2 = select.select([ffmpeg_to_python_fifo], [], [], 0)
+    # Returns True if ffmpeg is done outputting frames.
+    def __populate_avg_color_frames(self, avg_color_frames, ffmpeg_output, frame_cache_writer):
+        is_ready_to_read, ignore1, ignore2 = select.select([ffmpeg_output], [], [], 0)
         if not is_ready_to_read:
-            return [False, vid_start_time]
+            return False
 
-        ffmpeg_output = ffmpeg_to_python_fifo.read(bytes_per_frame)
-        if ffmpeg_output and len(ffmpeg_output) < bytes_per_frame:
-            raise Exception('Expected {} bytes from ffmpeg output, but got {}.'.format(bytes_per_frame, len(ffmpeg_output)))
-        if not ffmpeg_output:
+        # read the frame straight into the buffer, without allocating anything
+        if not avg_color_frames.readinto(ffmpeg_output):
             self.__logger.info("no ffmpeg_output, end of video processing.")
-            if vid_start_time is None:
+            if not self.__playback_clock.is_started():
                 # under rare circumstances, youtube-dl might fail and we end up in this code path.
-                self.__logger.error("No vid_start_time set. Possible yt-dl crash. See: https://github.com/ytdl-org/youtube-dl/issues/24780")
-                vid_start_time = 0 # set this so that __process_and_play_video doesn't endlessly loop
-            return [True, vid_start_time]
-
-        if vid_start_time is None:
-            # Start the video clock as soon as we see ffmpeg output. Ffplay probably sent its
-            # first audio data at around the same time so they stay in sync.
-            # Add time for better audio / video sync
-            vid_start_time = time.time() + (0.15 if self.__video_settings.should_play_audio else 0)
-
-        avg_color_frames.append(
-            np.frombuffer(ffmpeg_output, np.uint8).reshape(np_array_shape)
-        )
-        return [False, vid_start_time]
+                self.__logger.error("Playback clock was never started. Possible yt-dl crash. See: https://github.com/ytdl-org/youtube-dl/issues/24780")
+                self.__playback_clock.start() # start it so that __process_and_play_video doesn't endlessly loop
+            return True
+
+        if frame_cache_writer:
+            frame_cache_writer.append(avg_color_frames.newest())
+
+        if not self.__playback_clock.is_started():
+            # Start the playback clock as soon as we see ffmpeg output.
+            self.__playback_clock.start()
+
+        return False
+
+    # Returns the PlaybackClock that drives the video's playback. See: VideoSettings.playback_clock
+    def __create_playback_clock(self):
+        if self.__ffplay_process is None:
+            return WallPlaybackClock()
+        if self.__video_settings.playback_clock == VideoSettings.PLAYBACK_CLOCK_AUDIO:
+            return AudioPlaybackClock(self.__ffplay_process)
+        # Give ffplay time to start playing the audio, for better audio / video sync
+        return WallPlaybackClock(delay_seconds = self.__AUDIO_START_DELAY_SECONDS)
 
     def __play_video(
-        self, video_player, avg_color_frames, vid_start_time, frame_length, is_ffmpeg_done_outputting,
+        self, video_player, avg_color_frames, frame_length, is_ffmpeg_done_outputting,
         last_frame, vid_processing_lag_counter
     ):
-        cur_frame = max(math.floor((time.time() - vid_start_time) / frame_length), 0)
+        position = self.__playback_clock.get_position()
+        if position is None:
+            # waiting for the audio to start playing
+            return [False, last_frame, vid_processing_lag_counter]
+
+        # Pick the frame that should be showing by the time it has been converted and pushed to the LEDs, rather than
+        # the one that should be showing now. Frames before it could only be shown late, so they are dropped without
+        # ever being converted.
+        cur_frame = max(math.floor((position + self.__avg_play_frame_seconds) / frame_length), 0)
+        if last_frame is not None:
+            # Never go back to an earlier frame. The frame we pick can move backwards: an AudioPlaybackClock's
+            # position jumps back when a report from ffplay lands behind its extrapolation, and the average time to
+            # play a frame shrinks after a slow frame. Earlier frames are already gone from the ring buffer.
+            cur_frame = max(cur_frame, last_frame)
         if cur_frame >= len(avg_color_frames):
             if is_ffmpeg_done_outputting:
                 self.__logger.info("Video done playing. Video processing lag counter: {}.".format(vid_processing_lag_counter))
+                if not self.__video_settings.is_color_mode_rgb():
+                    self.__logger.info("Dynamic gamma stats: {}".format(video_player.get_gamma_stats()))
                 return [True, cur_frame, vid_processing_lag_counter]
             else:
                 vid_processing_lag_counter += 1
@@ -284,66 +613,150 @@ class VideoProcessor:
             return [False, cur_frame, vid_processing_lag_counter]
 
         # Play the new frame
-        num_skipped_frames = 0
+        num_dropped_frames = 0
         if last_frame is None:
             if cur_frame != 0:
-                num_skipped_frames = cur_frame
+                num_dropped_frames = cur_frame
         elif cur_frame - last_frame > 1:
-            num_skipped_frames = cur_frame - last_frame - 1
-        if num_skipped_frames > 0:
-            self.__logger.error(
-                ("Video playing unable to keep up in real-time. Skipped playing {} frame(s)."
-                    .format(num_skipped_frames))
+            num_dropped_frames = cur_frame - last_frame - 1
+        if num_dropped_frames > 0:
+            self.__frame_scheduler.record_frames_dropped(num_dropped_frames)
+            self.__logger.warning(
+                ("Video playing unable to keep up in real-time. Dropped {} frame(s)."
+                    .format(num_dropped_frames))
             )
-        video_player.play_frame(avg_color_frames[cur_frame])
+        play_frame_start = time.perf_counter()
+        video_player.play_frame(self.__frame_filter_chain.apply(avg_color_frames[cur_frame]))
+        if last_frame is None:
+            self.__time_to_first_frame = time.time() - self.__process_and_play_start_time
+            self.__record_startup_stage('first_frame')
+            self.__logger.info("Startup timeline: {}. Time to first frame: {:.1f} ms.".format(
+                ', '.join('{}: {:.1f} ms'.format(stage, seconds * 1000) for stage, seconds in self.__startup_timeline),
+                self.__time_to_first_frame * 1000
+            ))
+        self.__avg_play_frame_seconds += (
+            self.__PLAY_FRAME_SECONDS_SMOOTHING * (time.perf_counter() - play_frame_start - self.__avg_play_frame_seconds)
+        )
+        self.__frame_scheduler.record_frame_shown(self.__playback_clock.get_time_at_position(cur_frame * frame_length))
         return [False, cur_frame, vid_processing_lag_counter]
 
-    def __get_process_and_play_vid_cmd(self, ffmpeg_to_python_fifo_name):
-        video_save_path = self.__get_video_save_path()
-        vid_data_cmd = None
+    # Returns the unix timestamp at which the frame after last_frame should start being played, or None if we are
+    # waiting for ffmpeg to output that frame.
+    def __get_next_frame_time(self, avg_color_frames, frame_length, is_ffmpeg_done_outputting, last_frame):
+        next_frame = 0 if last_frame is None else last_frame + 1
+        if next_frame >= len(avg_color_frames) and not is_ffmpeg_done_outputting:
+            return None
+        next_frame_time = self.__playback_clock.get_time_at_position(next_frame * frame_length)
+        if next_frame_time is None:
+            # the clock doesn't know its position yet, i.e. because the audio hasn't started playing
+            return time.time() + self.__CLOCK_POLL_INTERVAL
+        return next_frame_time - self.__avg_play_frame_seconds
+
+    # Starts the processes that download (or read) the video, convert it into frames, play its audio, and maybe save
+    # it. See: PipelineSupervisor
+    #
+    # frame_cache_writer: FrameCache.Writer, or None. If set, the video's audio track is written to the frame cache.
+    #
+    # Returns a tuple of the PipelineSupervisor and the file to read ffmpeg's output frames from. When prefetching
+    # without converting the video into frames, ffmpeg isn't run and the file is None.
+    def __start_pipeline(self, frame_cache_writer):
+        pipeline_supervisor = PipelineSupervisor()
+
+        ffmpeg_output = None
+        if not self.__is_prefetching() or frame_cache_writer:
+            ffmpeg_cmd = self.__maybe_nice(self.__get_ffmpeg_cmd())
+            self.__logger.info('Starting ffmpeg: {}'.format(ffmpeg_cmd))
+            ffmpeg_output = pipeline_supervisor.add_process_sink(
+                'ffmpeg', shlex.split(ffmpeg_cmd), self.__PIPELINE_BUFFER_SIZE_BYTES, stdout = subprocess.PIPE
+            ).stdout
+
+            # If the fps is capped, ffmpeg outputs frames at the capped fps, so there is nothing to probe.
+            if not self.__capped_fps:
+                # Probe the fps from the same stream, rather than fetching the video a second time just to probe it.
+                # ffprobe exits once it has read the stream's header, so it isn't required to accept the whole stream.
+                # See: self.__get_probed_fps
+                ffprobe_cmd = self.__get_ffprobe_cmd()
+                self.__logger.info('Starting ffprobe: {}'.format(ffprobe_cmd))
+                self.__ffprobe_process = pipeline_supervisor.add_process_sink(
+                    'ffprobe', shlex.split(ffprobe_cmd), self.__PIPELINE_BUFFER_SIZE_BYTES, stdout = subprocess.PIPE,
+                    is_required = False
+                )
+
+        if self.__video_settings.should_play_audio and not self.__is_prefetching():
+            # Buffer the audio separately because ffplay only accepts input as fast as it plays the audio, i.e. in
+            # real-time. Otherwise it would block ffmpeg from processing the frames as fast as it otherwise could. This
+            # prevents us from building up a big enough buffer in the avg_color_frames circular buffer to withstand
+            # blips in performance. This ensures the circular buffer will generally get filled, rather than lingering
+            # around only ~70 frames full. Makes it less likely that we will fall behind in video processing.
+            self.__add_ffplay_sink(pipeline_supervisor)
+
+        if self.__should_save_video():
+            self.__logger.info('Video will be saved to: {}'.format(self.__get_video_save_path()))
+            pipeline_supervisor.add_file_sink(
+                'save_video', self.__get_temp_video_save_path(), self.__PIPELINE_BUFFER_SIZE_BYTES
+            )
+
+        if frame_cache_writer:
+            # Videos without audio make this process fail, so it isn't required to succeed.
+            frame_cache_audio_cmd = self.__maybe_nice(self.__get_frame_cache_audio_cmd(frame_cache_writer.audio_path))
+            self.__logger.info('Caching audio: {}'.format(frame_cache_audio_cmd))
+            self.__frame_cache_audio_process = pipeline_supervisor.add_process_sink(
+                'frame_cache_audio', shlex.split(frame_cache_audio_cmd), self.__PIPELINE_BUFFER_SIZE_BYTES,
+                is_required = False
+            )
+
         if self.__is_video_already_downloaded:
-            vid_data_cmd = '< {} '.format(shlex.quote(video_save_path))
+            pipeline_supervisor.start_with_source_file('video_file', self.__get_video_file_path())
         else:
-            vid_data_cmd = (
-                # Add mbuffer to give some slack in the case of network blips downloading the video.
-                self.__get_youtube_dl_cmd() + ' | ' +
-                self.__get_mbuffer_cmd(1024 * 1024 * 10, '/tmp/mbuffer-ytdl.out') + ' | '
-            )
+            youtube_dl_cmd = self.__get_youtube_dl_cmd()
+            self.__logger.info('Starting yt-dlp: {}'.format(youtube_dl_cmd))
+            pipeline_supervisor.start_with_source_process('yt-dlp', shlex.split(youtube_dl_cmd))
+
+        return pipeline_supervisor, ffmpeg_output
+
+    # Starts playing the audio of a video whose frames are cached.
+    #
+    # Returns the PipelineSupervisor
+    def __start_cached_audio_pipeline(self):
+        pipeline_supervisor = PipelineSupervisor()
+        audio_path = self.__frame_cache_entry.audio_path
+        if self.__video_settings.should_play_audio and audio_path is not None:
+            self.__add_ffplay_sink(pipeline_supervisor)
+            pipeline_supervisor.start_with_source_file('cached_audio_file', audio_path)
+        return pipeline_supervisor
+
+    def __add_ffplay_sink(self, pipeline_supervisor):
+        # ffplay reports the position of the audio on stderr. See: AudioPlaybackClock
+        should_report_position = self.__video_settings.playback_clock == VideoSettings.PLAYBACK_CLOCK_AUDIO
+        ffplay_cmd = self.__get_ffplay_cmd(should_report_position)
+        self.__logger.info('Starting ffplay: {}'.format(ffplay_cmd))
+        self.__ffplay_process = pipeline_supervisor.add_process_sink(
+            'ffplay', shlex.split(ffplay_cmd), self.__PIPELINE_BUFFER_SIZE_BYTES,
+            stderr = subprocess.PIPE if should_report_position else None
+        )
 
-        maybe_play_audio_tee = ''
-        if self.__video_settings.should_play_audio:
-            # Add mbuffer because otherwise the ffplay command blocks the whole pipeline. Because
-            # audio can only play in real-time, this would block ffmpeg from processing the frames
-            # as fast as it otherwise could. This prevents us from building up a big enough buffer
-            # in the avg_color_frames circular buffer to withstand blips in performance. This
-            # ensures the circular buffer will generally get filled, rather than lingering around
-            # only ~70 frames full. Makes it less likely that we will fall behind in video
-            # processing.
-            maybe_play_audio_tee = (">(" +
-                self.__get_mbuffer_cmd(1024 * 1024 * 10, '/tmp/mbuffer-ffplay.out') + ' | ' +
-                self.__get_ffplay_cmd() +
-                ") ")
-
-        ffmpeg_tee = f'>( {self.__get_ffmpeg_cmd()} > {ffmpeg_to_python_fifo_name}) '
-
-        maybe_save_video_tee = ''
-        maybe_mv_saved_video_cmd = ''
-        if self.__video_settings.should_save_video and not self.__is_video_already_downloaded:
-            self.__logger.info('Video will be saved to: {}'.format(video_save_path))
-            temp_video_save_path = video_save_path + self.__TEMP_VIDEO_DOWNLOAD_SUFFIX
-            maybe_save_video_tee = shlex.quote(temp_video_save_path) + ' '
-            maybe_mv_saved_video_cmd = '&& mv ' + shlex.quote(temp_video_save_path) + ' ' + shlex.quote(video_save_path)
-
-        process_and_play_vid_cmd = (
-            'set -o pipefail && export SHELLOPTS && ' +
-            vid_data_cmd + "tee " +
-            maybe_play_audio_tee +
-            ffmpeg_tee +
-            maybe_save_video_tee +
-            "> /dev/null " +
-            maybe_mv_saved_video_cmd
+    def __should_save_video(self):
+        return (
+            self.__video_settings.should_save_video and not self.__is_video_already_downloaded and
+            not self.__frame_cache_entry
         )
-        return process_and_play_vid_cmd
+
+    def __get_temp_video_save_path(self):
+        if self.__is_prefetching():
+            return (
+                self.__prefetch_temp_directory + '/' + os.path.basename(self.__get_video_save_path()) +
+                self.__TEMP_VIDEO_DOWNLOAD_SUFFIX
+            )
+        return self.__get_video_save_path() + self.__TEMP_VIDEO_DOWNLOAD_SUFFIX
+
+    def __is_prefetching(self):
+        return self.__prefetch_temp_directory is not None
+
+    # Run prefetching at the lowest CPU priority, so that it doesn't slow down the video that is playing.
+    def __maybe_nice(self, cmd):
+        if self.__is_prefetching():
+            return 'nice -n 19 ' + cmd
+        return cmd
 
     def __get_youtube_dl_cmd(self):
         if self.__video_settings.log_level == VideoSettings.LOG_LEVEL_VERBOSE:
@@ -353,6 +766,9 @@ class VideoProcessor:
         log_opts = ''
         if not sys.stderr.isatty():
             log_opts = '--newline '
+        rate_limit_opts = ''
+        if self.__prefetch_max_download_rate is not None:
+            rate_limit_opts = '--limit-rate ' + shlex.quote(str(self.__prefetch_max_download_rate)) + ' '
         return (
             'yt-dlp ' +
             '--output - ' + # output to stdout
@@ -361,14 +777,22 @@ class VideoProcessor:
             '--retries infinite ' + # in case downloading has transient errors
             log_level +
             log_opts +
+            rate_limit_opts +
             shlex.quote(self.__url) # url to download
         )
 
-    def __get_ffmpeg_cmd(self):
-        pix_fmt = 'gray'
+    def __get_frame_cache_entry_paths(self):
+        return self.__frame_cache.get_entry_paths(
+            self.__url, self.__video_settings.display_width, self.__video_settings.display_height,
+            self.__get_pix_fmt()
+        )
+
+    def __get_pix_fmt(self):
         if self.__video_settings.is_color_mode_rgb():
-            pix_fmt = 'rgb24'
+            return 'rgb24'
+        return 'gray'
 
+    def __get_ffmpeg_cmd(self):
         # unfortunately there's no way to make ffmpeg output its stats progress stuff with line breaks
         log_opts = ''
         if sys.stderr.isatty():
@@ -376,123 +800,195 @@ class VideoProcessor:
 
         # Note: don't use ffmpeg's `-xerror` flag:
         # https://gist.github.com/dasl-/1ad012f55f33f14b44393960f66c6b00
+        # Start at the start position. ffmpeg can't seek in its input, which is a pipe, so it decodes the video from the
+        # beginning and drops the frames before the start position.
+        seek_opts = ''
+        if self.__start_position:
+            seek_opts = '-ss {} '.format(self.__start_position)
+
         return (
             'ffmpeg ' +
             '-threads 1 ' + # using one thread is plenty fast and is probably better to avoid tying up CPUs for displaying LEDs
+            seek_opts +
             '-i pipe:0 ' + # read input video from stdin
-            '-filter:v ' + shlex.quote( # resize video
-                'scale=' + str(self.__video_settings.display_width) + 'x' + str(self.__video_settings.display_height)) + " "
+            '-filter:v ' + shlex.quote(self.__video_filter) + " " + # maybe cap the fps, and resize video
             '-c:a copy ' + # don't process the audio at all
-            '-f rawvideo -pix_fmt ' + shlex.quote(pix_fmt) + " " # output in numpy compatible byte format
+            '-f rawvideo -pix_fmt ' + shlex.quote(self.__get_pix_fmt()) + " " # output in numpy compatible byte format
             '-v quiet ' + # supress output of verbose ffmpeg configuration, etc
             log_opts + # maybe display progress stats
             'pipe:1' # output to stdout
         )
 
-    def __get_ffplay_cmd(self):
+    # should_report_position: boolean - print status lines with the position of the audio to stderr, even though
+    #   other output is suppressed. See: AudioPlaybackClock
+    def __get_ffplay_cmd(self, should_report_position):
+        # Start at the start position. Unlike ffmpeg, ffplay doesn't drop the audio before `-ss` if it can't seek in
+        # its input, so trim it instead. Its timestamps are reset so that the position ffplay reports starts at zero,
+        # like the video's frames do.
+        seek_opts = ''
+        if self.__start_position:
+            seek_opts = '-af ' + shlex.quote('atrim=start={},asetpts=PTS-STARTPTS'.format(self.__start_position)) + ' '
+
         return (
             "ffplay " +
             "-nodisp " + # Disable graphical display.
             "-vn " + # Disable video
             "-autoexit " + # Exit when video is done playing
+            ("-stats " if should_report_position else "") +
+            seek_opts +
             "-i pipe:0 " + # play input from stdin
             "-v quiet" # supress verbose ffplay output
         )
 
-    def __get_mbuffer_cmd(self, buffer_size_bytes, log_file = None):
-        log_file_clause = ' -Q '
-        if log_file:
-            log_file_clause = f' -l {log_file} '
-        return f'mbuffer -q {log_file_clause} -m ' + shlex.quote(str(buffer_size_bytes)) + 'b'
+    def __get_ffprobe_cmd(self):
+        return (
+            'ffprobe ' +
+            '-v 0 ' + # supress output of verbose ffprobe configuration, etc
+            '-of json ' +
+            '-select_streams v:0 ' +
+            '-show_entries stream=width,height,r_frame_rate ' +
+            '-i pipe:0' # read input video from stdin
+        )
 
-    # Fps is available in self.__video_info metadata obtained via youtube-dl, but it is less accurate than using ffprobe.
-    def __calculate_fps(self):
-        self.__logger.info("Calculating video fps...")
-        video_path = ''
-        if self.__is_video_already_downloaded:
-            video_path = shlex.quote(self.__get_video_save_path())
-        else:
-            video_path = f'<({self.__get_youtube_dl_cmd()} 2>/dev/null)'
+    # Copies the video's audio track, without re-encoding it, into a matroska container. Matroska can hold any of
+    # the audio codecs youtube serves.
+    def __get_frame_cache_audio_cmd(self, audio_path):
+        return (
+            'ffmpeg ' +
+            '-i pipe:0 ' + # read input video from stdin
+            '-vn ' + # Disable video
+            '-c:a copy ' + # don't process the audio at all
+            '-f matroska ' +
+            '-v quiet ' + # supress output of verbose ffmpeg configuration, etc
+            '-y ' + shlex.quote(audio_path)
+        )
+
+    # Determines the filter ffmpeg converts the video into frames for the display with: the video is scaled down to the
+    # display with VideoSettings.scale_algorithm. If the video's fps may be above VideoSettings.max_fps, frames are
+    # dropped before scaling them, so that ffmpeg outputs exactly max_fps frames per second.
+    #
+    # ffmpeg's fps filter duplicates frames of videos whose fps is below its fps, so it isn't used if the video's fps
+    # is known to be within the cap. See: VideoMetadataCache
+    def __init_video_filter(self):
+        self.__capped_fps = None
+        max_fps = self.__video_settings.max_fps
+        if max_fps:
+            video_info = VideoMetadataCache().get(self.__url)
+            if video_info is None or not video_info['fps'] or video_info['fps'] > max_fps:
+                self.__capped_fps = max_fps
+
+        self.__video_filter = 'scale={}x{}:flags={}'.format(
+            self.__video_settings.display_width, self.__video_settings.display_height,
+            self.__video_settings.scale_algorithm
+        )
+        if self.__capped_fps:
+            self.__video_filter = 'fps={},'.format(self.__capped_fps) + self.__video_filter
 
-        fps_cmd = f'ffprobe -v 0 -of csv=p=0 -select_streams v:0 -show_entries stream=r_frame_rate {video_path}'
-        fps_parts = (subprocess
-            .check_output(fps_cmd, shell = True, executable = '/bin/bash')
-            .decode("utf-8"))
-        fps_parts = fps_parts.split('/')
+    # Returns the fps of the frames that ffmpeg outputs.
+    def __get_output_fps(self):
+        if self.__capped_fps:
+            return float(self.__capped_fps)
+        return self.__get_probed_fps()
+
+    # Waits for ffprobe to probe the fps of the video's stream. See: self.__start_pipeline
+    #
+    # Fps is available in self.__video_info metadata obtained via youtube-dl, but it is less accurate than using ffprobe.
+    def __get_probed_fps(self):
+        self.__logger.info("Probing video fps...")
+        probe_output = self.__ffprobe_process.stdout.read()
+        self.__ffprobe_process.stdout.close()
         fps = None
         try:
-            # "Live" streams on youtube may fail here with an error:
-            #   could not convert string to float: '1\n\n15'
+            stream = json.loads(probe_output)['streams'][0]
+            # "Live" streams on youtube may have an r_frame_rate that isn't a valid fraction.
+            fps_parts = stream['r_frame_rate'].split('/')
             fps = float(fps_parts[0]) / float(fps_parts[1])
-        except ValueError as ex:
-            self.__logger.error("Got an error dividing fps parts: " + str(ex))
-            video_info = self.__get_video_info()
-            if video_info['fps'] is not None:
+            self.__logger.info('Probed video: {}x{} @ {} fps.'.format(stream.get('width'), stream.get('height'), fps))
+        except (ValueError, KeyError, IndexError, ZeroDivisionError) as ex:
+            self.__logger.error("Got an error probing fps: {}. ffprobe output: {}".format(repr(ex), probe_output))
+            if self.__is_video_already_downloaded:
+                # don't go online for a saved video, but its metadata may still be cached
+                video_info = VideoMetadataCache().get(self.__url)
+            else:
+                video_info = self.__get_video_info()
+            if video_info is not None and video_info['fps'] is not None:
                 self.__logger.error("Using fps approximation from video_info['fps']: " + str(video_info['fps']) + " fps.")
                 fps = float(video_info['fps'])
             else:
                 self.__logger.error("Assuming 30 fps for this video.")
                 fps = 30
 
-        self.__logger.info('Calculated video fps: ' + str(fps))
         return fps
 
-    def __make_ffmpeg_to_python_fifo(self):
-        make_fifo_cmd = (
-            'fifo_name=$(mktemp --tmpdir={} --dry-run {}) && mkfifo -m 600 "$fifo_name" && printf $fifo_name'
-            .format(
-                tempfile.gettempdir(),
-                self.__FFMPEG_TO_PYTHON_FIFO_PREFIX + 'XXXXXXXXXX'
-            )
-        )
-        self.__logger.info('Making ffmpeg_to_python_fifo...')
-        ffmpeg_to_python_fifo_name = (subprocess
-            .check_output(make_fifo_cmd, shell = True, executable = '/bin/bash')
-            .decode("utf-8"))
-        return ffmpeg_to_python_fifo_name
-
-    def __get_cleanup_ffmpeg_to_python_fifos_cmd(self):
-        path_glob = shlex.quote(tempfile.gettempdir() + "/" + self.__FFMPEG_TO_PYTHON_FIFO_PREFIX) + '*'
-        return 'sudo rm -rf {}'.format(path_glob)
-
-    def __get_cleanup_incomplete_video_downloads_cmd(self):
-        return 'sudo rm -rf *{}'.format(shlex.quote(self.__TEMP_VIDEO_DOWNLOAD_SUFFIX))
-
     # Perhaps aggressive to do 'pre' cleanup, but wanting to be a good citizen. Protects against a hypothetical
     # where we're stuck in a state of failing to finish playing videos and thus post cleanup logic never gets
     # run.
+    #
+    # The orphaned files are listed before this video's pipeline starts, so that its own incomplete files are never
+    # among them, and are then deleted in the background, so that the video doesn't wait for it.
     def __do_pre_cleanup(self):
-        self.__logger.info("Deleting orphaned ffmpeg_to_python_fifos...")
-        subprocess.check_output(self.__get_cleanup_ffmpeg_to_python_fifos_cmd(), shell = True, executable = '/bin/bash')
-        self.__logger.info("Deleting orphaned incomplete video downloads...")
-        subprocess.check_output(self.__get_cleanup_incomplete_video_downloads_cmd(), shell = True, executable = '/bin/bash')
-
-    def __do_post_cleanup(self, process_and_play_vid_proc):
-        self.__logger.info("Waiting for process_and_play_vid_proc to end...")
-        exit_status = process_and_play_vid_proc.wait()
-        if self.__was_video_skipped and exit_status == -signal.SIGTERM:
-            pass # We expect a specific non-zero exit code if the video was skipped.
-        elif exit_status != 0:
-            self.__logger.error('Got non-zero exit_status for process_and_play_vid_proc: {}'.format(exit_status))
-
-        self.__logger.info("Deleting ffmpeg_to_python fifos...")
-        subprocess.check_output(self.__get_cleanup_ffmpeg_to_python_fifos_cmd(), shell = True, executable = '/bin/bash')
-
-        self.__logger.info("Deleting incomplete video downloads...")
-        subprocess.check_output(self.__get_cleanup_incomplete_video_downloads_cmd(), shell = True, executable = '/bin/bash')
-
-    def __maybe_skip_video(self, process_and_play_vid_proc_pgid = None):
-        if not self.__video_settings.should_check_playlist:
-            return False
+        paths = glob.glob(glob.escape(self.__get_data_directory()) + '/*' + self.__TEMP_VIDEO_DOWNLOAD_SUFFIX)
+        if self.__frame_cache:
+            paths += self.__frame_cache.list_incomplete_entry_files()
+        if not paths:
+            return
 
-        if self.__playlist.should_skip_video_id(self.__playlist_video_id):
-            if process_and_play_vid_proc_pgid:
+        def delete_orphaned_files():
+            self.__logger.info("Deleting {} orphaned incomplete video download(s)...".format(len(paths)))
+            for path in paths:
                 try:
-                    os.killpg(process_and_play_vid_proc_pgid, signal.SIGTERM)
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
                 except Exception:
-                    # might raise: `ProcessLookupError: [Errno 3] No such process`
+                    self.__logger.error('Caught exception deleting {}: {}'.format(path, traceback.format_exc()))
+
+        threading.Thread(
+            target = delete_orphaned_files, name = self.__class__.__name__ + '__pre_cleanup', daemon = True
+        ).start()
+
+    # fps: float - the video's fps, or None if it wasn't probed, i.e. because the pipeline failed before that.
+    def __do_post_cleanup(self, pipeline_supervisor, frame_cache_writer, fps):
+        self.__logger.info("Waiting for the video pipeline to end...")
+        is_success = pipeline_supervisor.wait()
+        self.__pipeline_stats = pipeline_supervisor.get_stats()
+        self.__logger.info("Video pipeline stats: {}".format(self.__pipeline_stats))
+        if self.__playback_clock:
+            self.__playback_clock.close()
+            self.__logger.info("Playback stats: {}".format(self.get_playback_stats()))
+
+        if frame_cache_writer:
+            if is_success and fps is not None:
+                has_audio = self.__frame_cache_audio_process.returncode == 0
+                self.__logger.info("Caching video frames{}.".format(' and audio' if has_audio else ''))
+                if frame_cache_writer.commit(fps, has_audio):
+                    self.__video_cache.add(VideoCache.TYPE_FRAMES, self.__url, self.__get_frame_cache_entry_paths())
+            else:
+                frame_cache_writer.abort()
+
+        if self.__should_save_video():
+            if is_success:
+                os.replace(self.__get_temp_video_save_path(), self.__get_video_save_path())
+                self.__video_cache.add(VideoCache.TYPE_VIDEO, self.__url, [self.__get_video_save_path()])
+            else:
+                self.__logger.info("Deleting incomplete video download...")
+                try:
+                    os.remove(self.__get_temp_video_save_path())
+                except FileNotFoundError:
                     pass
-            self.__was_video_skipped = True
+
+        if self.__video_cache:
+            self.__video_cache.evict_async(
+                self.__video_settings.cache_max_bytes, self.__video_settings.cache_eviction_policy
+            )
+
+    def __maybe_skip_video(self, pipeline_supervisor = None):
+        if not self.__video_settings.should_check_playlist:
+            return False
+
+        if self.__playlist.should_skip_video_id(self.__playlist_video_id):
+            if pipeline_supervisor:
+                pipeline_supervisor.terminate()
             return True
 
         return False